@@ -0,0 +1,172 @@
+"""Admission control: charge each submission its estimated GPU time.
+
+Two token buckets, both stored in the database so every worker process and
+host shares them:
+
+- a per-user bucket that refills at ``admission_user_gpu_seconds_per_hour``
+  up to ``admission_user_burst_gpu_seconds``;
+- a global bucket that tracks the estimated backlog. It refills at the rate
+  Ollama serves work (``admission_gpu_seconds_per_second``) but never above
+  zero, since idle GPU time cannot be saved up, and may go into debt until the
+  backlog would take ``admission_max_backlog_seconds`` to drain.
+
+So work is queued as long as the GPUs can get through it in time and refused
+beyond that. Once an analysis finishes or fails, the estimate is settled
+against the GPU time Ollama actually reported (nothing, for a cache hit or a
+request Ollama rejected).
+"""
+
+import time
+from dataclasses import dataclass
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import metrics
+from app.config import settings
+from app.models import Analysis, TokenBucket
+from app.analysis.ai_engine import SYSTEM_PROMPT
+from app.analysis.token_budget import estimate_tokens
+
+GLOBAL_KEY = "global"
+_buckets = TokenBucket.__table__
+_SYSTEM_PROMPT_TOKENS = estimate_tokens(SYSTEM_PROMPT)
+
+
+@dataclass
+class Rejection:
+    bucket: str  # "user" or "global"
+    retry_after: float
+
+
+@dataclass
+class _Bucket:
+    key: str
+    rate: float  # refill per second
+    capacity: float
+    floor: float
+
+
+def _user_bucket(user_id: str) -> _Bucket:
+    return _Bucket(
+        key=f"user:{user_id}",
+        rate=settings.admission_user_gpu_seconds_per_hour / 3600,
+        capacity=settings.admission_user_burst_gpu_seconds,
+        floor=0.0,
+    )
+
+
+def _global_bucket() -> _Bucket:
+    rate = settings.admission_gpu_seconds_per_second
+    return _Bucket(key=GLOBAL_KEY, rate=rate, capacity=0.0, floor=-rate * settings.admission_max_backlog_seconds)
+
+
+def estimate_gpu_seconds(resume_text: str, job_description: str) -> float:
+    """Prompt evaluation plus expected generation time for one analysis.
+
+    Inputs over ``llm_input_token_budget`` are trimmed before the LLM call,
+    so the prompt estimate is capped there.
+    """
+    prompt_tokens = _SYSTEM_PROMPT_TOKENS + min(
+        estimate_tokens(resume_text) + estimate_tokens(job_description), settings.llm_input_token_budget
+    )
+    return round(
+        prompt_tokens / settings.admission_prompt_tokens_per_second
+        + settings.admission_expected_completion_tokens / settings.admission_completion_tokens_per_second,
+        3,
+    )
+
+
+def _level(bucket: _Bucket, now: float):
+    """SQL expression for the bucket's balance after refilling up to ``now``."""
+    refilled = _buckets.c.tokens + (now - _buckets.c.updated_at) * bucket.rate
+    return sa.case((refilled > bucket.capacity, bucket.capacity), else_=refilled)
+
+
+async def _charge(db: AsyncSession, bucket: _Bucket, cost: float, now: float) -> float | None:
+    """Take ``cost`` from the bucket; on shortfall return seconds until it would fit.
+
+    A request larger than the bucket's whole range is let in when the bucket
+    is full and leaves it in debt, so it is never refused outright.
+    """
+    insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    await db.execute(
+        insert(_buckets)
+        .values(key=bucket.key, tokens=bucket.capacity, updated_at=now)
+        .on_conflict_do_nothing(index_elements=["key"])
+    )
+    # Single conditional UPDATE: the row lock makes check-and-take atomic across processes
+    required = min(cost, bucket.capacity - bucket.floor)
+    level = _level(bucket, now)
+    result = await db.execute(
+        _buckets.update()
+        .where(_buckets.c.key == bucket.key, level - required >= bucket.floor)
+        .values(tokens=level - cost, updated_at=now)
+    )
+    if result.rowcount == 1:
+        return None
+
+    current = (await db.execute(sa.select(level).where(_buckets.c.key == bucket.key))).scalar_one()
+    return (bucket.floor + required - current) / bucket.rate if bucket.rate > 0 else float("inf")
+
+
+async def admit(db: AsyncSession, user_id: str, cost: float) -> Rejection | None:
+    """Charge the user's bucket and the global one in the caller's transaction.
+
+    Returns None when admitted; the charge is only kept if the caller commits.
+    On a rejection the caller must roll back, since the user bucket may
+    already have been charged.
+    """
+    if not settings.admission_enabled or cost <= 0:
+        return None
+    now = time.time()
+    # Always user first, then global, so concurrent transactions lock rows in the same order
+    for name, bucket in (("user", _user_bucket(user_id)), ("global", _global_bucket())):
+        wait = await _charge(db, bucket, cost, now)
+        if wait is not None:
+            metrics.ADMISSION_REJECTED.labels(name).inc()
+            return Rejection(bucket=name, retry_after=wait)
+    return None
+
+
+async def refund(db: AsyncSession, user_id: str, amount: float) -> None:
+    """Return ``amount`` GPU-seconds to both buckets (negative to charge more). Caller commits."""
+    if not settings.admission_enabled or not amount:
+        return
+    now = time.time()
+    for bucket in (_user_bucket(user_id), _global_bucket()):
+        level = _level(bucket, now) + amount
+        await db.execute(
+            _buckets.update()
+            .where(_buckets.c.key == bucket.key)
+            .values(
+                tokens=sa.case((level > bucket.capacity, bucket.capacity), else_=level),
+                updated_at=now,
+            )
+        )
+
+
+def gpu_seconds_used(timings: dict | None) -> float:
+    """GPU time Ollama reported for an analysis, across all attempts."""
+    timings = timings or {}
+    return sum(timings.get(stage) or 0.0 for stage in ("model_load_ms", "prompt_eval_ms", "generation_ms")) / 1000
+
+
+async def settle(db: AsyncSession, analysis: Analysis) -> None:
+    """Correct the submission-time estimate with the GPU time actually used. Caller commits."""
+    if analysis.estimated_gpu_seconds is None:
+        return
+    await refund(db, analysis.user_id, analysis.estimated_gpu_seconds - gpu_seconds_used(analysis.timings))
+
+
+async def backlog_seconds(db: AsyncSession) -> float:
+    """Estimated seconds of queued GPU work, as the global bucket sees it."""
+    bucket = _global_bucket()
+    level = (
+        await db.execute(sa.select(_level(bucket, time.time())).where(_buckets.c.key == GLOBAL_KEY))
+    ).scalar()
+    if not level or bucket.rate <= 0:
+        return 0.0
+    return round(-level / bucket.rate, 1)
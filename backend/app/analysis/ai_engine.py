@@ -1,14 +1,25 @@
+import asyncio
 import json
 import logging
-import re
+import random
+import time
+from typing import Any, Callable
 
 import httpx
+from pydantic import ValidationError
 
+from app import metrics
+from app.analysis import ollama_client
+from app.analysis.json_stream import PartialJSONParser
+from app.analysis.token_budget import estimate_tokens, fit_inputs
 from app.config import settings
 from app.schemas import AIAnalysisResult
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever SYSTEM_PROMPT or the request options change, so cached results are not reused
+PROMPT_VERSION = "4"
+
 SYSTEM_PROMPT = """\
 You are an expert resume analyst and career coach. You will be given a candidate's resume text and a job description.
 
@@ -51,90 +62,276 @@ EXAMPLE OUTPUT:
   ]
 }
 
-Now analyze the following:
+The user message contains the resume followed by the job description to analyze.
 """
 
+# Generation stats Ollama reports on the final message (durations in nanoseconds)
+_STAT_KEYS = ("prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration", "load_duration")
+
+
+def _build_messages(resume_text: str, job_description: str) -> list[dict[str, str]]:
+    """Chat messages laid out so consecutive requests share the longest possible prefix.
+
+    The fixed system prompt comes first, then the resume, then the job
+    description, so Ollama can reuse its KV cache for the system prompt on
+    every call and for the resume across a batch of job descriptions.
+    """
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": (
+                f"=== RESUME ===\n{resume_text}\n\n"
+                f"=== JOB DESCRIPTION ===\n{job_description}"
+            ),
+        },
+    ]
+
+
+def prepare_inputs(resume_text: str, job_description: str) -> tuple[str, str, dict | None]:
+    """Token-budgeting stage run before every generation.
 
-def _build_prompt(resume_text: str, job_description: str) -> str:
-    return (
-        f"{SYSTEM_PROMPT}\n"
-        f"=== RESUME ===\n{resume_text}\n\n"
-        f"=== JOB DESCRIPTION ===\n{job_description}"
+    Drops job-description boilerplate (EEO, benefits, pay ranges), repeated
+    headers/lines and duplicate sections, then trims the least relevant
+    sections until both inputs fit ``llm_input_token_budget``. Returns the
+    texts to send and a report of what was removed (``None`` if nothing).
+    """
+    resume_text, job_description, report = fit_inputs(
+        resume_text, job_description, settings.llm_input_token_budget
     )
+    if report is not None:
+        logger.info(
+            "Inputs trimmed: resume %d -> %d tokens, job description %d -> %d tokens",
+            report["resume"]["original_tokens"],
+            report["resume"]["kept_tokens"],
+            report["job_description"]["original_tokens"],
+            report["job_description"]["kept_tokens"],
+        )
+    return resume_text, job_description, report
 
 
-def _extract_json(text: str) -> dict:
-    """Try to extract a JSON object from the model response."""
-    text = text.strip()
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
+def _log_stats(data: dict) -> dict:
+    stats = {key: data[key] for key in _STAT_KEYS if key in data}
+    if stats:
+        metrics.observe_ollama_stats(stats)
+        logger.info(
+            "Ollama prompt eval: %s tokens in %.0fms, generation: %s tokens in %.0fms",
+            stats.get("prompt_eval_count", 0),
+            stats.get("prompt_eval_duration", 0) / 1e6,
+            stats.get("eval_count", 0),
+            stats.get("eval_duration", 0) / 1e6,
+        )
+    return stats
 
-    # Try to find JSON within markdown code fences
-    match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", text, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group(1))
-        except json.JSONDecodeError:
-            pass
 
-    # Try to find first { ... } block (greedy, dotall)
-    match = re.search(r"\{.*\}", text, re.DOTALL)
-    if match:
+async def warm_up() -> None:
+    """Load the model and evaluate the system prompt once per endpoint so first requests reuse it."""
+    payload = {
+        "model": settings.ollama_model,
+        "messages": [{"role": "system", "content": SYSTEM_PROMPT}],
+        "stream": False,
+        "keep_alive": settings.ollama_keep_alive,
+        "options": {"num_predict": 1, "num_ctx": settings.ollama_num_ctx},
+    }
+    for endpoint in ollama_client.endpoints():
         try:
-            return json.loads(match.group(0))
-        except json.JSONDecodeError:
-            pass
+            response = await ollama_client.post("/api/chat", endpoint=endpoint, json=payload)
+            response.raise_for_status()
+            _log_stats(response.json())
+            logger.info("Ollama model %s warmed up on %s", settings.ollama_model, endpoint.url)
+        except Exception as exc:
+            logger.warning("Ollama warm-up failed on %s: %s", endpoint.url, exc)
+
+
+# Output-quality counters, reported by /health
+_stats = {"generations": 0, "parse_failures": 0, "repaired": 0, "validation_failures": 0}
+
+# Ollama structured outputs: generation is constrained to this schema
+_RESULT_SCHEMA = AIAnalysisResult.model_json_schema()
+_LIST_FIELDS = ("matched_skills", "missing_skills", "suggestions")
+
+
+def output_stats() -> dict:
+    return dict(_stats)
+
+
+def _parse_result(parser: PartialJSONParser) -> AIAnalysisResult:
+    """Validate the parsed response, repairing output that was cut off mid-generation."""
+    _stats["generations"] += 1
+    try:
+        parsed = parser.result()
+    except ValueError:
+        _stats["parse_failures"] += 1
+        metrics.LLM_OUTPUT.labels("parse_failure").inc()
+        raise
+
+    if parser.repaired:
+        _stats["repaired"] += 1
+        metrics.LLM_OUTPUT.labels("repaired").inc()
+        logger.warning("Repaired truncated model output (%d chars)", len(parser.text))
+        # Lists cut off before they started are better empty than a re-generation
+        for field in _LIST_FIELDS:
+            parsed.setdefault(field, [])
+
+    try:
+        result = AIAnalysisResult.model_validate(parsed)
+    except ValidationError:
+        _stats["validation_failures"] += 1
+        metrics.LLM_OUTPUT.labels("validation_failure").inc()
+        raise
+    if not parser.repaired:
+        metrics.LLM_OUTPUT.labels("ok").inc()
+    result._repaired = parser.repaired
+    return result
+
+
+EventCallback = Callable[[str, dict[str, Any]], None]
+
+
+async def _generate(payload: dict, on_event: EventCallback | None) -> tuple[PartialJSONParser, dict]:
+    """Run one generation; return the parser that has scanned its output and Ollama's stats.
+
+    With ``on_event``, tokens and completed JSON members are reported as they arrive.
+    """
+    parser = PartialJSONParser()
+    if on_event is None:
+        response = await ollama_client.post("/api/chat", json=payload)
+        response.raise_for_status()
+        data = response.json()
+        parser.feed(data.get("message", {}).get("content", ""))
+        return parser, _log_stats(data)
+
+    stats: dict = {}
+    async with ollama_client.stream("POST", "/api/chat", json={**payload, "stream": True}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            token = data.get("message", {}).get("content", "")
+            if token:
+                on_event("token", {"text": token})
+                for key, value in parser.feed(token):
+                    on_event("field", {key: value})
+            if data.get("done"):
+                stats = _log_stats(data)
+                break
+    return parser, stats
+
 
-    raise ValueError(f"Could not extract valid JSON from model response: {text[:300]}")
+def _add_usage(usage: dict, stats: dict) -> None:
+    """Accumulate one attempt's Ollama stats (nanosecond durations) into ``usage``."""
+    for key, target in (
+        ("load_duration", "model_load_ms"),
+        ("prompt_eval_duration", "prompt_eval_ms"),
+        ("eval_duration", "generation_ms"),
+    ):
+        usage[target] = usage.get(target, 0.0) + stats.get(key, 0) / 1e6
+    usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + stats.get("prompt_eval_count", 0)
+    usage["completion_tokens"] = usage.get("completion_tokens", 0) + stats.get("eval_count", 0)
 
 
-async def analyze_resume(resume_text: str, job_description: str) -> AIAnalysisResult:
+def _with_usage(error: Exception, usage: dict) -> Exception:
+    """Attach the Ollama usage of the attempts made, so a failure is only charged for those."""
+    error._usage = usage
+    return error
+
+
+async def analyze_resume(
+    resume_text: str,
+    job_description: str,
+    on_event: EventCallback | None = None,
+) -> AIAnalysisResult:
     """Send resume + job description to Ollama and return structured analysis.
 
-    Retries up to 2 times on failure.
+    Inputs are expected to have been through ``prepare_inputs``. Up to
+    ``ollama_retry_attempts`` attempts are made: invalid model output is
+    retried immediately, transport errors (connection, timeout, 5xx) after an
+    exponential backoff with jitter, and 4xx errors not at all. Raises
+    ``ollama_client.OllamaUnavailable`` without retrying once every
+    endpoint's circuit breaker is open. Other failures are raised as
+    ``RuntimeError`` carrying the attempts' usage in ``_usage``. If ``on_event`` is given, the
+    generation is streamed and ``token``/``field``/``retry`` events are
+    reported through it.
     """
-    prompt = _build_prompt(resume_text, job_description)
-    url = f"{settings.ollama_base_url}/api/generate"
+    prompt_tokens = estimate_tokens(SYSTEM_PROMPT + resume_text + job_description)
+    if prompt_tokens + 2048 > settings.ollama_num_ctx:
+        logger.warning(
+            "Prompt of ~%d tokens may overflow the %d-token context window",
+            prompt_tokens,
+            settings.ollama_num_ctx,
+        )
+
     payload = {
         "model": settings.ollama_model,
-        "prompt": prompt,
-        "format": "json",
+        "messages": _build_messages(resume_text, job_description),
+        "format": _RESULT_SCHEMA if settings.ollama_structured_output else "json",
         "stream": False,
+        "keep_alive": settings.ollama_keep_alive,
         "options": {
             "temperature": 0.3,
             "num_predict": 2048,
+            "num_ctx": settings.ollama_num_ctx,
         },
     }
 
+    attempts = settings.ollama_retry_attempts
     last_error: Exception | None = None
+    usage: dict = {}
+    started = time.perf_counter()
 
-    for attempt in range(3):
+    for attempt in range(attempts):
         try:
-            async with httpx.AsyncClient(timeout=180.0) as client:
-                response = await client.post(url, json=payload)
-                response.raise_for_status()
+            if attempt and on_event is not None:
+                on_event("retry", {"attempt": attempt + 1})
+            parser, stats = await _generate(payload, on_event)
+            _add_usage(usage, stats)
+            logger.info("Ollama response length: %d chars (attempt %d)", len(parser.text), attempt + 1)
 
-            data = response.json()
-            raw_text = data.get("response", "")
-            logger.info("Ollama response length: %d chars (attempt %d)", len(raw_text), attempt + 1)
-            parsed = _extract_json(raw_text)
-
-            # Validate against our schema
-            result = AIAnalysisResult(**parsed)
+            # Parse in the same pass that scanned the stream, then validate against our schema
+            result = _parse_result(parser)
 
             # Clamp score to 0-100
             result.match_score = max(0.0, min(100.0, result.match_score))
 
+            usage["llm_total_ms"] = (time.perf_counter() - started) * 1000
+            result._usage = usage
+
             return result
 
-        except Exception as exc:
+        except ollama_client.OllamaUnavailable:
+            raise
+
+        except (ValueError, TypeError, ValidationError) as exc:
+            # Model output error: the backend is fine, just sample again
+            last_error = exc
+            logger.warning("Ollama attempt %d/%d returned invalid output: %s", attempt + 1, attempts, exc)
+            if attempt + 1 < attempts:
+                metrics.OLLAMA_RETRIES.labels("invalid_output").inc()
+
+        except httpx.HTTPError as exc:
             last_error = exc
-            logger.warning(
-                "Ollama attempt %d/3 failed: %s", attempt + 1, exc
-            )
+            if not ollama_client.is_transport_error(exc):
+                # 4xx (unknown model, bad request): retrying will not help
+                raise _with_usage(RuntimeError(f"Ollama rejected the request: {exc}"), usage) from exc
+            if not ollama_client.is_available():
+                raise ollama_client.OllamaUnavailable(f"Ollama is unavailable: {exc}") from exc
+            if attempt + 1 < attempts:
+                metrics.OLLAMA_RETRIES.labels("transport").inc()
+                delay = _backoff_delay(attempt)
+                logger.warning(
+                    "Ollama attempt %d/%d failed (%s), retrying in %.1fs",
+                    attempt + 1, attempts, exc.__class__.__name__, delay,
+                )
+                await asyncio.sleep(delay)
 
-    raise RuntimeError(
-        f"Failed to get valid analysis from Ollama after 3 attempts: {last_error}"
+    raise _with_usage(
+        RuntimeError(f"Failed to get valid analysis from Ollama after {attempts} attempts: {last_error}"),
+        usage,
     )
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter, capped at ``ollama_retry_max_delay``."""
+    ceiling = min(settings.ollama_retry_max_delay, settings.ollama_retry_base_delay * 2 ** attempt)
+    return random.uniform(0, ceiling)
@@ -0,0 +1,147 @@
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import AnalysisCache
+from app.schemas import AIAnalysisResult
+from app.analysis.ai_engine import PROMPT_VERSION
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# key -> (expires_at, result)
+_memory: OrderedDict[str, tuple[float, AIAnalysisResult]] = OrderedDict()
+
+_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "evictions": 0, "pruned": 0}
+# Expired database entries are deleted at most this often
+_PRUNE_INTERVAL_SECONDS = 3600.0
+_next_prune = 0.0
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def make_key(resume_text: str, job_description: str, model: str | None = None) -> str:
+    """Content-addressed cache key for a resume/job description pair."""
+    digest = hashlib.sha256()
+    for part in (
+        _normalize(resume_text),
+        _normalize(job_description),
+        model or settings.ollama_model,
+        PROMPT_VERSION,
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _memory_get(key: str) -> AIAnalysisResult | None:
+    entry = _memory.get(key)
+    if entry is None:
+        return None
+    expires_at, result = entry
+    if expires_at < time.monotonic():
+        del _memory[key]
+        return None
+    _memory.move_to_end(key)
+    return result
+
+
+def _memory_put(key: str, result: AIAnalysisResult) -> None:
+    _memory[key] = (time.monotonic() + settings.result_cache_ttl_seconds, result)
+    _memory.move_to_end(key)
+    while len(_memory) > settings.result_cache_max_entries:
+        _memory.popitem(last=False)
+        _stats["evictions"] += 1
+
+
+async def get_cached_result(db: AsyncSession, key: str) -> AIAnalysisResult | None:
+    """Look up a result in the in-process tier, then the database tier."""
+    if not settings.result_cache_enabled:
+        return None
+
+    result = _memory_get(key)
+    if result is not None:
+        _stats["memory_hits"] += 1
+        return result
+
+    row = await db.execute(
+        select(AnalysisCache.result).where(AnalysisCache.key == key, AnalysisCache.created_at >= _db_cutoff())
+    )
+    raw = row.scalar_one_or_none()
+    if raw is not None:
+        try:
+            result = AIAnalysisResult.model_validate(raw)
+        except ValueError:
+            logger.warning("Discarding unreadable cache entry %s", key)
+        else:
+            _stats["db_hits"] += 1
+            _memory_put(key, result)
+            return result
+
+    _stats["misses"] += 1
+    return None
+
+
+async def store_result(db: AsyncSession, key: str, result: AIAnalysisResult) -> None:
+    """Write a result to both tiers. Caller commits."""
+    if not settings.result_cache_enabled:
+        return
+
+    _memory_put(key, result)
+    insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    values = {
+        "model": settings.ollama_model,
+        "prompt_version": PROMPT_VERSION,
+        "result": result.model_dump(),
+        "created_at": datetime.now(timezone.utc),
+    }
+    # An upsert, so a worker storing the same pair concurrently cannot fail the caller's commit
+    await db.execute(
+        insert(AnalysisCache)
+        .values(key=key, **values)
+        .on_conflict_do_update(index_elements=["key"], set_=values)
+    )
+
+
+def _db_cutoff() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=settings.result_cache_db_ttl_seconds)
+
+
+async def prune_expired(db: AsyncSession) -> int:
+    """Delete database entries past ``result_cache_db_ttl_seconds``; runs at most hourly."""
+    global _next_prune
+    if time.monotonic() < _next_prune:
+        return 0
+    _next_prune = time.monotonic() + _PRUNE_INTERVAL_SECONDS
+    result = await db.execute(delete(AnalysisCache).where(AnalysisCache.created_at < _db_cutoff()))
+    await db.commit()
+    _stats["pruned"] += result.rowcount
+    if result.rowcount:
+        logger.info("Pruned %d expired result cache entries", result.rowcount)
+    return result.rowcount
+
+
+def cache_stats() -> dict:
+    hits = _stats["memory_hits"] + _stats["db_hits"]
+    lookups = hits + _stats["misses"]
+    return {
+        **_stats,
+        "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        "memory_entries": len(_memory),
+    }
+
+
+def clear_memory() -> None:
+    _memory.clear()
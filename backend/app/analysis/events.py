@@ -0,0 +1,36 @@
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+# analysis_id -> queues of connected stream listeners (in-process only)
+_subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+
+TERMINAL_EVENTS = ("completed", "failed")
+
+
+def publish(analysis_id: str, event: str, data: dict[str, Any]) -> None:
+    """Fan an event out to every listener of an analysis. Never blocks the worker."""
+    for inbox in list(_subscribers.get(analysis_id, ())):
+        try:
+            inbox.put_nowait((event, data))
+        except asyncio.QueueFull:
+            # Slow client: drop the event, the stream endpoint re-reads the row on timeout
+            logger.debug("Dropping %s event for analysis %s", event, analysis_id)
+
+
+@contextmanager
+def subscribe(analysis_id: str, maxsize: int = 1000) -> Iterator[asyncio.Queue]:
+    inbox: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    _subscribers[analysis_id].add(inbox)
+    try:
+        yield inbox
+    finally:
+        listeners = _subscribers.get(analysis_id)
+        if listeners is not None:
+            listeners.discard(inbox)
+            if not listeners:
+                del _subscribers[analysis_id]
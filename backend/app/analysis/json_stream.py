@@ -0,0 +1,143 @@
+import json
+import re
+from typing import Any
+
+_CLOSERS = {"{": "}", "[": "]"}
+# A bare number or literal at the very end may have been cut short (8 of 85, tru of true)
+_TRAILING_TOKEN_RE = re.compile(r"[\w.+-]+$")
+_LITERALS = {"true", "false", "null"}
+# An object key whose value was dropped
+_DANGLING_KEY_RE = re.compile(r'"(?:[^"\\]|\\.)*"\s*:$')
+
+
+class PartialJSONParser:
+    """Incrementally scan a streamed JSON object and return top-level members as they complete.
+
+    Each call to ``feed`` only looks at the new characters, so the whole
+    response is scanned once no matter how many chunks it arrives in. Text
+    before the opening brace and after the closing one (e.g. a markdown
+    fence) is ignored. ``result`` returns the parsed object, repairing it if
+    the output was cut off part-way.
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._pos = 0
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._start: int | None = None
+        self._end: int | None = None
+        self._member_start: int | None = None
+        self._members: dict[str, Any] = {}
+        self.repaired = False
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @property
+    def complete(self) -> bool:
+        return self._end is not None
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        self._text += chunk
+        text = self._text
+        members: list[tuple[str, Any]] = []
+
+        for i in range(self._pos, len(text)):
+            if self._end is not None:
+                break
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if self._start is None:
+                if ch == "{":
+                    self._start = i
+                    self._stack.append(ch)
+                    self._member_start = i + 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in _CLOSERS:
+                self._stack.append(ch)
+            elif ch in "}]":
+                if len(self._stack) == 1:
+                    self._emit(text[self._member_start:i], members)
+                    self._member_start = None
+                    self._end = i
+                if self._stack:
+                    self._stack.pop()
+            elif ch == "," and len(self._stack) == 1:
+                self._emit(text[self._member_start:i], members)
+                self._member_start = i + 1
+
+        self._pos = len(text)
+        return members
+
+    def _emit(self, fragment: str | None, members: list[tuple[str, Any]]) -> None:
+        if not fragment or not fragment.strip():
+            return
+        try:
+            items = json.loads("{" + fragment + "}").items()
+        except json.JSONDecodeError:
+            return
+        members.extend(items)
+        self._members.update(items)
+
+    def result(self) -> dict[str, Any]:
+        """The complete object, or a best-effort repair of truncated output.
+
+        A cut-off response is closed in place (dropping an unfinished string,
+        a trailing number or partial literal, a key left without a value and a
+        dangling comma, then closing open arrays and objects); if that
+        still does not parse, the top-level members completed so far are
+        returned. Sets ``repaired`` when either fallback was used.
+
+        Raises:
+            ValueError: If no JSON object could be recovered.
+        """
+        if self._start is None:
+            raise ValueError(f"No JSON object in model response: {self._text[:300]}")
+
+        if self._end is not None:
+            try:
+                return json.loads(self._text[self._start:self._end + 1])
+            except json.JSONDecodeError:
+                pass
+        else:
+            try:
+                repaired = json.loads(self._close())
+            except json.JSONDecodeError:
+                repaired = None
+            if repaired:
+                self.repaired = True
+                return repaired
+
+        if self._members:
+            self.repaired = True
+            return dict(self._members)
+        raise ValueError(f"Could not parse JSON from model response: {self._text[:300]}")
+
+    def _close(self) -> str:
+        """Text of the unfinished object, minus any unfinished value, with open containers closed."""
+        end = self._string_start if self._in_string else len(self._text)
+        partial = self._text[self._start:end].rstrip()
+        # Numbers are dropped even when they look whole: the next chunk might have extended them
+        token = _TRAILING_TOKEN_RE.search(partial)
+        if token and token.group() not in _LITERALS:
+            partial = partial[:token.start()].rstrip()
+        partial = _DANGLING_KEY_RE.sub("", partial).rstrip()
+        if partial.endswith(","):
+            partial = partial[:-1]
+        return partial + "".join(_CLOSERS[opener] for opener in reversed(self._stack))
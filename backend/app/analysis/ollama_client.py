@@ -0,0 +1,341 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager, nullcontext
+
+import httpx
+
+from app import metrics
+from app.config import OllamaEndpointConfig, settings
+
+logger = logging.getLogger(__name__)
+
+# How long callers wait before looking again while an endpoint's probe is running
+_PROBE_WAIT_SECONDS = 1.0
+
+# Pool usage counters across all endpoints, reported by /health
+_stats = {"in_flight": 0, "peak_in_flight": 0, "saturated_count": 0, "requests": 0}
+
+
+class OllamaUnavailable(Exception):
+    """Raised without contacting Ollama while every endpoint's circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Per-endpoint health: opens after consecutive transport failures, then probes.
+
+    ``closed`` lets everything through. After ``failure_threshold`` consecutive
+    failures it turns ``open`` and the endpoint is ejected from routing for
+    ``reset_seconds``; after that, routing sends exactly one request as a
+    ``half_open`` probe, whose outcome closes or re-opens the circuit. Only
+    transport errors and 5xx responses count, never malformed model output.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+
+    def retry_in(self) -> float:
+        """Seconds until requests may go through (0 when they may now).
+
+        While a probe is running its outcome is not known yet, so callers are
+        told to look again shortly.
+        """
+        if self.state == "half_open":
+            return _PROBE_WAIT_SECONDS
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def accepts_requests(self) -> bool:
+        """Closed, or open and due for a probe. False while a probe is running."""
+        return self.retry_in() == 0
+
+    def start_probe(self) -> None:
+        """Claim the single probe of an open circuit that is due for one."""
+        if self.state == "open" and self.retry_in() == 0:
+            self.state = "half_open"
+
+    def abandon_probe(self) -> None:
+        """A probe ended without a verdict (cancelled, or a 4xx); let the next request probe."""
+        if self.state == "half_open":
+            self.state = "open"
+
+    def before_request(self) -> None:
+        if self.state == "open":
+            if self.retry_in() > 0:
+                raise OllamaUnavailable(
+                    f"Ollama is unavailable (circuit open, retry in {self.retry_in():.0f}s)"
+                )
+            self.state = "half_open"
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_in_seconds": round(self.retry_in(), 1),
+            "times_opened": self.times_opened,
+        }
+
+
+class Endpoint:
+    """One Ollama server: its connection pool, concurrency limit, health and latency."""
+
+    def __init__(self, config: OllamaEndpointConfig) -> None:
+        self.url = config.url.rstrip("/")
+        self.weight = config.weight
+        self.max_concurrency = config.max_concurrency
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.ollama_breaker_failure_threshold,
+            reset_seconds=settings.ollama_breaker_reset_seconds,
+        )
+        self.client: httpx.AsyncClient | None = None
+        self.slots = asyncio.Semaphore(config.max_concurrency)
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.latencies_ms: deque[float] = deque(maxlen=256)
+        # Smooth weighted round-robin state
+        self.current_weight = 0
+
+    def get_client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            limits = httpx.Limits(
+                # One connection over the slot count, kept free for unguarded health checks
+                max_connections=self.max_concurrency + 1,
+                max_keepalive_connections=min(
+                    self.max_concurrency, settings.ollama_max_keepalive_connections
+                ),
+                keepalive_expiry=settings.ollama_keepalive_expiry,
+            )
+            self.client = httpx.AsyncClient(
+                base_url=self.url,
+                limits=limits,
+                # Fail fast when the host is down, but give generations the full read timeout
+                timeout=httpx.Timeout(
+                    settings.ollama_timeout, connect=settings.ollama_connect_timeout
+                ),
+            )
+        return self.client
+
+    def routable(self) -> bool:
+        return self.breaker.accepts_requests()
+
+    def stats(self) -> dict:
+        ordered = sorted(self.latencies_ms)
+
+        def pct(q: float) -> float | None:
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1) if ordered else None
+
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_ms_p50": pct(0.5),
+            "latency_ms_p95": pct(0.95),
+            "circuit": self.breaker.stats(),
+        }
+
+
+_endpoints: list[Endpoint] = []
+
+
+def _endpoint_configs() -> list[OllamaEndpointConfig]:
+    if settings.ollama_endpoints:
+        return settings.ollama_endpoints
+    return [
+        OllamaEndpointConfig(
+            url=settings.ollama_base_url, max_concurrency=settings.ollama_max_connections
+        )
+    ]
+
+
+def endpoints() -> list[Endpoint]:
+    """Configured endpoints, created lazily outside the lifespan (e.g. scripts)."""
+    if not _endpoints:
+        _endpoints.extend(Endpoint(config) for config in _endpoint_configs())
+    return _endpoints
+
+
+def start_client() -> None:
+    """Create the endpoint connection pools. Called once from the app lifespan."""
+    for endpoint in endpoints():
+        endpoint.get_client()
+    logger.info(
+        "Ollama client started: %s (routing=%s)",
+        ", ".join(f"{e.url} x{e.max_concurrency}" for e in _endpoints),
+        settings.ollama_routing,
+    )
+
+
+async def close_client() -> None:
+    """Close every endpoint's client and release pooled connections."""
+    for endpoint in _endpoints:
+        if endpoint.client is not None:
+            await endpoint.client.aclose()
+    _endpoints.clear()
+    logger.info("Ollama client closed")
+
+
+def is_transport_error(exc: BaseException) -> bool:
+    """Connection, timeout and 5xx errors: the backend is unhealthy, not the output."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, OllamaUnavailable))
+
+
+def retry_in() -> float:
+    """Seconds until any endpoint accepts requests again (0 if one is available now)."""
+    return min(endpoint.breaker.retry_in() for endpoint in endpoints())
+
+
+def is_available() -> bool:
+    return retry_in() == 0
+
+
+def _pick() -> Endpoint:
+    candidates = [endpoint for endpoint in endpoints() if endpoint.routable()]
+    if not candidates:
+        raise OllamaUnavailable(
+            f"All Ollama endpoints are unavailable (retry in {retry_in():.0f}s)"
+        )
+    chosen = candidates[0] if len(candidates) == 1 else _choose(candidates)
+    # Claimed here, with no await since the routable() check, so a burst sends one probe
+    chosen.breaker.start_probe()
+    return chosen
+
+
+def _choose(candidates: list[Endpoint]) -> Endpoint:
+    if settings.ollama_routing == "round_robin":
+        # Smooth weighted round-robin (as in nginx): even spread, proportional to weight
+        total = sum(endpoint.weight for endpoint in candidates)
+        for endpoint in candidates:
+            endpoint.current_weight += endpoint.weight
+        chosen = max(candidates, key=lambda e: e.current_weight)
+        chosen.current_weight -= total
+        return chosen
+
+    # Least loaded relative to weight, preferring endpoints with a free slot
+    return min(
+        candidates,
+        key=lambda e: (e.in_flight >= e.max_concurrency, (e.in_flight + 1) / e.weight),
+    )
+
+
+def pool_stats() -> dict:
+    return {**_stats, "max_connections": sum(e.max_concurrency for e in endpoints())}
+
+
+def endpoint_stats() -> list[dict]:
+    return [endpoint.stats() for endpoint in endpoints()]
+
+
+@asynccontextmanager
+async def _track(endpoint: Endpoint, guarded: bool = True):
+    """Hold a concurrency slot on ``endpoint`` and record the request's outcome.
+
+    Unguarded requests (health checks) skip the slots: generations can hold
+    every one of them for up to ``ollama_timeout``.
+    """
+    _stats["requests"] += 1
+    _stats["in_flight"] += 1
+    _stats["peak_in_flight"] = max(_stats["peak_in_flight"], _stats["in_flight"])
+    if guarded and endpoint.in_flight >= endpoint.max_concurrency:
+        _stats["saturated_count"] += 1
+        logger.warning(
+            "Ollama endpoint %s saturated: %d requests in flight, %d max",
+            endpoint.url,
+            endpoint.in_flight,
+            endpoint.max_concurrency,
+        )
+    # _pick() claimed the probe just before this, with no await in between
+    probe = guarded and endpoint.breaker.state == "half_open"
+    queued = time.perf_counter()
+    try:
+        async with endpoint.slots if guarded else nullcontext():
+            if guarded:
+                metrics.OLLAMA_SLOT_WAIT_SECONDS.labels(endpoint.url).observe(time.perf_counter() - queued)
+                endpoint.breaker.before_request()
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+            started = time.perf_counter()
+            try:
+                yield
+            except Exception as exc:
+                if guarded and is_transport_error(exc):
+                    endpoint.failures += 1
+                    metrics.OLLAMA_REQUEST_FAILURES.labels(endpoint.url).inc()
+                    was_open = endpoint.breaker.state == "open"
+                    endpoint.breaker.record_failure()
+                    if endpoint.breaker.state == "open" and not was_open:
+                        logger.warning("Ollama endpoint %s ejected: %s", endpoint.url, exc)
+                raise
+            else:
+                if guarded:
+                    if endpoint.breaker.state != "closed":
+                        logger.info("Ollama endpoint %s healthy again", endpoint.url)
+                    endpoint.breaker.record_success()
+                elapsed = time.perf_counter() - started
+                endpoint.latencies_ms.append(elapsed * 1000)
+                metrics.OLLAMA_REQUEST_SECONDS.labels(endpoint.url).observe(elapsed)
+            finally:
+                endpoint.in_flight -= 1
+    finally:
+        _stats["in_flight"] -= 1
+        # Also covers a probe cancelled while still waiting for a slot
+        if probe:
+            endpoint.breaker.abandon_probe()
+
+
+def _check_status(response: httpx.Response) -> None:
+    # Surface 5xx inside the breaker so an overloaded or crashing server gets ejected
+    if response.status_code >= 500:
+        response.raise_for_status()
+
+
+async def post(path: str, endpoint: Endpoint | None = None, **kwargs) -> httpx.Response:
+    """POST to the routed (or given) endpoint through its circuit breaker."""
+    endpoint = endpoint or _pick()
+    async with _track(endpoint):
+        response = await endpoint.get_client().post(path, **kwargs)
+        _check_status(response)
+        return response
+
+
+async def get(path: str, endpoint: Endpoint | None = None, **kwargs) -> httpx.Response:
+    """Unguarded GET for health checks: it bypasses the circuit breaker and the concurrency slots."""
+    endpoint = endpoint or endpoints()[0]
+    async with _track(endpoint, guarded=False):
+        return await endpoint.get_client().get(path, **kwargs)
+
+
+@asynccontextmanager
+async def stream(method: str, path: str, **kwargs):
+    """Streaming request to the routed endpoint through its circuit breaker."""
+    endpoint = _pick()
+    async with _track(endpoint):
+        async with endpoint.get_client().stream(method, path, **kwargs) as response:
+            if response.status_code >= 500:
+                await response.aread()
+            _check_status(response)
+            yield response
@@ -1,30 +1,64 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 import fitz  # PyMuPDF
 
+from app import metrics
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_pool: ProcessPoolExecutor | None = None
+# One slot per worker process: a job only enters the pool once a process is free,
+# so the extraction timeout never counts time spent waiting in line
+_slots: asyncio.Semaphore | None = None
+
+# Extraction counters, reported by /health
+_stats = {
+    "extractions": 0,
+    "failures": 0,
+    "timeouts": 0,
+    "in_flight": 0,
+    "queue_wait_ms_max": 0.0,
+    "queue_wait_ms_total": 0.0,
+    "extract_ms_max": 0.0,
+    "extract_ms_total": 0.0,
+}
 
-def extract_text_from_pdf(pdf_bytes: bytes) -> str:
+
+def extract_text_from_pdf(pdf_bytes: bytes, max_pages: int | None = None) -> str:
     """Extract text content from a PDF file's raw bytes.
 
     Args:
         pdf_bytes: Raw bytes of the uploaded PDF file.
+        max_pages: Reject documents with more pages than this.
 
     Returns:
         Extracted text with pages separated by newlines.
 
     Raises:
-        ValueError: If the PDF cannot be read or contains no extractable text.
+        ValueError: If the PDF cannot be read, is too long, or contains no extractable text.
     """
     try:
         doc = fitz.open(stream=pdf_bytes, filetype="pdf")
     except Exception as exc:
         raise ValueError(f"Could not open PDF: {exc}") from exc
 
-    pages_text: list[str] = []
-    for page in doc:
-        text = page.get_text("text")
-        if text:
-            pages_text.append(text.strip())
+    try:
+        if max_pages is not None and doc.page_count > max_pages:
+            raise ValueError(f"PDF has {doc.page_count} pages. Maximum is {max_pages}.")
 
-    doc.close()
+        pages_text: list[str] = []
+        for page in doc:
+            text = page.get_text("text")
+            if text:
+                pages_text.append(text.strip())
+    finally:
+        doc.close()
 
     full_text = "\n\n".join(pages_text).strip()
     if not full_text:
@@ -34,3 +68,124 @@ def extract_text_from_pdf(pdf_bytes: bytes) -> str:
         )
 
     return full_text
+
+
+def _extract_in_worker(pdf_bytes: bytes, max_pages: int) -> tuple[str, float, float]:
+    """Process-pool entry point. Returns the text plus wall-clock start and duration."""
+    started = time.time()
+    text = extract_text_from_pdf(pdf_bytes, max_pages=max_pages)
+    return text, started, time.time() - started
+
+
+def start_pool() -> ProcessPoolExecutor:
+    """Create the extraction process pool. Called once from the app lifespan."""
+    global _pool, _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.pdf_workers)
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.pdf_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info("PDF extraction pool started (%d processes)", settings.pdf_workers)
+    return _pool
+
+
+def stop_pool() -> None:
+    global _pool, _slots
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+    _slots = None
+
+
+def _kill_pool(pool: ProcessPoolExecutor) -> None:
+    """Terminate worker processes so a runaway extraction does not hold a slot forever.
+
+    Only the pool the failed job ran on is killed; if it has already been
+    replaced, the new pool is left alone.
+    """
+    global _pool
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    if pool is _pool:
+        _pool = None
+        logger.warning("PDF extraction pool recycled")
+
+
+async def _run_in_pool(pdf_bytes: bytes) -> tuple[str, float, float]:
+    """Run one extraction once a worker is free; the timeout starts from there."""
+    start_pool()
+    async with _slots:
+        # Fetched inside the slot: the pool may have been recycled while this job waited
+        pool = start_pool()
+        future = asyncio.get_running_loop().run_in_executor(
+            pool, _extract_in_worker, pdf_bytes, settings.pdf_max_pages
+        )
+        try:
+            return await asyncio.wait_for(future, timeout=settings.pdf_timeout_seconds)
+        except asyncio.TimeoutError:
+            _kill_pool(pool)
+            raise
+        except BrokenProcessPool:
+            if pool is _pool:
+                _kill_pool(pool)
+            raise
+
+
+async def extract_text(pdf_bytes: bytes) -> str:
+    """Extract PDF text in the process pool, off the event loop.
+
+    Raises:
+        ValueError: If the PDF is invalid, too long, or exceeds the extraction timeout.
+    """
+    submitted = time.time()
+    _stats["in_flight"] += 1
+    try:
+        try:
+            text, started, duration = await _run_in_pool(pdf_bytes)
+        except BrokenProcessPool:
+            # Usually another job's timeout recycled the pool under this one; try once more
+            logger.warning("PDF extraction pool broke mid-job; retrying on a fresh pool")
+            text, started, duration = await _run_in_pool(pdf_bytes)
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        metrics.PDF_FAILURES.labels("timeout").inc()
+        raise ValueError(
+            f"PDF took longer than {settings.pdf_timeout_seconds:.0f}s to process. "
+            "Try a smaller or simpler file."
+        )
+    except BrokenProcessPool:
+        _stats["failures"] += 1
+        metrics.PDF_FAILURES.labels("crashed").inc()
+        raise ValueError("Could not process PDF. Please try again.")
+    except ValueError:
+        _stats["failures"] += 1
+        metrics.PDF_FAILURES.labels("invalid").inc()
+        raise
+    finally:
+        _stats["in_flight"] -= 1
+
+    wait_ms = max(0.0, started - submitted) * 1000
+    extract_ms = duration * 1000
+    _stats["extractions"] += 1
+    _stats["queue_wait_ms_total"] += wait_ms
+    _stats["queue_wait_ms_max"] = max(_stats["queue_wait_ms_max"], wait_ms)
+    _stats["extract_ms_total"] += extract_ms
+    _stats["extract_ms_max"] = max(_stats["extract_ms_max"], extract_ms)
+    metrics.PDF_QUEUE_WAIT_SECONDS.observe(wait_ms / 1000)
+    metrics.PDF_EXTRACT_SECONDS.observe(duration)
+    logger.info("PDF extracted in %.0fms (queued %.0fms, %d chars)", extract_ms, wait_ms, len(text))
+    return text
+
+
+def pool_stats() -> dict:
+    done = _stats["extractions"] or 1
+    return {
+        "workers": settings.pdf_workers,
+        **{key: round(value, 1) for key, value in _stats.items()},
+        "queue_wait_ms_avg": round(_stats["queue_wait_ms_total"] / done, 1),
+        "extract_ms_avg": round(_stats["extract_ms_total"] / done, 1),
+    }
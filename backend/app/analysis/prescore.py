@@ -0,0 +1,254 @@
+import math
+import re
+from collections import Counter, deque
+
+from app.schemas import PreScoreResult
+
+# Canonical skill name -> extra aliases (the lowercased canonical name is always matched).
+# Ambiguous short names (Go, R, C) are only matched through unambiguous aliases.
+SKILLS: dict[str, list[str]] = {
+    # Languages
+    "Python": [],
+    "Java": [],
+    "JavaScript": ["js", "ecmascript"],
+    "TypeScript": [],
+    "C++": ["cpp"],
+    "C#": ["csharp"],
+    "Go": ["golang"],
+    "Rust": [],
+    "Ruby": [],
+    "PHP": [],
+    "Kotlin": [],
+    "Swift": [],
+    "Scala": [],
+    "R": ["r programming", "rstudio"],
+    "SQL": [],
+    "Bash": ["shell scripting"],
+    "MATLAB": [],
+    # Web / backend
+    "FastAPI": [],
+    "Django": [],
+    "Flask": [],
+    "Spring Boot": ["spring framework"],
+    "Node.js": ["nodejs", "node"],
+    "Express.js": ["expressjs"],
+    "Ruby on Rails": ["rails"],
+    ".NET": ["dotnet", "asp.net"],
+    "REST APIs": ["restful", "rest api", "rest apis"],
+    "GraphQL": [],
+    "gRPC": [],
+    "Microservices": ["microservice"],
+    # Frontend
+    "React": ["react.js", "reactjs"],
+    "Angular": [],
+    "Vue": ["vue.js", "vuejs"],
+    "Next.js": ["nextjs"],
+    "HTML": ["html5"],
+    "CSS": ["css3"],
+    "Tailwind CSS": ["tailwind"],
+    "Redux": [],
+    # Data stores
+    "PostgreSQL": ["postgres"],
+    "MySQL": [],
+    "SQLite": [],
+    "MongoDB": ["mongo"],
+    "Redis": [],
+    "Elasticsearch": ["elastic search", "opensearch"],
+    "Cassandra": [],
+    "DynamoDB": [],
+    "Snowflake": [],
+    "BigQuery": [],
+    # Cloud / infra
+    "AWS": ["amazon web services", "ec2", "s3", "lambda"],
+    "GCP": ["google cloud", "google cloud platform"],
+    "Azure": ["microsoft azure"],
+    "Docker": ["containerization", "containers"],
+    "Kubernetes": ["k8s"],
+    "Terraform": [],
+    "Ansible": [],
+    "CI/CD": ["continuous integration", "continuous delivery", "continuous deployment"],
+    "GitHub Actions": [],
+    "Jenkins": [],
+    "Linux": ["unix"],
+    "Git": ["github", "gitlab"],
+    "Nginx": [],
+    "Kafka": ["apache kafka"],
+    "RabbitMQ": [],
+    "Serverless": [],
+    "Observability": ["prometheus", "grafana", "datadog"],
+    # Data / ML
+    "Machine Learning": ["ml"],
+    "Deep Learning": [],
+    "NLP": ["natural language processing"],
+    "Computer Vision": [],
+    "LLMs": ["llm", "large language models", "large language model"],
+    "PyTorch": [],
+    "TensorFlow": [],
+    "scikit-learn": ["sklearn"],
+    "Pandas": [],
+    "NumPy": [],
+    "Spark": ["pyspark", "apache spark"],
+    "Airflow": ["apache airflow"],
+    "dbt": [],
+    "ETL": ["data pipelines", "data pipeline"],
+    "Data Analysis": ["data analytics"],
+    "Statistics": ["statistical analysis"],
+    "Tableau": [],
+    "Power BI": ["powerbi"],
+    "Microsoft Excel": ["ms excel", "advanced excel", "excel spreadsheets"],
+    # Practices
+    "Agile": ["scrum", "kanban"],
+    "Test Automation": ["unit testing", "pytest", "jest", "selenium", "tdd"],
+    "System Design": ["distributed systems"],
+    "Security": ["cybersecurity", "owasp"],
+    "Project Management": ["pmp"],
+    "Product Management": [],
+    "Leadership": ["team lead", "mentoring"],
+    "Communication": ["stakeholder management"],
+    "UX Design": ["ux", "ui/ux", "figma"],
+    # Mobile
+    "iOS": [],
+    "Android": [],
+    "React Native": [],
+    "Flutter": [],
+}
+
+_STOPWORDS = frozenset(
+    """a about above after again against all also am an and any are as at be because been
+    before being below between both but by can could did do does doing down during each
+    etc few for from further had has have having he her here hers him his how i if in into
+    is it its itself just me more most my no nor not now of off on once only or other our
+    ours out over own same she should so some such than that the their them then there
+    these they this those through to too under until up very was we were what when where
+    which while who whom why will with would you your yours work working experience years
+    year strong ability skills team role including using plus preferred required""".split()
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+
+class SkillMatcher:
+    """Aho-Corasick automaton over skill aliases; finds every alias in one pass over the text."""
+
+    def __init__(self, aliases: dict[str, str]) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[tuple[int, str]]] = [[]]
+
+        for alias, canonical in aliases.items():
+            node = 0
+            for ch in alias:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(alias), canonical))
+
+        # Breadth-first construction of failure links
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for ch, child in self._goto[node].items():
+                pending.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> set[str]:
+        """Canonical names of all skills mentioned as whole words in ``text``."""
+        text = text.lower()
+        found: set[str] = set()
+        node = 0
+        for end, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for length, canonical in self._out[node]:
+                start = end - length + 1
+                if _is_boundary(text, start - 1) and _is_boundary(text, end + 1):
+                    found.add(canonical)
+        return found
+
+
+def _is_boundary(text: str, index: int) -> bool:
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+
+def _build_matcher() -> SkillMatcher:
+    aliases: dict[str, str] = {}
+    for canonical, extra in SKILLS.items():
+        names = extra if len(canonical) <= 2 and canonical.isalpha() else [canonical, *extra]
+        for name in names:
+            aliases[name.lower()] = canonical
+    return SkillMatcher(aliases)
+
+
+_matcher: SkillMatcher | None = None
+
+
+def extract_skills(text: str) -> set[str]:
+    global _matcher
+    if _matcher is None:
+        _matcher = _build_matcher()
+    return _matcher.find(text)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS and not t.isdigit()]
+
+
+def _weights(tokens: list[str], idf: dict[str, float] | None) -> dict[str, float]:
+    counts = Counter(tokens)
+    default_idf = max(idf.values(), default=1.0) if idf else 1.0
+    return {
+        term: (1.0 + math.log(count)) * (idf.get(term, default_idf) if idf else 1.0)
+        for term, count in counts.items()
+    }
+
+
+def text_similarity(a: str, b: str, idf: dict[str, float] | None = None) -> float:
+    """Cosine similarity of sparse log-TF (optionally TF-IDF) vectors, in [0, 1]."""
+    wa = _weights(tokenize(a), idf)
+    wb = _weights(tokenize(b), idf)
+    if not wa or not wb:
+        return 0.0
+    if len(wa) > len(wb):
+        wa, wb = wb, wa
+    dot = sum(weight * wb.get(term, 0.0) for term, weight in wa.items())
+    norm = math.sqrt(sum(w * w for w in wa.values())) * math.sqrt(sum(w * w for w in wb.values()))
+    return dot / norm if norm else 0.0
+
+
+def prescore(
+    resume_text: str,
+    job_description: str,
+    idf: dict[str, float] | None = None,
+) -> PreScoreResult:
+    """Deterministic, CPU-only provisional match score.
+
+    Skill coverage of the job description dominates; lexical similarity
+    fills in when the job description names few known skills. Pass ``idf``
+    (term -> inverse document frequency) from a corpus for TF-IDF weighting.
+    """
+    job_skills = extract_skills(job_description)
+    resume_skills = extract_skills(resume_text)
+    matched = sorted(job_skills & resume_skills)
+    missing = sorted(job_skills - resume_skills)
+    similarity = text_similarity(resume_text, job_description, idf)
+
+    if job_skills:
+        score = 100.0 * (0.75 * len(matched) / len(job_skills) + 0.25 * similarity)
+    else:
+        score = 100.0 * similarity
+
+    return PreScoreResult(
+        match_score=round(max(0.0, min(100.0, score)), 1),
+        matched_skills=matched,
+        missing_skills=missing,
+    )
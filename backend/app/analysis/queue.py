@@ -0,0 +1,195 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models import Analysis
+from app.analysis import ollama_client
+from app.analysis.cache import prune_expired
+from app.analysis.service import run_analysis
+
+logger = logging.getLogger(__name__)
+
+_workers: list[asyncio.Task] = []
+_wakeup: asyncio.Event | None = None
+# Jobs this process is running, handed back to the queue on shutdown
+_running: set[str] = set()
+
+
+async def queue_depth(db: AsyncSession) -> int:
+    result = await db.execute(
+        select(func.count()).select_from(Analysis).where(Analysis.status == "pending")
+    )
+    return result.scalar()
+
+
+async def is_full(db: AsyncSession, incoming: int = 1) -> bool:
+    """True if accepting ``incoming`` more jobs would exceed the queue limit."""
+    return await queue_depth(db) + incoming > settings.analysis_queue_max_size
+
+
+def notify() -> None:
+    """Wake idle workers after a new job has been committed."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def _stale_cutoff() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=settings.analysis_job_timeout_seconds)
+
+
+async def recover_stuck_jobs(stale_before: datetime) -> int:
+    """Return ``processing`` rows whose worker has not sent a heartbeat since ``stale_before``.
+
+    Jobs that workers in other processes are still running keep their
+    heartbeat fresh, so they are left alone however long they take.
+    """
+    last_seen = func.coalesce(Analysis.heartbeat_at, Analysis.started_at)
+    stmt = update(Analysis).where(
+        Analysis.status == "processing",
+        or_(last_seen.is_(None), last_seen < stale_before),
+    )
+
+    async with async_session() as db:
+        result = await db.execute(stmt.values(status="pending", started_at=None, heartbeat_at=None))
+        await db.commit()
+
+    if result.rowcount:
+        logger.warning("Re-queued %d analyses stuck in processing", result.rowcount)
+    return result.rowcount
+
+
+async def _claim_next() -> str | None:
+    """Claim the oldest pending job, preferring users with the fewest jobs running."""
+    running = (
+        select(Analysis.user_id, func.count().label("running"))
+        .where(Analysis.status == "processing")
+        .group_by(Analysis.user_id)
+        .subquery()
+    )
+    candidates = (
+        select(Analysis.id)
+        .outerjoin(running, running.c.user_id == Analysis.user_id)
+        .where(Analysis.status == "pending")
+        .order_by(func.coalesce(running.c.running, 0), Analysis.created_at)
+        .limit(5)
+    )
+
+    async with async_session() as db:
+        ids = (await db.execute(candidates)).scalars().all()
+        for analysis_id in ids:
+            # Conditional update so only one worker (or process) wins each row
+            now = datetime.now(timezone.utc)
+            result = await db.execute(
+                update(Analysis)
+                .where(Analysis.id == analysis_id, Analysis.status == "pending")
+                .values(status="processing", started_at=now, heartbeat_at=now)
+            )
+            await db.commit()
+            if result.rowcount == 1:
+                return analysis_id
+    return None
+
+
+async def _heartbeat(analysis_id: str) -> None:
+    """Keep a running job's heartbeat fresh so recovery leaves it alone."""
+    while True:
+        await asyncio.sleep(settings.analysis_heartbeat_seconds)
+        try:
+            async with async_session() as db:
+                await db.execute(
+                    update(Analysis)
+                    .where(Analysis.id == analysis_id, Analysis.status == "processing")
+                    .values(heartbeat_at=datetime.now(timezone.utc))
+                )
+                await db.commit()
+        except Exception:
+            logger.exception("Heartbeat for analysis %s failed", analysis_id)
+
+
+async def _run(index: int, analysis_id: str) -> None:
+    _running.add(analysis_id)
+    heartbeat = asyncio.create_task(_heartbeat(analysis_id))
+    try:
+        await run_analysis(analysis_id)
+    except Exception:
+        logger.exception("Worker %d crashed on analysis %s", index, analysis_id)
+    finally:
+        heartbeat.cancel()
+    # Not reached when cancelled, so stop_workers() can re-queue the job
+    _running.discard(analysis_id)
+
+
+async def _worker(index: int) -> None:
+    while True:
+        # Leave jobs pending while every Ollama endpoint is ejected rather than failing them
+        backoff = ollama_client.retry_in()
+        if backoff > 0:
+            await asyncio.sleep(min(backoff, settings.analysis_queue_poll_seconds))
+            continue
+
+        _wakeup.clear()
+        try:
+            analysis_id = await _claim_next()
+        except Exception:
+            logger.exception("Worker %d failed to claim a job", index)
+            analysis_id = None
+
+        if analysis_id is not None:
+            await _run(index, analysis_id)
+            continue
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=settings.analysis_queue_poll_seconds)
+        except asyncio.TimeoutError:
+            if index == 0:
+                try:
+                    await recover_stuck_jobs(_stale_cutoff())
+                except Exception:
+                    logger.exception("Stale job recovery failed")
+                try:
+                    async with async_session() as db:
+                        await prune_expired(db)
+                except Exception:
+                    logger.exception("Result cache pruning failed")
+
+
+async def start_workers() -> None:
+    """Recover abandoned jobs and start the worker pool. Called from the app lifespan.
+
+    Only stale rows are recovered: other processes sharing the database may
+    be running the rest.
+    """
+    global _wakeup
+    _wakeup = asyncio.Event()
+    await recover_stuck_jobs(_stale_cutoff())
+    for i in range(settings.analysis_workers):
+        _workers.append(asyncio.create_task(_worker(i), name=f"analysis-worker-{i}"))
+    logger.info("Started %d analysis workers", settings.analysis_workers)
+
+
+async def stop_workers() -> None:
+    """Cancel workers and put the jobs they were running back in the queue."""
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    if not _running:
+        return
+    try:
+        async with async_session() as db:
+            await db.execute(
+                update(Analysis)
+                .where(Analysis.id.in_(_running), Analysis.status == "processing")
+                .values(status="pending", started_at=None, heartbeat_at=None)
+            )
+            await db.commit()
+        logger.info("Re-queued %d interrupted analyses", len(_running))
+    except Exception:
+        # Left processing; another process recovers them once their heartbeat goes stale
+        logger.exception("Could not re-queue interrupted analyses")
+    _running.clear()
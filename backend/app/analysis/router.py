@@ -1,18 +1,44 @@
+import asyncio
 import json
 import logging
+import math
 import uuid
+from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Query, Request, UploadFile, status
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, func, or_, select, true
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 
-from app.database import get_db
+from app.config import settings
+from app.database import async_session, get_db
 from app.middleware.rate_limiter import limiter
-from app.models import Analysis, User
-from app.schemas import AnalysisCreateResponse, AnalysisListItem, AnalysisResponse, PaginatedAnalyses
-from app.auth.dependencies import get_current_user
-from app.analysis.pdf_parser import extract_text_from_pdf
-from app.analysis.service import create_analysis_record, run_analysis
+from app.models import Analysis, AnalysisBatch, User
+from app.pagination import decode_cursor, encode_cursor
+from app.schemas import (
+    AnalysisCreateResponse,
+    AnalysisListItem,
+    AnalysisResponse,
+    AnalysisTimings,
+    BatchCreateResponse,
+    BatchItem,
+    BatchResponse,
+    PaginatedAnalyses,
+    Percentiles,
+    SkillCount,
+    TimingSummary,
+)
+from app.auth.dependencies import get_current_user, require_admin
+from app.analysis.uploads import clean_job_description, read_resume_timed
+from app.analysis import admission, events, queue
+from app.analysis.prescore import prescore
+from app.analysis.service import (
+    complete_from_prescore,
+    count_user_analyses,
+    create_analysis_record,
+    invalidate_user_count,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -26,76 +52,321 @@ def _is_valid_uuid(val: str) -> bool:
         return False
 
 
-def _safe_json_loads(val: str | None) -> list[str] | None:
-    if not val:
-        return None
-    try:
-        return json.loads(val)
-    except (json.JSONDecodeError, TypeError):
-        return None
+def _timings(analysis: Analysis) -> AnalysisTimings:
+    return AnalysisTimings(
+        **(analysis.timings or {}),
+        prompt_tokens=analysis.prompt_tokens,
+        completion_tokens=analysis.completion_tokens,
+        model=analysis.model_name,
+    )
+
+
+def _to_response(analysis: Analysis, include_timings: bool = False) -> AnalysisResponse:
+    return AnalysisResponse(
+        id=analysis.id,
+        status=analysis.status,
+        job_description=analysis.job_description,
+        match_score=analysis.match_score,
+        matched_skills=analysis.matched_skills,
+        missing_skills=analysis.missing_skills,
+        suggestions=analysis.suggestions,
+        prescore=analysis.prescore,
+        prescreened_out=analysis.prescreened_out,
+        input_trimming=analysis.input_trimming,
+        timings=_timings(analysis) if include_timings else None,
+        error_message=analysis.error_message,
+        created_at=analysis.created_at,
+        completed_at=analysis.completed_at,
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _check_queue_capacity(db: AsyncSession, incoming: int = 1) -> None:
+    # Backpressure: refuse new work instead of growing the queue without bound
+    if await queue.is_full(db, incoming=incoming):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analysis queue is full. Please try again shortly.",
+            headers={"Retry-After": str(settings.analysis_retry_after_seconds)},
+        )
+
+
+async def _admit(db: AsyncSession, user_id: str, cost: float) -> None:
+    # Charge the estimated GPU time; the charge commits together with the new analyses
+    rejection = await admission.admit(db, user_id, cost)
+    if rejection is None:
+        return
+    await db.rollback()
+    retry_after = str(max(1, math.ceil(min(rejection.retry_after, 3600))))
+    if rejection.bucket == "user":
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Analysis quota exceeded. Please try again later.",
+            headers={"Retry-After": retry_after},
+        )
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Analysis capacity is fully booked. Please try again shortly.",
+        headers={"Retry-After": retry_after},
+    )
 
 
 @router.post("/", response_model=AnalysisCreateResponse, status_code=status.HTTP_202_ACCEPTED)
-@limiter.limit("10/hour")
+@limiter.limit(settings.analysis_rate_limit)
 async def create_analysis(
     request: Request,
-    background_tasks: BackgroundTasks,
     resume: UploadFile = File(...),
     job_description: str = Form(...),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Upload a resume PDF and job description to start an AI analysis."""
-    # Validate file type
-    if not resume.filename or not resume.filename.lower().endswith(".pdf"):
+    resume_text, parse_ms = await read_resume_timed(resume)
+    jd = clean_job_description(job_description)
+    await _check_queue_capacity(db)
+    cost = admission.estimate_gpu_seconds(resume_text, jd)
+    await _admit(db, current_user.id, cost)
+
+    # Create DB record with an instant local estimate the UI can show right away
+    analysis = create_analysis_record(
+        db=db,
+        user_id=current_user.id,
+        resume_text=resume_text,
+        job_description=jd,
+        resume_filename=resume.filename,
+        prescore=await asyncio.to_thread(prescore, resume_text, jd),
+        parse_ms=parse_ms,
+        estimated_gpu_seconds=cost,
+    )
+    await db.commit()
+    await db.refresh(analysis)
+
+    # Hand off to the worker pool
+    queue.notify()
+    logger.info("Analysis %s queued by user %s", analysis.id, current_user.id)
+
+    return AnalysisCreateResponse(id=analysis.id, status=analysis.status)
+
+
+@router.post("/batch", response_model=BatchCreateResponse, status_code=status.HTTP_202_ACCEPTED)
+@limiter.limit(settings.analysis_rate_limit)
+async def create_batch(
+    request: Request,
+    resumes: list[UploadFile] = File(...),
+    job_descriptions: list[str] = Form(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Score one resume against many job descriptions, or many resumes against one.
+
+    Every input is parsed once; the resulting analyses go through the normal
+    worker pool, so LLM concurrency stays bounded by ``ANALYSIS_WORKERS``.
+    """
+    if len(resumes) > 1 and len(job_descriptions) > 1:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only PDF files are accepted",
+            detail="Send either one resume with many job descriptions, or many resumes with one job description",
         )
-
-    # Read and parse PDF
-    pdf_bytes = await resume.read()
-    if len(pdf_bytes) > 10 * 1024 * 1024:  # 10MB limit
+    size = max(len(resumes), len(job_descriptions))
+    if size > settings.batch_max_items:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File too large. Maximum size is 10MB.",
+            detail=f"Batch too large. Maximum {settings.batch_max_items} items.",
         )
 
-    try:
-        resume_text = extract_text_from_pdf(pdf_bytes)
-    except ValueError as exc:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=str(exc),
+    jds = [clean_job_description(jd) for jd in job_descriptions]
+    parsed = await asyncio.gather(*(read_resume_timed(r) for r in resumes))
+    await _check_queue_capacity(db, incoming=size)
+
+    if len(resumes) == 1:
+        pairs = [(resumes[0].filename, parsed[0], jd) for jd in jds]
+    else:
+        pairs = [(r.filename, text_and_ms, jds[0]) for r, text_and_ms in zip(resumes, parsed)]
+
+    batch = AnalysisBatch(user_id=current_user.id)
+    db.add(batch)
+    await db.flush()
+    analyses = []
+    for filename, (resume_text, parse_ms), jd in pairs:
+        estimate = await asyncio.to_thread(prescore, resume_text, jd)
+        analysis = create_analysis_record(
+            db=db,
+            user_id=current_user.id,
+            resume_text=resume_text,
+            job_description=jd,
+            resume_filename=filename,
+            batch_id=batch.id,
+            prescore=estimate,
+            parse_ms=parse_ms,
         )
+        # Clear non-matches never reach the LLM, so only the rest are charged
+        if estimate.match_score < settings.prescore_skip_below:
+            complete_from_prescore(analysis, estimate)
+        else:
+            analysis.estimated_gpu_seconds = admission.estimate_gpu_seconds(resume_text, jd)
+        analyses.append(analysis)
+    await _admit(db, current_user.id, sum(a.estimated_gpu_seconds or 0.0 for a in analyses))
+    await db.commit()
 
-    jd = job_description.strip()
-    if not jd:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Job description cannot be empty",
+    queue.notify()
+    logger.info("Batch %s (%d analyses) queued by user %s", batch.id, len(analyses), current_user.id)
+
+    return BatchCreateResponse(
+        id=batch.id,
+        items=[AnalysisCreateResponse(id=a.id, status=a.status) for a in analyses],
+    )
+
+
+@router.get("/batch/{batch_id}", response_model=BatchResponse)
+async def get_batch(
+    batch_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Per-item status of a batch, ranked by match score (best first)."""
+    if not _is_valid_uuid(batch_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid batch ID format")
+
+    result = await db.execute(
+        select(AnalysisBatch).where(
+            AnalysisBatch.id == batch_id,
+            AnalysisBatch.user_id == current_user.id,
         )
-    if len(jd) > 50_000:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Job description too long. Maximum 50,000 characters.",
+    )
+    batch = result.scalar_one_or_none()
+    if batch is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+
+    result = await db.execute(
+        select(
+            Analysis.id,
+            Analysis.status,
+            Analysis.match_score,
+            Analysis.resume_filename,
+            Analysis.job_description_preview,
+            Analysis.prescreened_out,
+            Analysis.error_message,
         )
+        .where(Analysis.batch_id == batch_id)
+        .order_by(Analysis.match_score.is_(None), Analysis.match_score.desc(), Analysis.created_at)
+    )
+    items = [BatchItem.model_validate(row, from_attributes=True) for row in result]
 
-    # Create DB record
-    analysis = create_analysis_record(
-        db=db,
-        user_id=current_user.id,
-        resume_text=resume_text,
-        job_description=jd,
+    counts = {s: sum(1 for i in items if i.status == s) for s in ("pending", "processing", "completed", "failed")}
+    if counts["pending"] + counts["processing"] == 0:
+        batch_status = "completed"
+    elif counts["processing"] or counts["completed"] or counts["failed"]:
+        batch_status = "processing"
+    else:
+        batch_status = "pending"
+
+    return BatchResponse(
+        id=batch.id,
+        status=batch_status,
+        created_at=batch.created_at,
+        counts=counts,
+        items=items,
     )
-    await db.commit()
-    await db.refresh(analysis)
 
-    # Kick off background processing
-    background_tasks.add_task(run_analysis, analysis.id)
-    logger.info("Analysis %s created by user %s", analysis.id, current_user.id)
 
-    return AnalysisCreateResponse(id=analysis.id, status=analysis.status)
+@router.get("/stats/skills", response_model=list[SkillCount])
+async def skill_stats(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    kind: str = Query("missing", pattern="^(missing|matched)$"),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """Most common missing (or matched) skills across the user's completed analyses.
+
+    The JSON arrays are unnested and counted in the database.
+    """
+    column = Analysis.missing_skills if kind == "missing" else Analysis.matched_skills
+    if db.bind.dialect.name == "postgresql":
+        elements = func.jsonb_array_elements_text(column).table_valued("value")
+    else:
+        elements = func.json_each(column).table_valued("value")
+
+    skill = func.lower(func.trim(elements.c.value))
+    result = await db.execute(
+        select(func.min(elements.c.value).label("skill"), func.count().label("count"))
+        .select_from(Analysis)
+        .join(elements, true())
+        .where(Analysis.user_id == current_user.id, Analysis.status == "completed")
+        .group_by(skill)
+        .order_by(func.count().desc(), skill)
+        .limit(limit)
+    )
+    return [SkillCount(skill=row.skill, count=row.count) for row in result]
+
+
+_TIMING_STAGES = (
+    "parse_ms",
+    "queued_ms",
+    "model_load_ms",
+    "prompt_eval_ms",
+    "generation_ms",
+    "llm_total_ms",
+    "db_write_ms",
+)
+
+
+def _percentiles(values: list[float]) -> Percentiles:
+    ordered = sorted(values)
+
+    def pct(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+    return Percentiles(
+        count=len(ordered),
+        p50=pct(0.5),
+        p90=pct(0.9),
+        p95=pct(0.95),
+        p99=pct(0.99),
+        max=round(ordered[-1], 1),
+    )
+
+
+@router.get("/admin/timings", response_model=TimingSummary)
+async def timing_summary(
+    _admin: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db),
+    hours: int = Query(24, ge=1, le=24 * 30),
+    limit: int = Query(5000, ge=1, le=50_000),
+):
+    """Per-stage latency percentiles over the most recent completed analyses (admin only)."""
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    result = await db.execute(
+        select(Analysis.timings, Analysis.model_name, Analysis.prompt_tokens, Analysis.completion_tokens)
+        .where(Analysis.status == "completed", Analysis.created_at >= since)
+        .order_by(Analysis.created_at.desc())
+        .limit(limit)
+    )
+    rows = result.all()
+
+    samples: dict[str, list[float]] = {
+        stage: [] for stage in (*_TIMING_STAGES, "prompt_tokens", "completion_tokens")
+    }
+    models: dict[str, int] = {}
+    for timings, model_name, prompt_tokens, completion_tokens in rows:
+        for stage in _TIMING_STAGES:
+            if timings and timings.get(stage) is not None:
+                samples[stage].append(timings[stage])
+        if prompt_tokens is not None:
+            samples["prompt_tokens"].append(prompt_tokens)
+        if completion_tokens is not None:
+            samples["completion_tokens"].append(completion_tokens)
+        if model_name:
+            models[model_name] = models.get(model_name, 0) + 1
+
+    return TimingSummary(
+        analyses=len(rows),
+        since=since,
+        stages={stage: _percentiles(values) for stage, values in samples.items() if values},
+        models=models,
+    )
 
 
 @router.get("/{analysis_id}", response_model=AnalysisResponse)
@@ -103,13 +374,16 @@ async def get_analysis(
     analysis_id: str,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    include: str | None = Query(None, description="Comma-separated extras to include: timings"),
 ):
     """Get the status and results of a specific analysis."""
     if not _is_valid_uuid(analysis_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid analysis ID format")
 
     result = await db.execute(
-        select(Analysis).where(
+        select(Analysis)
+        .options(undefer(Analysis.job_description))
+        .where(
             Analysis.id == analysis_id,
             Analysis.user_id == current_user.id,
         )
@@ -118,17 +392,76 @@ async def get_analysis(
     if analysis is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Analysis not found")
 
-    return AnalysisResponse(
-        id=analysis.id,
-        status=analysis.status,
-        job_description=analysis.job_description,
-        match_score=analysis.match_score,
-        matched_skills=_safe_json_loads(analysis.matched_skills),
-        missing_skills=_safe_json_loads(analysis.missing_skills),
-        suggestions=_safe_json_loads(analysis.suggestions),
-        error_message=analysis.error_message,
-        created_at=analysis.created_at,
-        completed_at=analysis.completed_at,
+    extras = {part.strip() for part in include.split(",")} if include else set()
+    return _to_response(analysis, include_timings="timings" in extras)
+
+
+@router.get("/{analysis_id}/stream")
+async def stream_analysis(
+    analysis_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Stream status transitions, tokens and parsed fields of an analysis as Server-Sent Events.
+
+    Events: ``status``, ``prescore`` (the instant local estimate), ``token``,
+    ``field`` (one completed top-level JSON key), ``retry``, and finally ``completed`` or ``failed`` carrying the full result.
+    """
+    if not _is_valid_uuid(analysis_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid analysis ID format")
+
+    result = await db.execute(
+        select(Analysis.id).where(
+            Analysis.id == analysis_id,
+            Analysis.user_id == current_user.id,
+        )
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Analysis not found")
+
+    async def load() -> Analysis | None:
+        async with async_session() as session:
+            row = await session.execute(
+                select(Analysis)
+                .options(undefer(Analysis.job_description))
+                .where(Analysis.id == analysis_id)
+            )
+            return row.scalar_one_or_none()
+
+    async def event_stream():
+        # Subscribe before reading the row so no transition is missed in between
+        with events.subscribe(analysis_id) as inbox:
+            analysis = await load()
+            if analysis is None:
+                return
+            yield _sse("status", {"status": analysis.status})
+            if analysis.prescore:
+                yield _sse("prescore", analysis.prescore)
+
+            while analysis is not None and analysis.status not in events.TERMINAL_EVENTS:
+                try:
+                    event, data = await asyncio.wait_for(
+                        inbox.get(), timeout=settings.analysis_stream_keepalive_seconds
+                    )
+                except asyncio.TimeoutError:
+                    # The job may be running in another worker process; fall back to the row
+                    analysis = await load()
+                    if analysis is not None and analysis.status not in events.TERMINAL_EVENTS:
+                        yield ": keep-alive\n\n"
+                    continue
+
+                if event in events.TERMINAL_EVENTS:
+                    analysis = await load()
+                else:
+                    yield _sse(event, data)
+
+            if analysis is not None:
+                yield _sse(analysis.status, _to_response(analysis).model_dump(mode="json"))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -152,8 +485,12 @@ async def delete_analysis(
     if analysis is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Analysis not found")
 
+    if analysis.status == "pending":
+        # Never reached the GPU: give back what it was charged
+        await admission.refund(db, current_user.id, analysis.estimated_gpu_seconds or 0.0)
     await db.delete(analysis)
     await db.commit()
+    invalidate_user_count(current_user.id)
     logger.info("Analysis %s deleted by user %s", analysis_id, current_user.id)
 
 
@@ -163,33 +500,46 @@ async def list_analyses(
     db: AsyncSession = Depends(get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="Opaque next_cursor from the previous page"),
+    include_total: bool = Query(True),
 ):
-    """List analyses for the current user, newest first, with pagination."""
-    # Total count
-    count_result = await db.execute(
-        select(func.count()).select_from(Analysis).where(Analysis.user_id == current_user.id)
-    )
-    total = count_result.scalar()
+    """List analyses for the current user, newest first.
 
-    # Paginated results
-    result = await db.execute(
-        select(Analysis)
+    Pass ``next_cursor`` back as ``cursor`` for keyset pagination, which stays
+    fast on deep pages. ``skip`` is still honoured when no cursor is given.
+    """
+    # Only the narrow columns the list view needs
+    query = (
+        select(
+            Analysis.id,
+            Analysis.status,
+            Analysis.match_score,
+            Analysis.job_description_preview,
+            Analysis.created_at,
+        )
         .where(Analysis.user_id == current_user.id)
-        .order_by(Analysis.created_at.desc())
-        .offset(skip)
-        .limit(limit)
+        .order_by(Analysis.created_at.desc(), Analysis.id.desc())
+        .limit(limit + 1)
     )
-    analyses = result.scalars().all()
-
-    items = [
-        AnalysisListItem(
-            id=a.id,
-            status=a.status,
-            match_score=a.match_score,
-            job_description_preview=a.job_description[:120] + ("..." if len(a.job_description) > 120 else ""),
-            created_at=a.created_at,
+    if cursor is not None:
+        created_at, last_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                Analysis.created_at < created_at,
+                and_(Analysis.created_at == created_at, Analysis.id < last_id),
+            )
         )
-        for a in analyses
-    ]
+    elif skip:
+        query = query.offset(skip)
+
+    rows = (await db.execute(query)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [AnalysisListItem.model_validate(row, from_attributes=True) for row in rows]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+
+    # The exact total comes from a short-lived per-user counter
+    total = await count_user_analyses(db, current_user.id) if include_total else None
 
-    return PaginatedAnalyses(items=items, total=total, has_more=(skip + limit) < total)
+    return PaginatedAnalyses(items=items, total=total, has_more=has_more, next_cursor=next_cursor)
@@ -1,54 +1,179 @@
-import json
+import asyncio
 import logging
+import time
 from datetime import datetime, timezone
 
-from sqlalchemy import select
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import undefer
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import metrics
+from app.config import settings
 from app.database import async_session
 from app.models import Analysis
-from app.analysis.ai_engine import analyze_resume
+from app.schemas import AIAnalysisResult, PreScoreResult
+from app.analysis import admission, events, ollama_client
+from app.analysis.ai_engine import analyze_resume, prepare_inputs
+from app.analysis.cache import get_cached_result, make_key, store_result
 
 logger = logging.getLogger(__name__)
 
+# user_id -> (expires_at, analysis count), so list pages do not COUNT(*) every time
+_count_cache: dict[str, tuple[float, int]] = {}
+
+
+def _add_timings(analysis: Analysis, **stages: float | None) -> None:
+    # Assign a new dict so the JSON column is flagged as changed
+    analysis.timings = {
+        **(analysis.timings or {}),
+        **{name: round(ms, 1) for name, ms in stages.items() if ms is not None},
+    }
+
+
+async def _commit_with_timing(db: AsyncSession) -> float:
+    """Commit the analysis row and return how long the write took, in ms."""
+    started = time.perf_counter()
+    await db.commit()
+    return (time.perf_counter() - started) * 1000
+
+
+async def _finish(
+    db: AsyncSession,
+    analysis: Analysis,
+    db_write_ms: float,
+    cache_key: str | None = None,
+    ai_result: AIAnalysisResult | None = None,
+) -> None:
+    """Bookkeeping once listeners have been notified, in a single commit.
+
+    Records the result write's own duration, settles the admission charge
+    and, given a fresh result, stores it in the cache.
+    """
+    _add_timings(analysis, db_write_ms=db_write_ms)
+    await db.execute(
+        update(Analysis).where(Analysis.id == analysis.id).values(timings=analysis.timings)
+    )
+    await admission.settle(db, analysis)
+    if ai_result is not None:
+        await store_result(db, cache_key, ai_result)
+    await db.commit()
+
+
+def _record_usage(analysis: Analysis, usage: dict, llm_total_ms: float | None) -> None:
+    """Store the token counts and GPU stage timings Ollama reported, across all attempts."""
+    analysis.prompt_tokens = usage.get("prompt_tokens")
+    analysis.completion_tokens = usage.get("completion_tokens")
+    _add_timings(
+        analysis,
+        model_load_ms=usage.get("model_load_ms"),
+        prompt_eval_ms=usage.get("prompt_eval_ms"),
+        generation_ms=usage.get("generation_ms"),
+        llm_total_ms=llm_total_ms,
+    )
+
+
+def _apply_result(analysis: Analysis, ai_result: AIAnalysisResult) -> None:
+    analysis.match_score = ai_result.match_score
+    analysis.matched_skills = ai_result.matched_skills
+    analysis.missing_skills = ai_result.missing_skills
+    analysis.suggestions = ai_result.suggestions
+    analysis.status = "completed"
+    analysis.completed_at = datetime.now(timezone.utc)
+
 
 async def run_analysis(analysis_id: str) -> None:
-    """Background task: call Ollama AI, save results."""
+    """Queue worker job: call Ollama AI, save results.
+
+    The queue has already moved the row to ``processing`` when this runs.
+    """
     async with async_session() as db:
         result = await db.execute(
-            select(Analysis).where(Analysis.id == analysis_id)
+            select(Analysis)
+            .options(undefer(Analysis.resume_text), undefer(Analysis.job_description))
+            .where(Analysis.id == analysis_id)
         )
         analysis = result.scalar_one_or_none()
         if analysis is None:
             logger.error("Analysis %s not found", analysis_id)
             return
+        queued_ms = None
+        if analysis.started_at is not None:
+            queued = max(0.0, (analysis.started_at - analysis.created_at).total_seconds())
+            metrics.ANALYSIS_QUEUE_WAIT_SECONDS.observe(queued)
+            queued_ms = queued * 1000
+        started = time.perf_counter()
 
-        # Mark as processing
-        analysis.status = "processing"
-        await db.commit()
+        # Serve repeated resume/job description pairs from the cache
+        cache_key = make_key(analysis.resume_text, analysis.job_description)
+        cached = await get_cached_result(db, cache_key)
+        # Only touch the row after the lookup: an autoflush would open a write
+        # transaction and hold the SQLite lock for the whole generation
+        _add_timings(analysis, queued_ms=queued_ms)
+        if cached is not None:
+            _apply_result(analysis, cached)
+            # The cache key includes the model, so this is the model that produced the result
+            analysis.model_name = settings.ollama_model
+            db_write_ms = await _commit_with_timing(db)
+            metrics.ANALYSIS_DURATION_SECONDS.labels("cached").observe(time.perf_counter() - started)
+            events.publish(analysis_id, "completed", {})
+            logger.info("Analysis %s: completed from cache (score=%.1f)", analysis_id, cached.match_score)
+            await _finish(db, analysis, db_write_ms)
+            return
+
+        events.publish(analysis_id, "status", {"status": "processing"})
         logger.info("Analysis %s: processing started", analysis_id)
 
+        def on_event(event: str, data: dict) -> None:
+            events.publish(analysis_id, event, data)
+
         try:
-            # Call Ollama AI
-            ai_result = await analyze_resume(
-                analysis.resume_text, analysis.job_description
+            # Fit the inputs to the token budget, recording anything dropped
+            resume_text, job_description, analysis.input_trimming = await asyncio.to_thread(
+                prepare_inputs, analysis.resume_text, analysis.job_description
             )
 
+            # Call Ollama AI, streaming partial output to any listeners
+            ai_result = await analyze_resume(resume_text, job_description, on_event=on_event)
+
             # Save results
-            analysis.match_score = ai_result.match_score
-            analysis.matched_skills = json.dumps(ai_result.matched_skills)
-            analysis.missing_skills = json.dumps(ai_result.missing_skills)
-            analysis.suggestions = json.dumps(ai_result.suggestions)
-            analysis.status = "completed"
-            analysis.completed_at = datetime.now(timezone.utc)
+            _apply_result(analysis, ai_result)
+            analysis.model_name = settings.ollama_model
+            _record_usage(analysis, ai_result._usage, ai_result._usage.get("llm_total_ms"))
             logger.info("Analysis %s: completed (score=%.1f)", analysis_id, ai_result.match_score)
 
+        except ollama_client.OllamaUnavailable as exc:
+            # Every backend is down: put the job back instead of failing it;
+            # workers hold off claiming until an endpoint can be probed
+            logger.warning("Analysis %s re-queued: %s", analysis_id, exc)
+            analysis.status = "pending"
+            analysis.started_at = None
+            analysis.heartbeat_at = None
+            await db.commit()
+            metrics.ANALYSIS_DURATION_SECONDS.labels("requeued").observe(time.perf_counter() - started)
+            events.publish(analysis_id, "status", {"status": "pending"})
+            return
+
         except Exception as exc:
             logger.exception("Analysis %s failed: %s", analysis_id, exc)
             analysis.status = "failed"
             analysis.error_message = str(exc)
+            # Charge only the GPU time the failed attempts used; nothing if none reached Ollama
+            _record_usage(analysis, getattr(exc, "_usage", {}), (time.perf_counter() - started) * 1000)
+            await admission.settle(db, analysis)
+            await db.commit()
+            metrics.ANALYSIS_DURATION_SECONDS.labels("failed").observe(time.perf_counter() - started)
+            events.publish(analysis_id, "failed", {})
+            return
+
+        db_write_ms = await _commit_with_timing(db)
+        metrics.ANALYSIS_DURATION_SECONDS.labels("completed").observe(time.perf_counter() - started)
+        events.publish(analysis_id, "completed", {})
+        # A repaired (truncated) result is served once but never cached
+        await _finish(db, analysis, db_write_ms, cache_key, None if ai_result._repaired else ai_result)
+
 
-        await db.commit()
+def make_preview(job_description: str, length: int = 120) -> str:
+    return job_description[:length] + ("..." if len(job_description) > length else "")
 
 
 def create_analysis_record(
@@ -56,13 +181,54 @@ def create_analysis_record(
     user_id: str,
     resume_text: str,
     job_description: str,
+    resume_filename: str | None = None,
+    batch_id: str | None = None,
+    prescore: PreScoreResult | None = None,
+    parse_ms: float | None = None,
+    estimated_gpu_seconds: float | None = None,
 ) -> Analysis:
-    """Create a new pending analysis record."""
+    """Create a new pending analysis record. ``parse_ms`` is the PDF extraction time."""
     analysis = Analysis(
         user_id=user_id,
+        batch_id=batch_id,
+        # Postgres enforces the column length that SQLite ignores
+        resume_filename=resume_filename[:255] if resume_filename else None,
+        prescore=prescore.model_dump() if prescore else None,
         resume_text=resume_text,
         job_description=job_description,
+        job_description_preview=make_preview(job_description),
         status="pending",
+        timings={"parse_ms": round(parse_ms, 1)} if parse_ms is not None else None,
+        estimated_gpu_seconds=estimated_gpu_seconds,
     )
     db.add(analysis)
+    invalidate_user_count(user_id)
     return analysis
+
+
+def complete_from_prescore(analysis: Analysis, prescore: PreScoreResult) -> None:
+    """Finish a clear non-match from its local pre-score, skipping the LLM."""
+    analysis.match_score = prescore.match_score
+    analysis.matched_skills = prescore.matched_skills
+    analysis.missing_skills = prescore.missing_skills
+    analysis.prescreened_out = True
+    analysis.status = "completed"
+    analysis.completed_at = datetime.now(timezone.utc)
+
+
+async def count_user_analyses(db: AsyncSession, user_id: str) -> int:
+    """Number of analyses owned by a user, cached for a short TTL."""
+    entry = _count_cache.get(user_id)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+
+    result = await db.execute(
+        select(func.count()).select_from(Analysis).where(Analysis.user_id == user_id)
+    )
+    total = result.scalar()
+    _count_cache[user_id] = (time.monotonic() + settings.analysis_count_cache_ttl_seconds, total)
+    return total
+
+
+def invalidate_user_count(user_id: str) -> None:
+    _count_cache.pop(user_id, None)
@@ -0,0 +1,233 @@
+import math
+import re
+
+from app.analysis.prescore import extract_skills, tokenize
+
+# Job description sections made up mostly of these are dropped before ranking
+_BOILERPLATE_PATTERNS: dict[str, re.Pattern] = {
+    "eeo": re.compile(
+        r"equal (employment )?opportunity|without regard to (race|sex|gender)|"
+        r"reasonable accommodation|protected veteran|e-verify|affirmative action",
+        re.IGNORECASE,
+    ),
+    "benefits": re.compile(
+        r"\bbenefits\b|401\(?k\)?|paid time off|\bpto\b|health,? dental|dental and vision|"
+        r"parental leave|wellness (stipend|program)|perks",
+        re.IGNORECASE,
+    ),
+    "compensation": re.compile(
+        r"salary range|pay range|base pay|compensation (range|package)|pay transparency",
+        re.IGNORECASE,
+    ),
+    "legal": re.compile(
+        r"privacy (notice|policy)|recruitment agenc|unsolicited resumes|background check",
+        re.IGNORECASE,
+    ),
+}
+
+_RELEVANT_HEADINGS = re.compile(
+    r"requirements|qualifications|responsibilities|what you('ll| will) do|skills|"
+    r"experience|must have|nice to have|tech stack|you have|about the role",
+    re.IGNORECASE,
+)
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?;])\s+|\n+")
+# Share of a section's sentences that must be boilerplate for it to be dropped
+_BOILERPLATE_SHARE = 0.6
+
+_HEADER_RE = re.compile(r"^\s*(#+\s*\S.*|[A-Z][A-Za-z /&'-]{1,60}:?\s*|[A-Z0-9 /&'-]{3,60})$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough local token count (~4 characters per token for English with Llama/Mistral tokenizers)."""
+    return math.ceil(len(text) / 4)
+
+
+def _split_sections(text: str) -> list[str]:
+    """Split on blank lines and on header-looking lines, keeping each header with its body."""
+    sections: list[str] = []
+    current: list[str] = []
+    for line in text.splitlines():
+        if not line.strip():
+            if current:
+                sections.append("\n".join(current))
+                current = []
+            continue
+        if _HEADER_RE.match(line) and len(line.split()) <= 8 and current:
+            sections.append("\n".join(current))
+            current = []
+        current.append(line.rstrip())
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+
+def _preview(section: str, length: int = 80) -> str:
+    flat = " ".join(section.split())
+    return flat[:length] + ("..." if len(flat) > length else "")
+
+
+def _drop_repeated_lines(text: str, min_repeats: int = 3) -> tuple[str, list[str]]:
+    """Remove page headers/footers: short lines that recur on many pages (first copy kept)."""
+    counts: dict[str, int] = {}
+    for line in text.splitlines():
+        key = line.strip().lower()
+        if key and len(key) < 120:
+            counts[key] = counts.get(key, 0) + 1
+
+    repeated = {key for key, count in counts.items() if count >= min_repeats}
+    if not repeated:
+        return text, []
+
+    seen: set[str] = set()
+    kept: list[str] = []
+    for line in text.splitlines():
+        key = line.strip().lower()
+        if key in repeated:
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(line)
+    return "\n".join(kept), sorted(repeated)
+
+
+def _boilerplate_kind(section: str) -> str | None:
+    """The boilerplate category of a section that is mostly boilerplate, else None.
+
+    A section qualifies if its heading names a boilerplate topic ("Benefits")
+    or most of its sentences match; one mention of a background check in a
+    requirements list is not enough.
+    """
+    if extract_skills(section):
+        return None
+    heading = section.split("\n", 1)[0]
+    if _HEADER_RE.match(heading) and len(heading.split()) <= 8:
+        kind = next((k for k, p in _BOILERPLATE_PATTERNS.items() if p.search(heading)), None)
+        if kind:
+            return kind
+
+    sentences = [s for s in _SENTENCE_SPLIT_RE.split(section) if s.strip()]
+    hits: dict[str, int] = {}
+    for sentence in sentences:
+        kind = next((k for k, p in _BOILERPLATE_PATTERNS.items() if p.search(sentence)), None)
+        if kind:
+            hits[kind] = hits.get(kind, 0) + 1
+    if sentences and sum(hits.values()) / len(sentences) >= _BOILERPLATE_SHARE:
+        return max(hits, key=hits.get)
+    return None
+
+
+def _relevance(section: str, other_terms: set[str]) -> float:
+    skills = len(extract_skills(section))
+    terms = set(tokenize(section))
+    overlap = len(terms & other_terms) / (len(terms) or 1)
+    heading_bonus = 2.0 if _RELEVANT_HEADINGS.search(section.split("\n", 1)[0]) else 0.0
+    return skills * 2.0 + overlap * 5.0 + heading_bonus
+
+
+def _truncate(section: str, tokens: int) -> str:
+    """Cut a section to roughly ``tokens``, preferring a line or sentence boundary."""
+    limit = tokens * 4
+    if len(section) <= limit:
+        return section
+    cut = section[:limit]
+    boundary = max(cut.rfind("\n"), cut.rfind(". "))
+    return cut[: boundary + 1] if boundary > limit // 2 else cut
+
+
+def trim_document(
+    text: str,
+    budget: int,
+    other_text: str = "",
+    drop_boilerplate: bool = False,
+) -> tuple[str, dict]:
+    """Dedupe and rank the sections of one document, keeping it within ``budget`` tokens.
+
+    Sections are kept in their original order; the least relevant ones (fewest
+    skills, least overlap with ``other_text``) are dropped first when over budget.
+    Returns the trimmed text and a report of what was removed.
+    """
+    original_tokens = estimate_tokens(text)
+    dropped: list[dict] = []
+
+    text, repeated = _drop_repeated_lines(text)
+    dropped.extend({"reason": "repeated_line", "preview": _preview(line)} for line in repeated)
+
+    sections: list[str] = []
+    seen: set[str] = set()
+    for section in _split_sections(text):
+        key = " ".join(section.lower().split())
+        if key in seen:
+            dropped.append({"reason": "duplicate", "preview": _preview(section)})
+            continue
+        seen.add(key)
+
+        if drop_boilerplate:
+            kind = _boilerplate_kind(section)
+            if kind:
+                dropped.append({"reason": kind, "preview": _preview(section)})
+                continue
+        sections.append(section)
+
+    sizes = [estimate_tokens(s) for s in sections]
+    if sum(sizes) > budget:
+        other_terms = set(tokenize(other_text))
+        ranked = sorted(
+            range(len(sections)),
+            key=lambda i: _relevance(sections[i], other_terms),
+            reverse=True,
+        )
+        remaining = budget
+        keep: dict[int, str] = {}
+        for i in ranked:
+            if sizes[i] <= remaining:
+                keep[i] = sections[i]
+                remaining -= sizes[i]
+            elif remaining > 50:
+                keep[i] = _truncate(sections[i], remaining)
+                dropped.append({"reason": "budget_truncated", "preview": _preview(sections[i])})
+                remaining = 0
+            else:
+                dropped.append({"reason": "budget", "preview": _preview(sections[i])})
+        sections = [keep[i] for i in sorted(keep)]
+
+    trimmed = "\n\n".join(sections) if sections else text[: budget * 4]
+    report = {
+        "original_tokens": original_tokens,
+        "kept_tokens": estimate_tokens(trimmed),
+        "dropped": dropped,
+    }
+    return trimmed, report
+
+
+def fit_inputs(resume_text: str, job_description: str, budget: int) -> tuple[str, str, dict | None]:
+    """Fit resume + job description into ``budget`` prompt tokens.
+
+    The job description gets up to 45% of the budget and the resume the rest;
+    whatever one side does not use is given to the other. Returns the texts to
+    send and a report (``None`` if nothing was removed). Inputs that already
+    fit are sent untouched.
+    """
+    if estimate_tokens(resume_text) + estimate_tokens(job_description) <= budget:
+        return resume_text, job_description, None
+
+    jd_text, jd_report = trim_document(
+        job_description, budget, other_text=resume_text, drop_boilerplate=True
+    )
+    resume_text_deduped, resume_report = trim_document(resume_text, budget)
+
+    jd_tokens = jd_report["kept_tokens"]
+    resume_tokens = resume_report["kept_tokens"]
+    if jd_tokens + resume_tokens > budget:
+        jd_share = max(int(budget * 0.45), budget - resume_tokens)
+        jd_text, jd_report = trim_document(
+            job_description, min(jd_share, jd_tokens), other_text=resume_text, drop_boilerplate=True
+        )
+        resume_budget = budget - jd_report["kept_tokens"]
+        resume_text_deduped, resume_report = trim_document(
+            resume_text, resume_budget, other_text=jd_text
+        )
+
+    if not jd_report["dropped"] and not resume_report["dropped"]:
+        return resume_text, job_description, None
+    return resume_text_deduped, jd_text, {"resume": resume_report, "job_description": jd_report}
@@ -0,0 +1,53 @@
+import time
+
+from fastapi import HTTPException, UploadFile, status
+
+from app.analysis.pdf_parser import extract_text
+
+
+async def read_resume(resume: UploadFile) -> str:
+    """Validate an uploaded resume PDF and extract its text."""
+    # Validate file type
+    if not resume.filename or not resume.filename.lower().endswith(".pdf"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only PDF files are accepted",
+        )
+
+    # Read and parse PDF
+    pdf_bytes = await resume.read()
+    if len(pdf_bytes) > 10 * 1024 * 1024:  # 10MB limit
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File too large. Maximum size is 10MB.",
+        )
+
+    try:
+        return await extract_text(pdf_bytes)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{resume.filename}: {exc}",
+        )
+
+
+async def read_resume_timed(resume: UploadFile) -> tuple[str, float]:
+    """``read_resume`` plus the time it took in ms, recorded as the analysis parse stage."""
+    started = time.perf_counter()
+    text = await read_resume(resume)
+    return text, (time.perf_counter() - started) * 1000
+
+
+def clean_job_description(job_description: str) -> str:
+    jd = job_description.strip()
+    if not jd:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Job description cannot be empty",
+        )
+    if len(jd) > 50_000:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Job description too long. Maximum 50,000 characters.",
+        )
+    return jd
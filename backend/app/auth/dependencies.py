@@ -1,27 +1,103 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy import select
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.database import get_db
 from app.models import User
-from app.auth.utils import decode_access_token
+from app.auth.utils import decode_access_token_claims
 
 security = HTTPBearer()
 
+# user_id -> (expires_at, detached User snapshot)
+_user_cache: OrderedDict[str, tuple[float, User]] = OrderedDict()
+
+
+def _snapshot(user: User) -> User:
+    """Transient copy that is safe to share between requests and sessions."""
+    return User(
+        id=user.id,
+        email=user.email,
+        hashed_password=user.hashed_password,
+        created_at=user.created_at,
+    )
+
+
+def _cache_get(user_id: str) -> User | None:
+    entry = _user_cache.get(user_id)
+    if entry is None:
+        return None
+    expires_at, user = entry
+    if expires_at < time.monotonic():
+        del _user_cache[user_id]
+        return None
+    _user_cache.move_to_end(user_id)
+    return user
+
+
+def _cache_put(user: User) -> None:
+    if settings.auth_user_cache_ttl_seconds <= 0:
+        return
+    _user_cache[user.id] = (time.monotonic() + settings.auth_user_cache_ttl_seconds, _snapshot(user))
+    _user_cache.move_to_end(user.id)
+    while len(_user_cache) > settings.auth_user_cache_size:
+        _user_cache.popitem(last=False)
+
+
+def invalidate_user(user_id: str) -> None:
+    _user_cache.pop(user_id, None)
+
+
+def clear_user_cache() -> None:
+    _user_cache.clear()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_change(mapper, connection, target: User) -> None:
+    invalidate_user(target.id)
+
+
+def _user_from_claims(claims: dict) -> User | None:
+    """Build a User from token claims alone, for AUTH_TRUST_TOKEN_CLAIMS mode."""
+    try:
+        return User(
+            id=claims["sub"],
+            email=claims["email"],
+            created_at=datetime.fromisoformat(claims["created_at"]),
+        )
+    except (KeyError, TypeError, ValueError):
+        # Tokens issued before the claims were added fall back to a lookup
+        return None
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db),
 ) -> User:
     token = credentials.credentials
-    user_id = decode_access_token(token)
+    claims = decode_access_token_claims(token)
+    user_id = claims.get("sub") if claims else None
     if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
         )
 
+    if settings.auth_trust_token_claims:
+        user = _user_from_claims(claims)
+        if user is not None:
+            return user
+
+    user = _cache_get(user_id)
+    if user is not None:
+        return user
+
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
     if user is None:
@@ -29,4 +105,15 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
         )
+    _cache_put(user)
     return user
+
+
+async def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    """Allow only users listed in ``ADMIN_EMAILS``."""
+    if current_user.email.lower() not in {email.lower() for email in settings.admin_emails}:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    return current_user
@@ -8,13 +8,23 @@ from app.database import get_db
 from app.middleware.rate_limiter import limiter
 from app.models import User
 from app.schemas import LoginRequest, SignupRequest, TokenResponse, UserResponse
-from app.auth.utils import create_access_token, hash_password, verify_password
+from app.auth.utils import (
+    create_access_token,
+    hash_password_async,
+    password_needs_rehash,
+    verify_password_async,
+)
 from app.auth.dependencies import get_current_user
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def _token_claims(user: User) -> dict:
+    """Claims that let get_current_user skip the user lookup in trusted-claims mode."""
+    return {"email": user.email, "created_at": user.created_at.isoformat()}
+
+
 @router.post("/signup", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
 @limiter.limit("30/minute")
 async def signup(
@@ -30,13 +40,13 @@ async def signup(
             detail="Email already registered",
         )
 
-    user = User(email=body.email, hashed_password=hash_password(body.password))
+    user = User(email=body.email, hashed_password=await hash_password_async(body.password))
     db.add(user)
     await db.commit()
     await db.refresh(user)
 
     logger.info("New user signed up: %s", body.email)
-    token = create_access_token(user.id)
+    token = create_access_token(user.id, _token_claims(user))
     return TokenResponse(access_token=token)
 
 
@@ -50,15 +60,21 @@ async def login(
     result = await db.execute(select(User).where(User.email == body.email))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(body.password, user.hashed_password):
+    if not user or not await verify_password_async(body.password, user.hashed_password):
         logger.warning("Failed login attempt for: %s", body.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
 
+    # Upgrade the stored hash transparently when BCRYPT_ROUNDS changes
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await hash_password_async(body.password)
+        await db.commit()
+        logger.info("Rehashed password for: %s", body.email)
+
     logger.info("User logged in: %s", body.email)
-    token = create_access_token(user.id)
+    token = create_access_token(user.id, _token_claims(user))
     return TokenResponse(access_token=token)
 
 
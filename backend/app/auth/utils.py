@@ -1,3 +1,7 @@
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 import bcrypt
@@ -5,9 +9,16 @@ from jose import jwt
 
 from app.config import settings
 
+# bcrypt releases the GIL, so a small thread pool gives real parallelism
+# without letting a login burst starve the event loop or the default executor.
+_bcrypt_executor = ThreadPoolExecutor(
+    max_workers=settings.bcrypt_workers, thread_name_prefix="bcrypt"
+)
+
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    salt = bcrypt.gensalt(rounds=settings.bcrypt_rounds)
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -16,18 +27,61 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     )
 
 
-def create_access_token(user_id: str) -> str:
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was made with a different work factor than configured."""
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != settings.bcrypt_rounds
+
+
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_executor, hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _bcrypt_executor, verify_password, plain_password, hashed_password
+    )
+
+
+# token -> verified claims, so repeat requests with the same token skip signature checks
+_decoded_tokens: OrderedDict[str, dict] = OrderedDict()
+
+
+def create_access_token(user_id: str, claims: dict | None = None) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.jwt_expire_minutes)
-    payload = {"sub": user_id, "exp": expire}
+    payload = {**(claims or {}), "sub": user_id, "exp": expire}
     return jwt.encode(payload, settings.jwt_secret, algorithm=settings.jwt_algorithm)
 
 
-def decode_access_token(token: str) -> str | None:
-    """Returns user_id if valid, None otherwise."""
+def decode_access_token_claims(token: str) -> dict | None:
+    """Returns the verified claims if valid, None otherwise. Valid results are memoized."""
+    payload = _decoded_tokens.get(token)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            _decoded_tokens.move_to_end(token)
+            return payload
+        del _decoded_tokens[token]
+
     try:
         payload = jwt.decode(
             token, settings.jwt_secret, algorithms=[settings.jwt_algorithm]
         )
-        return payload.get("sub")
     except jwt.JWTError:
         return None
+
+    if settings.auth_token_cache_size > 0:
+        _decoded_tokens[token] = payload
+        while len(_decoded_tokens) > settings.auth_token_cache_size:
+            _decoded_tokens.popitem(last=False)
+    return payload
+
+
+def decode_access_token(token: str) -> str | None:
+    """Returns user_id if valid, None otherwise."""
+    payload = decode_access_token_claims(token)
+    return payload.get("sub") if payload else None
@@ -1,11 +1,73 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import settings
 
-engine = create_async_engine(settings.database_url, echo=False)
+
+def normalize_url(url: str) -> str:
+    """Use the async driver for plain ``postgres://`` / ``postgresql://`` URLs."""
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # WAL lets readers run alongside the single writer, and synchronous=NORMAL
+    # is durable under WAL except for the last commits on power loss
+    cursor = dbapi_connection.cursor()
+    # busy_timeout first: switching to WAL needs a lock another process may hold
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.close()
+
+
+def build_engine(url: str) -> AsyncEngine:
+    """Engine for ``url`` with pooling and per-backend tuning from settings."""
+    url = normalize_url(url)
+    backend = make_url(url).get_backend_name()
+    pool = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+    }
+
+    if backend == "postgresql":
+        return create_async_engine(
+            url,
+            **pool,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            connect_args={
+                # SQLAlchemy's and asyncpg's own statement caches
+                "prepared_statement_cache_size": settings.db_statement_cache_size,
+                "statement_cache_size": settings.db_statement_cache_size,
+            },
+        )
+
+    if backend == "sqlite":
+        in_memory = make_url(url).database in (None, "", ":memory:")
+        if in_memory:
+            engine = create_async_engine(url)
+        else:
+            # aiosqlite defaults to a new connection (and thread) per session
+            engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, **pool)
+        if settings.sqlite_tuning and not in_memory:
+            event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+        return engine
+
+    return create_async_engine(url, **pool, pool_pre_ping=settings.db_pool_pre_ping)
+
+
+engine = build_engine(settings.database_url)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
 async def get_db() -> AsyncSession:  # type: ignore[misc]
     async with async_session() as session:
         yield session
+
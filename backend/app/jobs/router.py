@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Response, UploadFile, status
+from sqlalchemy import and_, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+
+from app.database import get_db
+from app.models import Analysis, JobPosting, User
+from app.pagination import decode_cursor, encode_cursor
+from app.schemas import (
+    JobMatch,
+    JobPostingCreate,
+    JobPostingListItem,
+    JobPostingResponse,
+    PaginatedJobPostings,
+)
+from app.auth.dependencies import get_current_user
+from app.analysis.prescore import prescore
+from app.analysis.uploads import read_resume
+from app.jobs.service import content_hash, index_posting, remove_posting, search_postings
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def _is_valid_uuid(val: str) -> bool:
+    try:
+        uuid.UUID(val)
+        return True
+    except ValueError:
+        return False
+
+
+async def _get_owned_posting(db: AsyncSession, posting_id: str, user: User) -> JobPosting:
+    if not _is_valid_uuid(posting_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid job posting ID format")
+
+    result = await db.execute(
+        select(JobPosting)
+        .options(undefer(JobPosting.description))
+        .where(JobPosting.id == posting_id, JobPosting.user_id == user.id)
+    )
+    posting = result.scalar_one_or_none()
+    if posting is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job posting not found")
+    return posting
+
+
+async def _find_duplicate(db: AsyncSession, user_id: str, digest: str) -> JobPosting | None:
+    result = await db.execute(
+        select(JobPosting)
+        .options(undefer(JobPosting.description))
+        .where(JobPosting.user_id == user_id, JobPosting.content_hash == digest)
+    )
+    return result.scalar_one_or_none()
+
+
+def _duplicate_conflict(duplicate: JobPosting | None) -> HTTPException:
+    detail = "An identical job posting already exists"
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"{detail} ({duplicate.id})" if duplicate is not None else detail,
+    )
+
+
+@router.post("/", response_model=JobPostingResponse, status_code=status.HTTP_201_CREATED)
+async def create_job_posting(
+    body: JobPostingCreate,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Add a job posting to the library. Re-posting the same description returns the existing one."""
+    # Read up front: a rollback expires the user if it was loaded in this session
+    user_id = current_user.id
+    description = body.description.strip()
+    digest = content_hash(description)
+
+    existing = await _find_duplicate(db, user_id, digest)
+    if existing is not None:
+        response.status_code = status.HTTP_200_OK
+        return existing
+
+    posting = JobPosting(
+        user_id=user_id,
+        title=body.title.strip(),
+        company=body.company,
+        description=description,
+        content_hash=digest,
+    )
+    db.add(posting)
+    await db.flush()
+    await index_posting(db, posting, description)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Same description stored concurrently
+        await db.rollback()
+        response.status_code = status.HTTP_200_OK
+        return await _find_duplicate(db, user_id, digest)
+
+    logger.info("Job posting %s created by user %s", posting.id, user_id)
+    return posting
+
+
+@router.get("/", response_model=PaginatedJobPostings)
+async def list_job_postings(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None),
+):
+    """List the user's job postings, newest first, with keyset pagination."""
+    query = (
+        select(JobPosting)
+        .where(JobPosting.user_id == current_user.id)
+        .order_by(JobPosting.created_at.desc(), JobPosting.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        created_at, last_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                JobPosting.created_at < created_at,
+                and_(JobPosting.created_at == created_at, JobPosting.id < last_id),
+            )
+        )
+
+    postings = (await db.execute(query)).scalars().all()
+    has_more = len(postings) > limit
+    postings = postings[:limit]
+
+    return PaginatedJobPostings(
+        items=[JobPostingListItem.model_validate(p) for p in postings],
+        has_more=has_more,
+        next_cursor=encode_cursor(postings[-1].created_at, postings[-1].id) if has_more else None,
+    )
+
+
+@router.post("/match", response_model=list[JobMatch])
+async def match_job_postings(
+    resume: UploadFile | None = File(None),
+    analysis_id: str | None = Form(None),
+    top_k: int = Form(10, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Find the best stored postings for a resume, without calling the LLM.
+
+    Send either a resume PDF or the id of an existing analysis to reuse its resume.
+    """
+    if resume is not None:
+        resume_text = await read_resume(resume)
+    elif analysis_id is not None and _is_valid_uuid(analysis_id):
+        result = await db.execute(
+            select(Analysis.resume_text).where(
+                Analysis.id == analysis_id,
+                Analysis.user_id == current_user.id,
+            )
+        )
+        resume_text = result.scalar_one_or_none()
+        if resume_text is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Analysis not found")
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide a resume PDF or a valid analysis_id",
+        )
+
+    ranked, idf = await search_postings(db, current_user.id, resume_text, top_k)
+
+    def score_all() -> list[JobMatch]:
+        return [
+            JobMatch(
+                posting=JobPostingListItem.model_validate(posting),
+                relevance=round(relevance, 3),
+                prescore=prescore(resume_text, posting.description, idf),
+            )
+            for posting, relevance in ranked
+        ]
+
+    return await asyncio.to_thread(score_all)
+
+
+@router.get("/{posting_id}", response_model=JobPostingResponse)
+async def get_job_posting(
+    posting_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    return await _get_owned_posting(db, posting_id, current_user)
+
+
+@router.put("/{posting_id}", response_model=JobPostingResponse)
+async def update_job_posting(
+    posting_id: str,
+    body: JobPostingCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Replace a posting and re-index only its own terms."""
+    user_id = current_user.id
+    posting = await _get_owned_posting(db, posting_id, current_user)
+    description = body.description.strip()
+    digest = content_hash(description)
+
+    if digest != posting.content_hash:
+        duplicate = await _find_duplicate(db, user_id, digest)
+        if duplicate is not None:
+            raise _duplicate_conflict(duplicate)
+
+    posting.title = body.title.strip()
+    posting.company = body.company
+    posting.description = description
+    posting.content_hash = digest
+    posting.updated_at = datetime.now(timezone.utc)
+    try:
+        await index_posting(db, posting, description)
+        await db.commit()
+    except IntegrityError:
+        # The same description was stored concurrently
+        await db.rollback()
+        raise _duplicate_conflict(await _find_duplicate(db, user_id, digest))
+    return posting
+
+
+@router.delete("/{posting_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_job_posting(
+    posting_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    posting = await _get_owned_posting(db, posting_id, current_user)
+    await remove_posting(db, posting)
+    await db.commit()
+    logger.info("Job posting %s deleted by user %s", posting_id, current_user.id)
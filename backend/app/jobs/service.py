@@ -0,0 +1,125 @@
+import hashlib
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+
+from app.config import settings
+from app.models import JobPosting, JobPostingTerm
+from app.analysis.prescore import extract_skills, tokenize
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+
+def content_hash(description: str) -> str:
+    """Dedup key: the description with case and whitespace normalized."""
+    normalized = _WHITESPACE_RE.sub(" ", description).strip().lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _document_terms(text: str) -> tuple[Counter, list[str], int]:
+    tokens = [t[:64] for t in tokenize(text)]
+    skills = sorted(extract_skills(text))
+    terms = Counter(tokens)
+    # Skills are indexed as their own terms so aliases ("k8s", "kubernetes") meet
+    for skill in skills:
+        terms[f"skill:{skill.lower()}"[:64]] += 2
+    return terms, skills, len(tokens)
+
+
+async def index_posting(db: AsyncSession, posting: JobPosting, description: str) -> None:
+    """(Re)build the inverted-index rows of a single posting. The caller commits."""
+    terms, skills, doc_length = _document_terms(f"{posting.title}\n{description}")
+    posting.skills = skills
+    posting.doc_length = doc_length
+
+    await db.execute(delete(JobPostingTerm).where(JobPostingTerm.posting_id == posting.id))
+    if terms:
+        await db.execute(
+            insert(JobPostingTerm),
+            [
+                {"posting_id": posting.id, "user_id": posting.user_id, "term": term, "tf": tf}
+                for term, tf in terms.items()
+            ],
+        )
+
+
+def _query_terms(terms: Counter) -> list[str]:
+    """At most ``job_match_max_query_terms`` terms: skills first, then the most frequent words."""
+    ranked = [term for term, _ in terms.most_common()]
+    skills = [term for term in ranked if term.startswith("skill:")]
+    words = [term for term in ranked if not term.startswith("skill:")]
+    return (skills + words)[: settings.job_match_max_query_terms]
+
+
+async def remove_posting(db: AsyncSession, posting: JobPosting) -> None:
+    await db.execute(delete(JobPostingTerm).where(JobPostingTerm.posting_id == posting.id))
+    await db.delete(posting)
+
+
+async def search_postings(
+    db: AsyncSession, user_id: str, resume_text: str, top_k: int
+) -> tuple[list[tuple[JobPosting, float]], dict[str, float]]:
+    """Rank the user's postings against a resume with BM25 over the inverted index.
+
+    Returns the top-k postings (descriptions loaded) with their relevance, plus
+    the IDF table of the query terms for follow-up scoring.
+    """
+    query_terms, _, _ = _document_terms(resume_text)
+    if not query_terms:
+        return [], {}
+
+    stats = await db.execute(
+        select(func.count(), func.avg(JobPosting.doc_length)).where(JobPosting.user_id == user_id)
+    )
+    total_docs, avg_length = stats.one()
+    if not total_docs:
+        return [], {}
+    avg_length = float(avg_length or 1.0)
+
+    df_rows = await db.execute(
+        select(JobPostingTerm.term, func.count())
+        .where(JobPostingTerm.user_id == user_id, JobPostingTerm.term.in_(_query_terms(query_terms)))
+        .group_by(JobPostingTerm.term)
+    )
+    idf = {
+        term: math.log((total_docs - df + 0.5) / (df + 0.5) + 1.0)
+        for term, df in df_rows
+    }
+    if not idf:
+        return [], {}
+
+    # Keep skills plus the most selective terms; common words add rows but little signal
+    skill_terms = [t for t in idf if t.startswith("skill:")]
+    other_terms = sorted((t for t in idf if not t.startswith("skill:")), key=idf.get, reverse=True)
+    selected = skill_terms + other_terms[: settings.job_match_max_terms]
+
+    postings_rows = await db.execute(
+        select(JobPostingTerm.posting_id, JobPostingTerm.term, JobPostingTerm.tf, JobPosting.doc_length)
+        .join(JobPosting, JobPosting.id == JobPostingTerm.posting_id)
+        .where(JobPostingTerm.user_id == user_id, JobPostingTerm.term.in_(selected))
+    )
+    scores: dict[str, float] = defaultdict(float)
+    for posting_id, term, tf, doc_length in postings_rows:
+        norm = tf + _K1 * (1 - _B + _B * doc_length / avg_length)
+        scores[posting_id] += idf[term] * tf * (_K1 + 1) / norm
+
+    best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+    if not best:
+        return [], idf
+
+    result = await db.execute(
+        select(JobPosting)
+        .options(undefer(JobPosting.description))
+        .where(JobPosting.id.in_([posting_id for posting_id, _ in best]))
+    )
+    by_id = {p.id: p for p in result.scalars()}
+    return [(by_id[posting_id], score) for posting_id, score in best if posting_id in by_id], idf
@@ -1,18 +1,25 @@
+import asyncio
 import logging
 import time
 from contextlib import asynccontextmanager
 
-import httpx
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy import text
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import func, select, text
 
+from app import metrics
+from app.analysis import admission, ollama_client, pdf_parser, queue
+from app.analysis.ai_engine import output_stats, warm_up
+from app.analysis.cache import cache_stats
 from app.config import settings
-from app.database import engine, async_session
-from app.models import Base
+from app.database import async_session, engine
+from app.migrations.runner import upgrade as migrate
+from app.migrations.versions import MIGRATIONS
+from app.models import Analysis
 from app.auth.router import router as auth_router
 from app.analysis.router import router as analysis_router
+from app.jobs.router import router as jobs_router
 from app.middleware.rate_limiter import limiter, rate_limit_exceeded_handler
 
 from slowapi.errors import RateLimitExceeded
@@ -25,14 +32,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger("app")
 
+metrics.instrument_engine(engine)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Create tables on startup
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("Database tables created / verified")
+    if settings.db_migrate_on_startup:
+        applied = await migrate(engine, MIGRATIONS)
+        logger.info("Database schema up to date (%d migrations applied)", len(applied))
+    ollama_client.start_client()
+    # Don't block startup on model load; the first job simply waits if needed
+    warm_up_task = asyncio.create_task(warm_up()) if settings.ollama_warm_up else None
+    pdf_parser.start_pool()
+    await queue.start_workers()
     yield
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+    await queue.stop_workers()
+    pdf_parser.stop_pool()
+    await ollama_client.close_client()
 
 
 app = FastAPI(
@@ -69,15 +87,20 @@ async def global_exception_handler(request: Request, exc: Exception):
 # ── Request Logging Middleware ────────────────────────────────────────────────
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start = time.time()
+    start = time.perf_counter()
     response = await call_next(request)
-    duration_ms = (time.time() - start) * 1000
+    duration = time.perf_counter() - start
+    # Label by route template (/analysis/{analysis_id}), not the raw path, to bound cardinality
+    route = request.scope.get("route")
+    metrics.HTTP_REQUEST_SECONDS.labels(
+        request.method, route.path if route is not None else "unmatched", response.status_code
+    ).observe(duration)
     logger.info(
         "%s %s -> %d (%.0fms)",
         request.method,
         request.url.path,
         response.status_code,
-        duration_ms,
+        duration * 1000,
     )
     return response
 
@@ -85,6 +108,7 @@ async def log_requests(request: Request, call_next):
 # ── Routers ───────────────────────────────────────────────────────────────────
 app.include_router(auth_router, prefix="/auth", tags=["Auth"])
 app.include_router(analysis_router, prefix="/analysis", tags=["Analysis"])
+app.include_router(jobs_router, prefix="/jobs", tags=["Jobs"])
 
 
 # ── Health Check ──────────────────────────────────────────────────────────────
@@ -96,6 +120,8 @@ async def health():
     try:
         async with async_session() as session:
             await session.execute(text("SELECT 1"))
+            result["queue_depth"] = await queue.queue_depth(session)
+            result["admission_backlog_seconds"] = await admission.backlog_seconds(session)
         result["database"] = "connected"
     except Exception:
         result["database"] = "disconnected"
@@ -103,17 +129,50 @@ async def health():
 
     # Check Ollama
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.get(f"{settings.ollama_base_url}/api/tags")
-            if resp.status_code == 200:
-                models = [m["name"] for m in resp.json().get("models", [])]
-                has_model = any(settings.ollama_model in m for m in models)
-                result["ollama"] = "connected" if has_model else f"connected (model '{settings.ollama_model}' not found)"
-            else:
-                result["ollama"] = "error"
-                result["status"] = "degraded"
+        resp = await ollama_client.get("/api/tags", timeout=5.0)
+        if resp.status_code == 200:
+            models = [m["name"] for m in resp.json().get("models", [])]
+            has_model = any(settings.ollama_model in m for m in models)
+            result["ollama"] = "connected" if has_model else f"connected (model '{settings.ollama_model}' not found)"
+        else:
+            result["ollama"] = "error"
+            result["status"] = "degraded"
     except Exception:
         result["ollama"] = "disconnected"
         result["status"] = "degraded"
 
+    result["ollama_pool"] = ollama_client.pool_stats()
+    result["ollama_endpoints"] = ollama_client.endpoint_stats()
+    if any(e["circuit"]["state"] != "closed" for e in result["ollama_endpoints"]):
+        result["status"] = "degraded"
+    result["llm_output"] = output_stats()
+    result["result_cache"] = cache_stats()
+    result["pdf_pool"] = pdf_parser.pool_stats()
+
     return result
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint. Point-in-time gauges are refreshed on each scrape."""
+    try:
+        async with async_session() as session:
+            rows = await session.execute(
+                select(Analysis.status, func.count())
+                .where(Analysis.status.in_(("pending", "processing")))
+                .group_by(Analysis.status)
+            )
+            backlog = dict(rows.all())
+        for status in ("pending", "processing"):
+            metrics.QUEUE_BACKLOG.labels(status).set(backlog.get(status, 0))
+    except Exception:
+        logger.exception("Could not read queue backlog for metrics")
+    metrics.QUEUE_BACKLOG.labels("pdf_extracting").set(pdf_parser.pool_stats()["in_flight"])
+
+    for endpoint in ollama_client.endpoint_stats():
+        metrics.OLLAMA_IN_FLIGHT.labels(endpoint["url"]).set(endpoint["in_flight"])
+        metrics.OLLAMA_CIRCUIT_OPEN.labels(endpoint["url"]).set(endpoint["circuit"]["state"] == "open")
+
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,117 @@
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Buckets sized for this app: fast API calls up to multi-minute CPU generations
+_FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+_SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+# ── HTTP ──────────────────────────────────────────────────────────────────────
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=_FAST_BUCKETS + (10.0, 30.0),
+)
+
+# ── Database ──────────────────────────────────────────────────────────────────
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution time",
+    ["operation"],
+    buckets=_FAST_BUCKETS,
+)
+
+# ── PDF extraction ────────────────────────────────────────────────────────────
+PDF_EXTRACT_SECONDS = Histogram(
+    "pdf_extract_duration_seconds", "PDF text extraction time in the worker process", buckets=_FAST_BUCKETS
+)
+PDF_QUEUE_WAIT_SECONDS = Histogram(
+    "pdf_queue_wait_seconds", "Time a PDF waited for a free extraction process", buckets=_FAST_BUCKETS
+)
+PDF_FAILURES = Counter("pdf_extract_failures_total", "PDF extractions that failed", ["reason"])
+
+# ── Analysis queue ────────────────────────────────────────────────────────────
+ANALYSIS_QUEUE_WAIT_SECONDS = Histogram(
+    "analysis_queue_wait_seconds", "Time from submission until a worker claimed the job", buckets=_SLOW_BUCKETS
+)
+ANALYSIS_DURATION_SECONDS = Histogram(
+    "analysis_duration_seconds", "Worker time per analysis, by outcome", ["outcome"], buckets=_SLOW_BUCKETS
+)
+QUEUE_BACKLOG = Gauge("analysis_queue_backlog", "Analyses by queue state", ["status"])
+ADMISSION_REJECTED = Counter(
+    "analysis_admission_rejected_total", "Submissions refused by admission control", ["bucket"]
+)
+
+# ── Ollama ────────────────────────────────────────────────────────────────────
+OLLAMA_SLOT_WAIT_SECONDS = Histogram(
+    "ollama_slot_wait_seconds",
+    "Time a request waited for a concurrency slot on an endpoint",
+    ["endpoint"],
+    buckets=_SLOW_BUCKETS,
+)
+OLLAMA_REQUEST_SECONDS = Histogram(
+    "ollama_request_duration_seconds", "Ollama request latency", ["endpoint"], buckets=_SLOW_BUCKETS
+)
+OLLAMA_REQUEST_FAILURES = Counter(
+    "ollama_request_failures_total", "Ollama transport failures (connect, timeout, 5xx)", ["endpoint"]
+)
+OLLAMA_PROMPT_EVAL_SECONDS = Histogram(
+    "ollama_prompt_eval_seconds", "Prompt evaluation time reported by Ollama", buckets=_SLOW_BUCKETS
+)
+OLLAMA_GENERATION_SECONDS = Histogram(
+    "ollama_generation_seconds", "Token generation time reported by Ollama", buckets=_SLOW_BUCKETS
+)
+OLLAMA_TOKENS_PER_SECOND = Histogram(
+    "ollama_generation_tokens_per_second",
+    "Generation throughput",
+    buckets=(1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 150, 250),
+)
+OLLAMA_TOKENS = Counter("ollama_tokens_total", "Tokens processed by Ollama", ["kind"])
+OLLAMA_RETRIES = Counter("ollama_retries_total", "Analysis attempts retried, by cause", ["reason"])
+LLM_OUTPUT = Counter(
+    "llm_output_total", "Parsed model responses by outcome (ok, repaired, parse_failure, validation_failure)", ["outcome"]
+)
+OLLAMA_IN_FLIGHT = Gauge("ollama_in_flight_requests", "Requests in flight per endpoint", ["endpoint"])
+OLLAMA_CIRCUIT_OPEN = Gauge("ollama_circuit_open", "1 while an endpoint is ejected", ["endpoint"])
+
+
+def observe_ollama_stats(stats: dict) -> None:
+    """Record the timing fields Ollama returns on a finished generation (nanoseconds)."""
+    prompt_ns = stats.get("prompt_eval_duration", 0)
+    eval_ns = stats.get("eval_duration", 0)
+    if prompt_ns:
+        OLLAMA_PROMPT_EVAL_SECONDS.observe(prompt_ns / 1e9)
+    if eval_ns:
+        OLLAMA_GENERATION_SECONDS.observe(eval_ns / 1e9)
+        if stats.get("eval_count"):
+            OLLAMA_TOKENS_PER_SECOND.observe(stats["eval_count"] / (eval_ns / 1e9))
+    OLLAMA_TOKENS.labels("prompt").inc(stats.get("prompt_eval_count", 0))
+    OLLAMA_TOKENS.labels("generated").inc(stats.get("eval_count", 0))
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Time every statement the engine executes."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY_SECONDS.labels(operation).observe(time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        started = context.connection.info.get("query_started") if context.connection else None
+        if started:
+            started.pop()
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
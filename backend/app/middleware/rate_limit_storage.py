@@ -0,0 +1,162 @@
+"""SQLite storage for ``limits``, so every worker process on a host shares one set of counters.
+
+Registered for ``sqlite:///path/to/file.db`` storage URIs (four slashes for an
+absolute path, as with SQLAlchemy). Put the file on a tmpfs such as
+``/dev/shm`` to keep it in shared memory; the counters are disposable, so
+nothing is lost that matters if it disappears on reboot.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from limits.errors import ConfigurationError
+from limits.storage import MovingWindowSupport, Storage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limit_entries (
+    key TEXT NOT NULL,
+    ts REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_rate_limit_entries_key_ts ON rate_limit_entries (key, ts);
+CREATE TABLE IF NOT EXISTS rate_limit_counters (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+# Keys that are never hit again are only removed by a periodic sweep
+_SWEEP_INTERVAL_SECONDS = 60.0
+
+
+class SQLiteStorage(Storage, MovingWindowSupport):
+    """Moving-window and fixed-window counters in a SQLite file.
+
+    Each check is one ``BEGIN IMMEDIATE`` transaction, which holds the
+    database write lock, so count-then-insert is atomic across processes.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, busy_timeout: float = 5.0, **options) -> None:
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri.removeprefix("sqlite:///")
+        if not self.path or self.path == ":memory:":
+            raise ConfigurationError(
+                "SQLite rate limit storage needs a file path, e.g. sqlite:////dev/shm/ratelimit.db"
+            )
+        self.busy_timeout = float(busy_timeout)
+        self._local = threading.local()
+        self._next_sweep = 0.0
+        self._connection()
+
+    @property
+    def base_exceptions(self) -> type[Exception]:
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, and a fresh one after a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Losing the last few hits on power loss is harmless for rate limits
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _write(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _sweep(self, conn: sqlite3.Connection, now: float) -> None:
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + _SWEEP_INTERVAL_SECONDS
+        conn.execute("DELETE FROM rate_limit_entries WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM rate_limit_counters WHERE expires_at <= ?", (now,))
+
+    # ── Moving window ─────────────────────────────────────────────────────────
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        with self._write() as conn:
+            self._sweep(conn, now)
+            conn.execute("DELETE FROM rate_limit_entries WHERE key = ? AND ts <= ?", (key, now - expiry))
+            (count,) = conn.execute("SELECT count(*) FROM rate_limit_entries WHERE key = ?", (key,)).fetchone()
+            if count + amount > limit:
+                return False
+            conn.executemany(
+                "INSERT INTO rate_limit_entries (key, ts, expires_at) VALUES (?, ?, ?)",
+                [(key, now, now + expiry)] * amount,
+            )
+        return True
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> tuple[float, int]:
+        now = time.time()
+        oldest, count = self._connection().execute(
+            "SELECT min(ts), count(*) FROM rate_limit_entries WHERE key = ? AND ts > ?",
+            (key, now - expiry),
+        ).fetchone()
+        return (oldest if oldest is not None else now), count
+
+    # ── Fixed window ──────────────────────────────────────────────────────────
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        with self._write() as conn:
+            self._sweep(conn, now)
+            conn.execute("DELETE FROM rate_limit_counters WHERE key = ? AND expires_at <= ?", (key, now))
+            conn.execute(
+                "INSERT INTO rate_limit_counters (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = value + excluded.value",
+                (key, amount, now + expiry),
+            )
+            (value,) = conn.execute("SELECT value FROM rate_limit_counters WHERE key = ?", (key,)).fetchone()
+        return value
+
+    def get(self, key: str) -> int:
+        row = self._connection().execute(
+            "SELECT value FROM rate_limit_counters WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        row = self._connection().execute(
+            "SELECT expires_at FROM rate_limit_counters WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    # ── Maintenance ───────────────────────────────────────────────────────────
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        return True
+
+    def reset(self) -> int:
+        with self._write() as conn:
+            removed = conn.execute("DELETE FROM rate_limit_entries").rowcount
+            removed += conn.execute("DELETE FROM rate_limit_counters").rowcount
+        return removed
+
+    def clear(self, key: str) -> None:
+        with self._write() as conn:
+            conn.execute("DELETE FROM rate_limit_entries WHERE key = ?", (key,))
+            conn.execute("DELETE FROM rate_limit_counters WHERE key = ?", (key,))
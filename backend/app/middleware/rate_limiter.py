@@ -4,7 +4,30 @@ from slowapi import Limiter
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 
-limiter = Limiter(key_func=get_remote_address)
+from app.auth.utils import decode_access_token
+from app.config import settings
+# Registers the sqlite:// storage scheme with limits
+from app.middleware import rate_limit_storage  # noqa: F401
+
+
+def rate_limit_key(request: Request) -> str:
+    """Per user for requests carrying a valid token, per client IP otherwise."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        user_id = decode_access_token(token)
+        if user_id:
+            return f"user:{user_id}"
+    return f"ip:{get_remote_address(request)}"
+
+
+limiter = Limiter(
+    key_func=rate_limit_key,
+    storage_uri=settings.rate_limit_storage_uri,
+    strategy=settings.rate_limit_strategy,
+    # An unreachable store lets requests through rather than failing them
+    swallow_errors=True,
+    enabled=settings.rate_limit_enabled,
+)
 
 
 async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
@@ -0,0 +1,54 @@
+"""Database migrations.
+
+Run from ``backend/`` (uses ``DATABASE_URL``):
+
+    python -m app.migrations upgrade          # apply everything pending
+    python -m app.migrations upgrade --to 5   # stop at version 5
+    python -m app.migrations status           # applied and pending versions
+    python -m app.migrations check            # models vs. database drift
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.database import engine
+from app.migrations.runner import check, status, upgrade
+from app.migrations.versions import MIGRATIONS
+from app.models import Base
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="Database migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade", help="Apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, help="Stop after this version")
+    commands.add_parser("status", help="List migrations and when they were applied")
+    commands.add_parser("check", help="Report tables, columns and indexes the models expect but the database lacks")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        if args.command == "upgrade":
+            applied = await upgrade(engine, MIGRATIONS, target=args.to)
+            print(f"Applied {len(applied)} migration(s)" if applied else "Already up to date")
+        elif args.command == "status":
+            for row in await status(engine, MIGRATIONS):
+                applied = f"applied {row['applied_at']:%Y-%m-%d %H:%M:%S}" if row["applied_at"] else "pending"
+                print(f"{row['version']:04d}  {row['description']:<45} {applied}")
+        else:
+            problems = await check(engine, Base.metadata)
+            for problem in problems:
+                print(problem)
+            if problems:
+                print("Run `python -m app.migrations upgrade`, or add a migration for the model change")
+                return 1
+            print("Schema matches the models")
+    finally:
+        await engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
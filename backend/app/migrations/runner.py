@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Callable
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+VERSION_TABLE = "schema_migrations"
+# Arbitrary constant for pg_advisory_lock, shared by every process migrating this database
+_PG_LOCK_KEY = 7_305_118_402
+_SQLITE_LOCK_WAIT_SECONDS = 120.0
+
+
+@dataclass(frozen=True)
+class Migration:
+    """One schema step. ``upgrade`` gets an ``Operations`` bound to a sync connection.
+
+    Migrations run in a transaction unless ``transactional`` is False, which
+    lets Postgres build indexes with ``CONCURRENTLY`` (no write lock on the
+    table). Non-transactional steps must be safe to re-run, since a crash can
+    leave them half applied; the ``Operations`` helpers all are.
+    """
+
+    version: int
+    description: str
+    upgrade: Callable[["Operations"], None]
+    transactional: bool = True
+
+
+class Operations:
+    """Idempotent DDL helpers, so steps also apply cleanly to databases created by ``create_all``."""
+
+    def __init__(self, conn: Connection, transactional: bool = True) -> None:
+        self.conn = conn
+        self.dialect = conn.dialect.name
+        self.transactional = transactional
+        self.metadata = sa.MetaData()
+
+    def execute(self, sql: str, **params) -> None:
+        self.conn.execute(sa.text(sql), params)
+
+    def has_table(self, table: str) -> bool:
+        return self.conn.dialect.has_table(self.conn, table)
+
+    def has_column(self, table: str, column: str) -> bool:
+        return any(c["name"] == column for c in sa.inspect(self.conn).get_columns(table))
+
+    def has_index(self, table: str, name: str) -> bool:
+        return self.conn.dialect.has_index(self.conn, table, name)
+
+    def create_table(self, name: str, *columns: sa.Column | sa.Constraint | sa.Index) -> None:
+        """Create the table and its indexes unless it already exists."""
+        table = sa.Table(name, self.metadata, *columns)
+        # Foreign keys need their target table; reflect it if an earlier step created it
+        for fk in table.foreign_keys:
+            target = fk.target_fullname.split(".")[0]
+            if target not in self.metadata.tables:
+                sa.Table(target, self.metadata, autoload_with=self.conn)
+        table.create(self.conn, checkfirst=True)
+
+    def add_column(self, table: str, column: sa.Column) -> None:
+        """``ALTER TABLE ... ADD COLUMN`` if missing. Give NOT NULL columns a server default."""
+        if self.has_column(table, column.name):
+            return
+        sa.Table(table, sa.MetaData(), column)
+        spec = self.conn.dialect.ddl_compiler(self.conn.dialect, None).get_column_specification(column)
+        self.conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {spec}")
+
+    def create_index(self, name: str, table: str, columns: list[str], unique: bool = False) -> None:
+        """Create an index if missing; online (``CONCURRENTLY``) on Postgres outside a transaction."""
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        cols = ", ".join(columns)
+        if self.dialect == "postgresql" and not self.transactional:
+            # A failed concurrent build leaves an invalid index behind; rebuild it
+            valid = self.conn.execute(
+                sa.text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+                {"name": name},
+            ).scalar()
+            if valid is False:
+                self.conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            self.conn.exec_driver_sql(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} ({cols})")
+        else:
+            self.conn.exec_driver_sql(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({cols})")
+
+    def drop_index(self, name: str) -> None:
+        if self.dialect == "postgresql" and not self.transactional:
+            self.conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        else:
+            self.conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+
+_version_table = sa.Table(
+    VERSION_TABLE,
+    sa.MetaData(),
+    sa.Column("version", sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column("description", sa.String(200), nullable=False),
+    sa.Column("applied_at", sa.DateTime(timezone=True), nullable=False),
+    sa.Column("duration_ms", sa.Float, nullable=False),
+)
+
+
+async def _applied_versions(conn: AsyncConnection) -> set[int]:
+    if not await conn.run_sync(lambda c: c.dialect.has_table(c, VERSION_TABLE)):
+        return set()
+    return set((await conn.execute(sa.select(_version_table.c.version))).scalars())
+
+
+@asynccontextmanager
+async def _transaction(engine: AsyncEngine):
+    """A write transaction. On SQLite it takes the database write lock up front
+    (``BEGIN IMMEDIATE``), which is what serializes concurrent migrators there."""
+    if engine.dialect.name != "sqlite":
+        async with engine.begin() as conn:
+            yield conn
+        return
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        deadline = time.monotonic() + _SQLITE_LOCK_WAIT_SECONDS
+        while True:
+            try:
+                await conn.exec_driver_sql("BEGIN IMMEDIATE")
+                break
+            except OperationalError as exc:
+                if "locked" not in str(exc) or time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.5)
+        try:
+            yield conn
+        except BaseException:
+            await conn.exec_driver_sql("ROLLBACK")
+            raise
+        await conn.exec_driver_sql("COMMIT")
+
+
+@asynccontextmanager
+async def _autocommit(engine: AsyncEngine):
+    async with engine.connect() as conn:
+        yield await conn.execution_options(isolation_level="AUTOCOMMIT")
+
+
+@asynccontextmanager
+async def _migration_lock(engine: AsyncEngine):
+    """Let one process migrate at a time. Postgres uses a session advisory lock;
+    SQLite relies on ``BEGIN IMMEDIATE`` in each step instead."""
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    async with _autocommit(engine) as conn:
+        await conn.execute(sa.text("SELECT pg_advisory_lock(:key)"), {"key": _PG_LOCK_KEY})
+        try:
+            yield
+        finally:
+            await conn.execute(sa.text("SELECT pg_advisory_unlock(:key)"), {"key": _PG_LOCK_KEY})
+
+
+async def _apply(engine: AsyncEngine, migration: Migration) -> bool:
+    """Run one migration and record it; False if another process got there first."""
+    transactional = migration.transactional or engine.dialect.name != "postgresql"
+    started = time.perf_counter()
+    context = _transaction(engine) if transactional else _autocommit(engine)
+    async with context as conn:
+        if migration.version in await _applied_versions(conn):
+            return False
+        await conn.run_sync(lambda c: migration.upgrade(Operations(c, transactional)))
+        await conn.execute(
+            _version_table.insert().values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=sa.func.now(),
+                duration_ms=round((time.perf_counter() - started) * 1000, 1),
+            )
+        )
+    return True
+
+
+async def current_version(engine: AsyncEngine) -> int:
+    async with engine.connect() as conn:
+        return max(await _applied_versions(conn), default=0)
+
+
+async def pending(engine: AsyncEngine, migrations: list[Migration]) -> list[Migration]:
+    async with engine.connect() as conn:
+        applied = await _applied_versions(conn)
+    return [m for m in migrations if m.version not in applied]
+
+
+async def upgrade(engine: AsyncEngine, migrations: list[Migration], target: int | None = None) -> list[int]:
+    """Apply pending migrations up to ``target`` (default: all) and return the versions applied.
+
+    Safe to call from every worker at startup: when nothing is pending it is a
+    single query, and concurrent callers wait for one another instead of
+    applying a step twice.
+    """
+    todo = [m for m in await pending(engine, migrations) if target is None or m.version <= target]
+    if not todo:
+        return []
+
+    applied = []
+    async with _migration_lock(engine):
+        async with _transaction(engine) as conn:
+            await conn.run_sync(lambda c: _version_table.create(c, checkfirst=True))
+        for migration in todo:
+            started = time.perf_counter()
+            if await _apply(engine, migration):
+                applied.append(migration.version)
+                logger.info(
+                    "Applied migration %04d %s (%.0f ms)",
+                    migration.version,
+                    migration.description,
+                    (time.perf_counter() - started) * 1000,
+                )
+    return applied
+
+
+async def status(engine: AsyncEngine, migrations: list[Migration]) -> list[dict]:
+    """Every known migration with when it was applied (None if pending)."""
+    async with engine.connect() as conn:
+        rows = {}
+        if await conn.run_sync(lambda c: c.dialect.has_table(c, VERSION_TABLE)):
+            result = await conn.execute(sa.select(_version_table))
+            rows = {row.version: row for row in result}
+    return [
+        {
+            "version": m.version,
+            "description": m.description,
+            "applied_at": rows[m.version].applied_at if m.version in rows else None,
+            "duration_ms": rows[m.version].duration_ms if m.version in rows else None,
+        }
+        for m in migrations
+    ]
+
+
+def _drift(conn: Connection, metadata: sa.MetaData) -> list[str]:
+    inspector = sa.inspect(conn)
+    tables = set(inspector.get_table_names())
+    problems = []
+    for table in metadata.sorted_tables:
+        if table.name not in tables:
+            problems.append(f"missing table {table.name}")
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        problems += [f"missing column {table.name}.{c.name}" for c in table.columns if c.name not in columns]
+        indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        problems += [f"missing index {i.name}" for i in table.indexes if i.name not in indexes]
+    return problems
+
+
+async def check(engine: AsyncEngine, metadata: sa.MetaData) -> list[str]:
+    """Tables, columns and indexes declared in the models but absent from the database."""
+    async with engine.connect() as conn:
+        return await conn.run_sync(_drift, metadata)
@@ -0,0 +1,195 @@
+"""Schema history, oldest first. Append new steps; never edit one that has shipped.
+
+Steps 1-7 reproduce the schema that ``create_all`` used to build, so they are
+no-ops on a database created that way and only get recorded as applied.
+Table definitions are spelled out here rather than imported from
+``app.models`` so each step keeps meaning what it meant when it was written.
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.migrations.runner import Migration, Operations
+
+_JSON = sa.JSON().with_variant(JSONB(), "postgresql")
+
+
+def _initial_schema(op: Operations) -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Index("ix_users_email", "email", unique=True),
+    )
+    op.create_table(
+        "analyses",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("resume_text", sa.Text, nullable=False),
+        sa.Column("job_description", sa.Text, nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("error_message", sa.Text),
+        sa.Column("match_score", sa.Float),
+        sa.Column("matched_skills", sa.Text),
+        sa.Column("missing_skills", sa.Text),
+        sa.Column("suggestions", sa.Text),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("completed_at", sa.DateTime(timezone=True)),
+        sa.Index("ix_analyses_user_id", "user_id"),
+    )
+
+
+def _result_cache(op: Operations) -> None:
+    op.create_table(
+        "analysis_cache",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("model", sa.String(100), nullable=False),
+        sa.Column("prompt_version", sa.String(20), nullable=False),
+        sa.Column("result", _JSON, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def _native_json_results(op: Operations) -> None:
+    """Convert result columns written as serialized text to native JSON.
+
+    SQLite's JSON type reads the old text as-is, so only rows that are not
+    valid JSON need clearing; Postgres columns are altered to JSONB.
+    """
+    columns = ("matched_skills", "missing_skills", "suggestions")
+    if op.dialect == "sqlite":
+        for column in columns:
+            op.execute(
+                f"UPDATE analyses SET {column} = NULL "
+                f"WHERE {column} IS NOT NULL AND json_valid({column}) = 0"
+            )
+        op.execute("DELETE FROM analysis_cache WHERE json_valid(result) = 0")
+    elif op.dialect == "postgresql":
+        for table, column in [("analyses", c) for c in columns] + [("analysis_cache", "result")]:
+            data_type = op.conn.execute(
+                sa.text(
+                    "SELECT data_type FROM information_schema.columns "
+                    "WHERE table_name = :table AND column_name = :column"
+                ),
+                {"table": table, "column": column},
+            ).scalar()
+            if data_type == "text":
+                op.execute(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB "
+                    f"USING NULLIF({column}, '')::jsonb"
+                )
+
+
+def _batches_and_prescores(op: Operations) -> None:
+    op.create_table(
+        "analysis_batches",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("user_id", sa.String(36), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.Index("ix_analysis_batches_user_id", "user_id"),
+    )
+    op.add_column("analyses", sa.Column("batch_id", sa.String(36)))
+    op.add_column("analyses", sa.Column("resume_filename", sa.String(255)))
+    op.add_column("analyses", sa.Column("prescore", _JSON))
+    op.add_column(
+        "analyses", sa.Column("prescreened_out", sa.Boolean, nullable=False, server_default=sa.false())
+    )
+
+
+def _queue_and_telemetry_columns(op: Operations) -> None:
+    op.add_column("analyses", sa.Column("started_at", sa.DateTime(timezone=True)))
+    if not op.has_column("analyses", "job_description_preview"):
+        op.add_column(
+            "analyses",
+            sa.Column("job_description_preview", sa.String(130), nullable=False, server_default=""),
+        )
+        op.execute(
+            "UPDATE analyses SET job_description_preview = substr(job_description, 1, 120) || "
+            "CASE WHEN length(job_description) > 120 THEN '...' ELSE '' END"
+        )
+    op.add_column("analyses", sa.Column("input_trimming", _JSON))
+    op.add_column("analyses", sa.Column("timings", _JSON))
+    op.add_column("analyses", sa.Column("model_name", sa.String(100)))
+    op.add_column("analyses", sa.Column("prompt_tokens", sa.Integer))
+    op.add_column("analyses", sa.Column("completion_tokens", sa.Integer))
+
+
+def _job_library(op: Operations) -> None:
+    op.create_table(
+        "job_postings",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("user_id", sa.String(36), nullable=False),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("company", sa.String(255)),
+        sa.Column("description", sa.Text, nullable=False),
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("skills", _JSON, nullable=False),
+        sa.Column("doc_length", sa.Integer, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.UniqueConstraint("user_id", "content_hash", name="uq_job_postings_user_hash"),
+        sa.Index("ix_job_postings_user_id", "user_id"),
+    )
+    op.create_table(
+        "job_posting_terms",
+        sa.Column("posting_id", sa.String(36), primary_key=True),
+        sa.Column("term", sa.String(64), primary_key=True),
+        sa.Column("user_id", sa.String(36), nullable=False),
+        sa.Column("tf", sa.Integer, nullable=False),
+        sa.ForeignKeyConstraint(["posting_id"], ["job_postings.id"], ondelete="CASCADE"),
+        sa.Index("ix_job_posting_terms_user_term", "user_id", "term"),
+    )
+
+
+def _analysis_indexes(op: Operations) -> None:
+    op.create_index("ix_analyses_status", "analyses", ["status"])
+    op.create_index("ix_analyses_batch_id", "analyses", ["batch_id"])
+    op.create_index("ix_analyses_user_created_id", "analyses", ["user_id", "created_at", "id"])
+    # A prefix of the composite index above
+    op.drop_index("ix_analyses_user_id")
+
+
+def _admission_control(op: Operations) -> None:
+    op.create_table(
+        "token_buckets",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("tokens", sa.Float, nullable=False),
+        sa.Column("updated_at", sa.Float, nullable=False),
+    )
+    op.add_column("analyses", sa.Column("estimated_gpu_seconds", sa.Float))
+
+
+def _microsecond_timestamps(op: Operations) -> None:
+    """Pad second-precision SQLite timestamps to the format SQLAlchemy writes.
+
+    Rows from before ``created_at`` was set in Python got ``CURRENT_TIMESTAMP``
+    (``YYYY-MM-DD HH:MM:SS``). SQLite compares them as text, and against a
+    cursor's ``...HH:MM:SS.000000`` they sort lower, so keyset pagination
+    returned the same page forever.
+    """
+    if op.dialect != "sqlite":
+        return
+    for table in ("analyses", "job_postings"):
+        op.execute(f"UPDATE {table} SET created_at = created_at || '.000000' WHERE length(created_at) = 19")
+
+
+def _job_heartbeats(op: Operations) -> None:
+    op.add_column("analyses", sa.Column("heartbeat_at", sa.DateTime(timezone=True)))
+
+
+MIGRATIONS = [
+    Migration(1, "initial schema", _initial_schema),
+    Migration(2, "analysis result cache", _result_cache),
+    Migration(3, "native JSON result columns", _native_json_results),
+    Migration(4, "analysis batches and pre-scores", _batches_and_prescores),
+    Migration(5, "queue, list preview and telemetry columns", _queue_and_telemetry_columns),
+    Migration(6, "job library", _job_library),
+    Migration(7, "analysis queue and history indexes", _analysis_indexes, transactional=False),
+    Migration(8, "admission control buckets", _admission_control),
+    Migration(9, "microsecond created_at on SQLite", _microsecond_timestamps),
+    Migration(10, "analysis job heartbeats", _job_heartbeats),
+]
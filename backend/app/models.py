@@ -1,7 +1,20 @@
 import datetime
 import uuid
 
-from sqlalchemy import DateTime, Float, ForeignKey, String, Text, func
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -9,6 +22,10 @@ class Base(DeclarativeBase):
     pass
 
 
+# JSON1 text on SQLite, binary JSONB on Postgres
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -24,33 +41,160 @@ class User(Base):
     analyses: Mapped[list["Analysis"]] = relationship(back_populates="user")
 
 
+class AnalysisBatch(Base):
+    """Groups analyses submitted together (one resume x many jobs, or vice versa)."""
+
+    __tablename__ = "analysis_batches"
+
+    id: Mapped[str] = mapped_column(
+        String(36), primary_key=True, default=lambda: str(uuid.uuid4())
+    )
+    user_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("users.id"), nullable=False, index=True
+    )
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
 class Analysis(Base):
     __tablename__ = "analyses"
+    __table_args__ = (
+        # Covers the per-user, newest-first keyset scan used by list_analyses
+        Index("ix_analyses_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id: Mapped[str] = mapped_column(
         String(36), primary_key=True, default=lambda: str(uuid.uuid4())
     )
     user_id: Mapped[str] = mapped_column(
-        String(36), ForeignKey("users.id"), nullable=False, index=True
+        String(36), ForeignKey("users.id"), nullable=False
+    )
+    batch_id: Mapped[str | None] = mapped_column(
+        String(36), ForeignKey("analysis_batches.id"), nullable=True, index=True
+    )
+    resume_filename: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    # Large inputs (up to ~50KB) are deferred so list/status queries stay narrow;
+    # load them explicitly with undefer() where they are needed.
+    resume_text: Mapped[str] = mapped_column(
+        Text, nullable=False, deferred=True, deferred_raiseload=True
     )
-    resume_text: Mapped[str] = mapped_column(Text, nullable=False)
-    job_description: Mapped[str] = mapped_column(Text, nullable=False)
+    job_description: Mapped[str] = mapped_column(
+        Text, nullable=False, deferred=True, deferred_raiseload=True
+    )
+    job_description_preview: Mapped[str] = mapped_column(String(130), nullable=False, default="")
 
     # Status: pending | processing | completed | failed
-    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending", index=True)
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    # Local pre-score (PreScoreResult), available as soon as the row is created
+    prescore: Mapped[dict | None] = mapped_column(JSONType, nullable=True)
+    # True when a batch item was resolved from the pre-score without calling the LLM
+    prescreened_out: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # What the token budget removed from the inputs before the LLM call (None if nothing)
+    input_trimming: Mapped[dict | None] = mapped_column(JSONType, nullable=True)
+
+    # Per-stage durations in ms (parse_ms, queued_ms, prompt_eval_ms, generation_ms, ...)
+    timings: Mapped[dict | None] = mapped_column(JSONType, nullable=True)
+    model_name: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    prompt_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    completion_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Charged to the admission buckets at submission, settled against actual GPU time
+    estimated_gpu_seconds: Mapped[float | None] = mapped_column(Float, nullable=True)
+
     # Results (populated on completion)
     match_score: Mapped[float | None] = mapped_column(Float, nullable=True)
-    matched_skills: Mapped[str | None] = mapped_column(Text, nullable=True)   # JSON string
-    missing_skills: Mapped[str | None] = mapped_column(Text, nullable=True)   # JSON string
-    suggestions: Mapped[str | None] = mapped_column(Text, nullable=True)      # JSON string
+    matched_skills: Mapped[list[str] | None] = mapped_column(JSONType, nullable=True)
+    missing_skills: Mapped[list[str] | None] = mapped_column(JSONType, nullable=True)
+    suggestions: Mapped[list[str] | None] = mapped_column(JSONType, nullable=True)
 
+    # Set in Python (microsecond precision) so keyset cursors compare exactly
     created_at: Mapped[datetime.datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
+        DateTime(timezone=True),
+        default=lambda: datetime.datetime.now(datetime.timezone.utc),
+        server_default=func.now(),
+    )
+    started_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    # Refreshed by the worker running the job; a stale one means the worker is gone
+    heartbeat_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
     )
     completed_at: Mapped[datetime.datetime | None] = mapped_column(
         DateTime(timezone=True), nullable=True
     )
 
     user: Mapped["User"] = relationship(back_populates="analyses")
+
+
+class AnalysisCache(Base):
+    """Persistent tier of the resume/job-description result cache."""
+
+    __tablename__ = "analysis_cache"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    prompt_version: Mapped[str] = mapped_column(String(20), nullable=False)
+    result: Mapped[dict] = mapped_column(JSONType, nullable=False)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+class JobPosting(Base):
+    """A stored job description, deduplicated per user by normalized content hash."""
+
+    __tablename__ = "job_postings"
+    __table_args__ = (UniqueConstraint("user_id", "content_hash", name="uq_job_postings_user_hash"),)
+
+    id: Mapped[str] = mapped_column(
+        String(36), primary_key=True, default=lambda: str(uuid.uuid4())
+    )
+    user_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("users.id"), nullable=False, index=True
+    )
+    title: Mapped[str] = mapped_column(String(255), nullable=False)
+    company: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    description: Mapped[str] = mapped_column(
+        Text, nullable=False, deferred=True, deferred_raiseload=True
+    )
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    skills: Mapped[list[str]] = mapped_column(JSONType, nullable=False, default=list)
+    # Token count, used for BM25 length normalization
+    doc_length: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.datetime.now(datetime.timezone.utc),
+        server_default=func.now(),
+    )
+    updated_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+
+class JobPostingTerm(Base):
+    """Inverted index: one row per (posting, term) with its term frequency."""
+
+    __tablename__ = "job_posting_terms"
+    __table_args__ = (Index("ix_job_posting_terms_user_term", "user_id", "term"),)
+
+    posting_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("job_postings.id", ondelete="CASCADE"), primary_key=True
+    )
+    term: Mapped[str] = mapped_column(String(64), primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    tf: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class TokenBucket(Base):
+    """Admission-control balance in GPU-seconds: one row per user, plus the global backlog."""
+
+    __tablename__ = "token_buckets"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    tokens: Mapped[float] = mapped_column(Float, nullable=False)
+    # Epoch seconds of the last charge; the balance refills from here
+    updated_at: Mapped[float] = mapped_column(Float, nullable=False)
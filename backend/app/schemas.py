@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, PrivateAttr
 
 
 # ── Auth ──────────────────────────────────────────────────────────────────────
@@ -35,6 +35,30 @@ class AnalysisCreateResponse(BaseModel):
     status: str
 
 
+class PreScoreResult(BaseModel):
+    """Instant, deterministic estimate computed locally before the LLM runs."""
+
+    match_score: float
+    matched_skills: list[str]
+    missing_skills: list[str]
+
+
+class AnalysisTimings(BaseModel):
+    """Where an analysis spent its time. Stages that did not run are null."""
+
+    parse_ms: float | None = None
+    queued_ms: float | None = None
+    model_load_ms: float | None = None
+    prompt_eval_ms: float | None = None
+    generation_ms: float | None = None
+    # Wall time of the whole LLM call, including network, retries and backoff
+    llm_total_ms: float | None = None
+    db_write_ms: float | None = None
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    model: str | None = None
+
+
 class AnalysisResponse(BaseModel):
     id: str
     status: str
@@ -43,6 +67,11 @@ class AnalysisResponse(BaseModel):
     matched_skills: list[str] | None = None
     missing_skills: list[str] | None = None
     suggestions: list[str] | None = None
+    prescore: PreScoreResult | None = None
+    prescreened_out: bool = False
+    input_trimming: dict | None = None
+    # Only populated with ?include=timings
+    timings: AnalysisTimings | None = None
     error_message: str | None = None
     created_at: datetime
     completed_at: datetime | None = None
@@ -56,10 +85,92 @@ class AnalysisListItem(BaseModel):
     created_at: datetime
 
 
+class BatchCreateResponse(BaseModel):
+    id: str
+    items: list[AnalysisCreateResponse]
+
+
+class BatchItem(BaseModel):
+    id: str
+    status: str
+    match_score: float | None = None
+    resume_filename: str | None = None
+    job_description_preview: str
+    prescreened_out: bool = False
+    error_message: str | None = None
+
+
+class BatchResponse(BaseModel):
+    id: str
+    status: str
+    created_at: datetime
+    counts: dict[str, int]
+    items: list[BatchItem]  # ranked by match_score, best first
+
+
+class SkillCount(BaseModel):
+    skill: str
+    count: int
+
+
+class Percentiles(BaseModel):
+    count: int
+    p50: float
+    p90: float
+    p95: float
+    p99: float
+    max: float
+
+
+class TimingSummary(BaseModel):
+    """Stage-timing percentiles over recent completed analyses (admin only)."""
+
+    analyses: int
+    since: datetime
+    stages: dict[str, Percentiles]
+    models: dict[str, int]
+
+
 class PaginatedAnalyses(BaseModel):
     items: list[AnalysisListItem]
-    total: int
+    total: int | None = None
     has_more: bool
+    next_cursor: str | None = None
+
+
+# ── Jobs ──────────────────────────────────────────────────────────────────────
+
+class JobPostingCreate(BaseModel):
+    title: str = Field(..., min_length=1, max_length=255)
+    company: str | None = Field(None, max_length=255)
+    description: str = Field(..., min_length=1, max_length=50_000)
+
+
+class JobPostingListItem(BaseModel):
+    id: str
+    title: str
+    company: str | None = None
+    skills: list[str]
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class JobPostingResponse(JobPostingListItem):
+    description: str
+    updated_at: datetime | None = None
+
+
+class PaginatedJobPostings(BaseModel):
+    items: list[JobPostingListItem]
+    has_more: bool
+    next_cursor: str | None = None
+
+
+class JobMatch(BaseModel):
+    posting: JobPostingListItem
+    relevance: float
+    prescore: PreScoreResult
 
 
 # ── AI Result (internal, used to validate Ollama response) ────────────────────
@@ -69,3 +180,7 @@ class AIAnalysisResult(BaseModel):
     matched_skills: list[str]
     missing_skills: list[str]
     suggestions: list[str]
+    # Set when the response was truncated and repaired; such results are not cached
+    _repaired: bool = PrivateAttr(default=False)
+    # Ollama timings and token counts summed over all attempts
+    _usage: dict = PrivateAttr(default_factory=dict)
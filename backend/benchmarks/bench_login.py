@@ -0,0 +1,62 @@
+"""Login throughput with bcrypt verification inline vs. in the bcrypt thread pool.
+
+Run from ``backend/``:
+
+    python -m benchmarks.bench_login --logins 32
+
+Each mode runs the same number of concurrent "logins" (one bcrypt verify each)
+while a heartbeat task measures how long the event loop is blocked.
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.auth.utils import hash_password, verify_password, verify_password_async
+
+
+async def _heartbeat(stop: asyncio.Event, lags: list[float], interval: float = 0.01) -> None:
+    while not stop.is_set():
+        before = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - before - interval)
+
+
+async def _login_inline(password: str, hashed: str) -> bool:
+    return verify_password(password, hashed)
+
+
+async def _run(mode: str, logins: int, password: str, hashed: str) -> dict:
+    login = verify_password_async if mode == "executor" else _login_inline
+    stop = asyncio.Event()
+    lags: list[float] = []
+    heartbeat = asyncio.create_task(_heartbeat(stop, lags))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login(password, hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await heartbeat
+    return {
+        "mode": mode,
+        "logins": logins,
+        "seconds": round(elapsed, 3),
+        "logins_per_sec": round(logins / elapsed, 1),
+        "max_loop_lag_ms": round(max(lags, default=0.0) * 1000, 1),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=32)
+    args = parser.parse_args()
+
+    password = "benchmark-password"
+    hashed = hash_password(password)
+    for mode in ("inline", "executor"):
+        print(await _run(mode, args.logins, password, hashed))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
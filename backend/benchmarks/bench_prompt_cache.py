@@ -0,0 +1,85 @@
+"""Prompt-eval time per request with and without prompt prefix reuse.
+
+Needs a running Ollama (``OLLAMA_BASE_URL`` / ``OLLAMA_MODEL`` from the
+environment or ``.env``). Run from ``backend/``:
+
+    python -m benchmarks.bench_prompt_cache --requests 5
+
+``reuse`` sends the engine's real chat layout (fixed system prompt, then one
+resume, then a different job description each time), so Ollama can reuse the
+cached prefix. ``no-reuse`` puts a unique nonce in front of the same content,
+which forces the whole prompt to be evaluated on every request.
+"""
+
+import argparse
+import asyncio
+import statistics
+import uuid
+
+from app.analysis import ollama_client
+from app.analysis.ai_engine import SYSTEM_PROMPT, _build_messages
+from app.config import settings
+
+RESUME = (
+    "Senior software engineer with 7 years of experience building Python services. "
+    "Led migration of a Django monolith to FastAPI microservices on AWS (ECS, RDS, S3). "
+    "Built CI/CD pipelines with GitHub Actions and Docker; mentored four engineers. "
+) * 8
+
+JOBS = [
+    "Backend engineer: Python, FastAPI, PostgreSQL, Docker, AWS. 5+ years.",
+    "Platform engineer: Kubernetes, Terraform, GCP, observability with Prometheus.",
+    "Data engineer: Spark, Airflow, dbt, Snowflake, strong SQL.",
+    "Full-stack developer: React, TypeScript, Node.js, REST APIs, CI/CD.",
+    "ML engineer: PyTorch, model serving, feature pipelines, Python.",
+]
+
+
+async def _run(mode: str, requests: int) -> dict:
+    timings = []
+    for i in range(requests):
+        messages = _build_messages(RESUME, JOBS[i % len(JOBS)])
+        if mode == "no-reuse":
+            messages[0] = {"role": "system", "content": f"[{uuid.uuid4()}]\n{SYSTEM_PROMPT}"}
+        response = await ollama_client.post(
+            "/api/chat",
+            json={
+                "model": settings.ollama_model,
+                "messages": messages,
+                "format": "json",
+                "stream": False,
+                "keep_alive": settings.ollama_keep_alive,
+                "options": {"temperature": 0.3, "num_predict": 1},
+            },
+        )
+        response.raise_for_status()
+        data = response.json()
+        timings.append(
+            (data.get("prompt_eval_count", 0), data.get("prompt_eval_duration", 0) / 1e6)
+        )
+
+    # The first request of each mode also pays for model load / cold cache
+    warm = timings[1:] or timings
+    return {
+        "mode": mode,
+        "requests": requests,
+        "prompt_tokens_evaluated_avg": round(statistics.mean(t for t, _ in warm), 1),
+        "prompt_eval_ms_avg": round(statistics.mean(ms for _, ms in warm), 1),
+        "prompt_eval_ms_first": round(timings[0][1], 1),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        for mode in ("no-reuse", "reuse"):
+            print(await _run(mode, args.requests))
+    finally:
+        await ollama_client.close_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""Rate limit check latency and cross-process accuracy per storage backend.
+
+Run from ``backend/``:
+
+    python -m benchmarks.bench_rate_limit --processes 4 --checks 5000
+    python -m benchmarks.bench_rate_limit --storage redis://localhost:6379
+
+Each process plays a uvicorn worker: it times ``checks`` moving-window hits
+spread over a pool of keys, as many users would. Then every process races for
+the same key with a limit of ``--limit``; a shared store must admit exactly
+that many in total, while ``memory://`` admits up to ``limit`` per process.
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+
+from limits import RateLimitItemPerHour
+from limits.storage import storage_from_string
+from limits.strategies import MovingWindowRateLimiter
+
+from app.middleware import rate_limit_storage  # noqa: F401
+
+
+def _pct(ordered: list[float], q: float) -> float:
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3) if ordered else 0.0
+
+
+def _worker(uri: str, run: str, checks: int, keys: int, limit: int, start, results) -> None:
+    limiter = MovingWindowRateLimiter(storage_from_string(uri))
+    item = RateLimitItemPerHour(1_000_000)
+    latencies = []
+    for i in range(checks):
+        started = time.perf_counter()
+        limiter.hit(item, run, f"user:{os.getpid()}-{i % keys}")
+        latencies.append(time.perf_counter() - started)
+
+    start.wait()
+    contested = RateLimitItemPerHour(limit)
+    admitted = sum(limiter.hit(contested, run, "contested") for _ in range(limit * 2))
+    results.put((latencies, admitted))
+
+
+def _run(uri: str, args: argparse.Namespace) -> dict:
+    run = uuid.uuid4().hex
+    start = multiprocessing.Barrier(args.processes)
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(
+            target=_worker, args=(uri, run, args.checks, args.keys, args.limit, start, results)
+        )
+        for _ in range(args.processes)
+    ]
+    for proc in procs:
+        proc.start()
+    outcomes = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    ordered = sorted(latency for latencies, _ in outcomes for latency in latencies)
+    return {
+        "storage": uri,
+        "check_ms_p50": _pct(ordered, 0.5),
+        "check_ms_p95": _pct(ordered, 0.95),
+        "check_ms_p99": _pct(ordered, 0.99),
+        "contested_limit": args.limit,
+        "contested_admitted": sum(admitted for _, admitted in outcomes),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--storage", action="append", help="Storage URI (repeatable; default: memory and SQLite)"
+    )
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--checks", type=int, default=5000, help="Timed checks per process")
+    parser.add_argument("--keys", type=int, default=200, help="Distinct keys per process")
+    parser.add_argument("--limit", type=int, default=50, help="Limit on the contested key")
+    args = parser.parse_args()
+
+    shm = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    uris = args.storage or [
+        "memory://",
+        f"sqlite:///{tempfile.mkdtemp(prefix='bench-rl-')}/ratelimit.db",
+        f"sqlite:///{tempfile.mkdtemp(prefix='bench-rl-', dir=shm)}/ratelimit.db",
+    ]
+    for uri in uris:
+        print(_run(uri, args))
+
+
+if __name__ == "__main__":
+    main()
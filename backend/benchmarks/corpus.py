@@ -0,0 +1,107 @@
+"""Synthetic resumes (as PDFs) and job descriptions for load tests.
+
+Everything is generated from a seeded RNG so runs are reproducible. Resumes
+span a few pages of experience, and job descriptions include the EEO and
+benefits boilerplate that real postings carry, so trimming does real work.
+"""
+
+import random
+import uuid
+from dataclasses import dataclass
+
+import fitz  # PyMuPDF
+
+SKILLS = (
+    "Python", "FastAPI", "Django", "Flask", "SQL", "PostgreSQL", "MySQL", "Redis", "Kafka",
+    "Docker", "Kubernetes", "Terraform", "AWS", "GCP", "Azure", "Linux", "Go", "Java",
+    "TypeScript", "React", "Node.js", "GraphQL", "REST APIs", "CI/CD", "GitHub Actions",
+    "Prometheus", "Grafana", "Airflow", "Spark", "Pandas", "PyTorch", "Celery",
+)
+TITLES = (
+    "Backend Engineer", "Platform Engineer", "Data Engineer", "Full-Stack Developer",
+    "Site Reliability Engineer", "Machine Learning Engineer", "Software Engineer",
+)
+COMPANIES = ("Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries", "Wayne Tech")
+VERBS = ("Built", "Designed", "Led", "Migrated", "Scaled", "Automated", "Maintained", "Optimized")
+OBJECTS = (
+    "a payments API serving 2k requests/s",
+    "the CI pipeline, cutting build times by 40%",
+    "event-driven ingestion for 50M records a day",
+    "an internal developer platform used by 30 teams",
+    "observability dashboards and on-call runbooks",
+    "a recommendation service with sub-100ms latency",
+)
+BOILERPLATE = (
+    "We are an equal opportunity employer and value diversity at our company. We do not "
+    "discriminate on the basis of race, religion, color, national origin, gender, sexual "
+    "orientation, age, marital status, veteran status, or disability status.\n\n"
+    "Benefits: competitive salary, 401(k) matching, health, dental and vision insurance, "
+    "unlimited PTO and a home-office stipend."
+)
+
+
+@dataclass
+class Sample:
+    resume_text: str
+    resume_pdf: bytes
+    job_description: str
+
+
+def make_resume(rng: random.Random, jobs: int = 3) -> str:
+    skills = rng.sample(SKILLS, 10)
+    lines = [f"Candidate {uuid.UUID(int=rng.getrandbits(128)).hex[:8]}", "", "EXPERIENCE"]
+    for _ in range(jobs):
+        lines.append(
+            f"{rng.choice(TITLES)} at {rng.choice(COMPANIES)} ({rng.randint(2012, 2021)} - present)"
+        )
+        for _ in range(4):
+            lines.append(f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} using {rng.choice(skills)}")
+        lines.append("")
+    lines += ["SKILLS", ", ".join(skills), "", "EDUCATION", "B.Sc. Computer Science"]
+    return "\n".join(lines)
+
+
+def make_job_description(rng: random.Random, boilerplate: bool = True) -> str:
+    required = rng.sample(SKILLS, 6)
+    nice = rng.sample([skill for skill in SKILLS if skill not in required], 3)
+    parts = [
+        f"{rng.choice(TITLES)} - {rng.choice(COMPANIES)} (ref {rng.getrandbits(32):08x})",
+        "",
+        "We are looking for an engineer to join a small team that owns core services "
+        f"end to end. You will {rng.choice(VERBS).lower()} {rng.choice(OBJECTS)}.",
+        "",
+        "Requirements:",
+        *(f"- {rng.randint(2, 6)}+ years with {skill}" for skill in required),
+        "",
+        "Nice to have: " + ", ".join(nice),
+    ]
+    if boilerplate:
+        parts += ["", BOILERPLATE]
+    return "\n".join(parts)
+
+
+def render_pdf(text: str) -> bytes:
+    """Lay the text out on as many A4 pages as it needs."""
+    doc = fitz.open()
+    lines = text.splitlines()
+    per_page = 60
+    for start in range(0, max(1, len(lines)), per_page):
+        page = doc.new_page()
+        page.insert_textbox(
+            fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50),
+            "\n".join(lines[start:start + per_page]),
+            fontsize=10,
+        )
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def build(size: int, seed: int = 0) -> list[Sample]:
+    """``size`` resume/job description pairs; the same seed yields the same corpus."""
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(size):
+        resume = make_resume(rng, jobs=rng.randint(2, 5))
+        samples.append(Sample(resume, render_pdf(resume), make_job_description(rng)))
+    return samples
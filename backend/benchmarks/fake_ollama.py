@@ -0,0 +1,183 @@
+"""Stand-in Ollama server for load tests without a GPU.
+
+Run from ``backend/``:
+
+    python -m benchmarks.fake_ollama --port 11435 --tokens-per-second 40 --failure-rate 0.05
+
+Implements the endpoints the app uses (``/api/tags``, ``/api/chat`` and
+``/api/generate``, streaming or not) and reports Ollama's own timing fields.
+Latency is modelled as a one-off model load, prompt evaluation at
+``--prompt-tokens-per-second`` and generation at ``--tokens-per-second``, with
+at most ``--parallel`` generations running at once (like ``OLLAMA_NUM_PARALLEL``).
+``--failure-rate`` answers with a 500 and ``--truncate-rate`` cuts the JSON
+output off part-way.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+SKILLS = (
+    "Python", "FastAPI", "Django", "SQL", "PostgreSQL", "Docker", "Kubernetes", "AWS",
+    "Terraform", "React", "TypeScript", "Redis", "Kafka", "CI/CD", "Linux", "Go",
+)
+
+
+@dataclass
+class FakeConfig:
+    model: str = "mistral"
+    load_seconds: float = 2.0
+    prompt_tokens_per_second: float = 500.0
+    tokens_per_second: float = 30.0
+    parallel: int = 1
+    failure_rate: float = 0.0
+    truncate_rate: float = 0.0
+    seed: int | None = None
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _answer(prompt: str, rng: random.Random) -> str:
+    """A valid analysis result, matching skills that actually appear in the prompt."""
+    mentioned = [skill for skill in SKILLS if re.search(re.escape(skill), prompt, re.IGNORECASE)]
+    matched = mentioned[: max(1, len(mentioned) // 2)]
+    missing = [skill for skill in SKILLS if skill not in matched][:4]
+    return json.dumps(
+        {
+            "match_score": round(rng.uniform(20, 95), 1),
+            "matched_skills": matched,
+            "missing_skills": missing,
+            "suggestions": [f"Highlight hands-on experience with {skill}" for skill in missing[:3]],
+        }
+    )
+
+
+def create_app(config: FakeConfig) -> FastAPI:
+    app = FastAPI(title="Fake Ollama")
+    rng = random.Random(config.seed)
+    slots = asyncio.Semaphore(config.parallel)
+    state = {"loaded": False, "requests": 0, "failures": 0}
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": f"{config.model}:latest"}]}
+
+    @app.get("/stats")
+    async def stats():
+        return state
+
+    async def _generate(body: dict, chat: bool):
+        state["requests"] += 1
+        if rng.random() < config.failure_rate:
+            state["failures"] += 1
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+
+        if chat:
+            prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+        else:
+            prompt = body.get("prompt", "")
+        num_predict = body.get("options", {}).get("num_predict", -1)
+        text = _answer(prompt, rng)
+        if num_predict == 1:
+            text = text[:4]
+        truncated = rng.random() < config.truncate_rate
+        if truncated:
+            text = text[: len(text) // 2]
+
+        prompt_tokens = _estimate_tokens(prompt)
+        pieces = [text[i:i + 4] for i in range(0, len(text), 4)]
+        token_delay = 1 / config.tokens_per_second
+
+        def chunk(content: str, done: bool, **extra) -> dict:
+            output = {"message": {"role": "assistant", "content": content}} if chat else {"response": content}
+            return {"model": config.model, **output, "done": done, **extra}
+
+        async def run():
+            async with slots:
+                started = time.perf_counter()
+                load_ns = 0
+                if not state["loaded"]:
+                    await asyncio.sleep(config.load_seconds)
+                    state["loaded"] = True
+                    load_ns = int(config.load_seconds * 1e9)
+                prompt_seconds = prompt_tokens / config.prompt_tokens_per_second
+                await asyncio.sleep(prompt_seconds)
+                for piece in pieces:
+                    await asyncio.sleep(token_delay)
+                    yield chunk(piece, False)
+                yield chunk(
+                    "",
+                    True,
+                    done_reason="length" if truncated else "stop",
+                    total_duration=int((time.perf_counter() - started) * 1e9),
+                    load_duration=load_ns,
+                    prompt_eval_count=prompt_tokens,
+                    prompt_eval_duration=int(prompt_seconds * 1e9),
+                    eval_count=len(pieces),
+                    eval_duration=int(len(pieces) * token_delay * 1e9),
+                )
+
+        if not body.get("stream", True):
+            async for final in run():
+                pass
+            final.update(chunk(text, True))
+            return final
+
+        async def lines():
+            async for item in run():
+                yield json.dumps(item) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        return await _generate(await request.json(), chat=True)
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        return await _generate(await request.json(), chat=False)
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser, prefix: str = "") -> None:
+    """Fake server options; ``prefix`` namespaces them when embedded in another CLI."""
+    defaults = FakeConfig()
+    parser.add_argument(f"--{prefix}load-seconds", type=float, default=defaults.load_seconds)
+    parser.add_argument(
+        f"--{prefix}prompt-tokens-per-second", type=float, default=defaults.prompt_tokens_per_second
+    )
+    parser.add_argument(f"--{prefix}tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument(f"--{prefix}parallel", type=int, default=defaults.parallel)
+    parser.add_argument(f"--{prefix}failure-rate", type=float, default=defaults.failure_rate)
+    parser.add_argument(f"--{prefix}truncate-rate", type=float, default=defaults.truncate_rate)
+    parser.add_argument(f"--{prefix}seed", type=int, default=defaults.seed)
+
+
+def config_from_args(args: argparse.Namespace, prefix: str = "") -> FakeConfig:
+    attr = prefix.replace("-", "_")
+    fields = [field for field in FakeConfig.__dataclass_fields__ if field != "model"]
+    return FakeConfig(**{field: getattr(args, attr + field) for field in fields})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
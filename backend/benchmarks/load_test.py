@@ -0,0 +1,479 @@
+"""HTTP load test of the API against a fake Ollama, with results saved for comparison.
+
+Run from ``backend/``:
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --scenarios poll,list --concurrency 32 --duration 15
+    python -m benchmarks.load_test --app-env ANALYSIS_WORKERS=4 --fake-tokens-per-second 60
+    python -m benchmarks.load_test --compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+
+By default the app is started with uvicorn on a fresh SQLite database and
+pointed at ``benchmarks.fake_ollama`` (both on free local ports), so no GPU
+is needed. ``--base-url`` targets a server you started yourself instead; it
+must run with ``RATE_LIMIT_ENABLED=false``, ``ADMISSION_ENABLED=false`` and
+an Ollama it can reach. Pass ``--app-env ADMISSION_ENABLED=true`` to measure
+admission control itself.
+
+Each scenario runs ``--concurrency`` closed-loop clients for ``--duration``
+seconds and reports req/s and p50/p95/p99 latency; ``e2e`` times a whole
+analysis from upload until polling sees it completed. Results are written to
+``benchmarks/results/<timestamp>-<commit>.json``. ``--compare`` (or
+``--baseline`` on a run) prints the change per scenario and exits non-zero
+when p95 latency or throughput regressed by more than ``--threshold``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks import corpus, fake_ollama
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+SCENARIOS = ("signup", "login", "e2e", "upload", "poll", "list")
+PASSWORD = "benchmark-password"
+
+
+class RequestFailed(Exception):
+    pass
+
+
+def _expect(response: httpx.Response, *codes: int) -> httpx.Response:
+    if response.status_code not in codes:
+        raise RequestFailed(f"HTTP {response.status_code}")
+    return response
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _summarize(latencies: list[float], errors: Counter, seconds: float) -> dict:
+    ordered = sorted(latencies)
+    summary = {
+        "requests": len(ordered) + sum(errors.values()),
+        "ok": len(ordered),
+        "errors": dict(errors),
+        "seconds": round(seconds, 2),
+        "req_per_sec": round(len(ordered) / seconds, 2) if seconds else 0.0,
+        "latency_ms": None,
+    }
+    if ordered:
+        summary["latency_ms"] = {
+            "mean": round(sum(ordered) / len(ordered) * 1000, 2),
+            "p50": round(_percentile(ordered, 0.50) * 1000, 2),
+            "p95": round(_percentile(ordered, 0.95) * 1000, 2),
+            "p99": round(_percentile(ordered, 0.99) * 1000, 2),
+            "max": round(ordered[-1] * 1000, 2),
+        }
+    return summary
+
+
+async def _drive(op, concurrency: int, duration: float) -> dict:
+    """Run ``op(i)`` from ``concurrency`` closed-loop clients until ``duration`` elapses."""
+    latencies: list[float] = []
+    errors: Counter = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def client(first: int) -> None:
+        i = first
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                await op(i)
+            except (RequestFailed, httpx.HTTPError) as exc:
+                errors[str(exc) or type(exc).__name__] += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+            i += concurrency
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    return _summarize(latencies, errors, time.perf_counter() - started)
+
+
+# ── Scenarios ─────────────────────────────────────────────────────────────────
+
+
+class Bench:
+    """Shared state for one run: HTTP client, corpus and a unique prefix for accounts."""
+
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace) -> None:
+        self.client = client
+        self.args = args
+        self.run_id = uuid.uuid4().hex[:8]
+        self.samples = corpus.build(args.corpus_size, seed=args.seed)
+
+    def email(self, name: str) -> str:
+        return f"bench-{self.run_id}-{name}@example.com"
+
+    async def signup(self, name: str) -> dict:
+        response = _expect(
+            await self.client.post("/auth/signup", json={"email": self.email(name), "password": PASSWORD}),
+            201,
+        )
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def upload_form(self, i: int) -> tuple[dict, dict]:
+        sample = self.samples[i % len(self.samples)]
+        # A nonce keeps repeated corpus items from being served by the result cache
+        jd = f"{sample.job_description}\n\nPosting {uuid.uuid4().hex}"
+        return {"resume": ("resume.pdf", sample.resume_pdf, "application/pdf")}, {"job_description": jd}
+
+    async def submit(self, headers: dict, i: int) -> str:
+        files, data = self.upload_form(i)
+        response = _expect(
+            await self.client.post("/analysis/", headers=headers, files=files, data=data), 202
+        )
+        return response.json()["id"]
+
+    async def seed_analyses(self, headers: dict, count: int) -> list[str]:
+        """Create ``count`` analyses cheaply: one resume against batches of job descriptions."""
+        ids = []
+        sample = self.samples[0]
+        while len(ids) < count:
+            size = min(50, count - len(ids))
+            jds = [
+                f"{self.samples[n % len(self.samples)].job_description}\n\nPosting {uuid.uuid4().hex}"
+                for n in range(size)
+            ]
+            response = _expect(
+                await self.client.post(
+                    "/analysis/batch",
+                    headers=headers,
+                    files=[("resumes", ("resume.pdf", sample.resume_pdf, "application/pdf"))],
+                    data={"job_descriptions": jds},
+                ),
+                202,
+            )
+            ids += [item["id"] for item in response.json()["items"]]
+        return ids
+
+    async def wait_until_idle(self, timeout: float = 600.0) -> None:
+        """Let earlier scenarios' analyses drain so they do not skew the next one."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            health = (await self.client.get("/health")).json()
+            if not health.get("queue_depth") and not health.get("ollama_pool", {}).get("in_flight"):
+                return
+            await asyncio.sleep(1.0)
+        print("  queue still busy, continuing anyway", file=sys.stderr)
+
+
+async def scenario_signup(bench: Bench) -> dict:
+    async def op(i: int) -> None:
+        await bench.signup(f"signup-{i}")
+
+    return await _drive(op, bench.args.concurrency, bench.args.duration)
+
+
+async def scenario_login(bench: Bench) -> dict:
+    users = [bench.email(f"login-{n}") for n in range(bench.args.concurrency)]
+    for n in range(len(users)):
+        await bench.signup(f"login-{n}")
+
+    async def op(i: int) -> None:
+        body = {"email": users[i % len(users)], "password": PASSWORD}
+        _expect(await bench.client.post("/auth/login", json=body), 200)
+
+    return await _drive(op, bench.args.concurrency, bench.args.duration)
+
+
+async def scenario_upload(bench: Bench) -> dict:
+    headers = await bench.signup("upload")
+
+    async def op(i: int) -> None:
+        await bench.submit(headers, i)
+
+    return await _drive(op, bench.args.concurrency, bench.args.duration)
+
+
+async def scenario_poll(bench: Bench) -> dict:
+    headers = await bench.signup("poll")
+    ids = await bench.seed_analyses(headers, 20)
+
+    async def op(i: int) -> None:
+        _expect(await bench.client.get(f"/analysis/{ids[i % len(ids)]}", headers=headers), 200)
+
+    return await _drive(op, bench.args.concurrency, bench.args.duration)
+
+
+async def scenario_list(bench: Bench) -> dict:
+    headers = await bench.signup("list")
+    await bench.seed_analyses(headers, bench.args.list_items)
+    # Each client walks the history page by page, starting over at the end
+    cursors: dict[int, str | None] = {}
+
+    async def op(i: int) -> None:
+        client_id = i % bench.args.concurrency
+        params = {"limit": bench.args.page_size}
+        if cursors.get(client_id):
+            params["cursor"] = cursors[client_id]
+        page = _expect(await bench.client.get("/analysis/", headers=headers, params=params), 200).json()
+        cursors[client_id] = page["next_cursor"] if page["has_more"] else None
+
+    return await _drive(op, bench.args.concurrency, bench.args.duration)
+
+
+async def scenario_e2e(bench: Bench) -> dict:
+    headers = await bench.signup("e2e")
+    await bench.wait_until_idle()
+
+    async def op(i: int) -> None:
+        analysis_id = await bench.submit(headers, i)
+        while True:
+            await asyncio.sleep(bench.args.poll_interval)
+            response = _expect(await bench.client.get(f"/analysis/{analysis_id}", headers=headers), 200)
+            state = response.json()["status"]
+            if state == "completed":
+                return
+            if state == "failed":
+                raise RequestFailed("analysis failed")
+
+    return await _drive(op, bench.args.concurrency, bench.args.duration)
+
+
+_SCENARIO_FUNCS = {
+    "signup": scenario_signup,
+    "login": scenario_login,
+    "upload": scenario_upload,
+    "poll": scenario_poll,
+    "list": scenario_list,
+    "e2e": scenario_e2e,
+}
+
+
+# ── Local servers ─────────────────────────────────────────────────────────────
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url: str, process: subprocess.Popen, log: Path, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{url} exited during startup, see {log}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise SystemExit(f"{url} did not come up within {timeout:.0f}s, see {log}")
+
+
+@contextmanager
+def _local_servers(args: argparse.Namespace):
+    """Start the fake Ollama and the app on a throwaway database; yield the app's URL."""
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    ollama_port, app_port = _free_port(), _free_port()
+    fake_args = [
+        f"--{name.replace('_', '-')}={value}"
+        for name, value in asdict(fake_ollama.config_from_args(args, prefix="fake-")).items()
+        if name != "model" and value is not None
+    ]
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{workdir / 'bench.db'}",
+        "OLLAMA_BASE_URL": f"http://127.0.0.1:{ollama_port}",
+        "OLLAMA_ENDPOINTS": "[]",
+        "RATE_LIMIT_ENABLED": "false",
+        "ADMISSION_ENABLED": "false",
+        "ANALYSIS_QUEUE_MAX_SIZE": "1000000",
+        "JWT_SECRET": "benchmark-secret",
+        **dict(item.split("=", 1) for item in args.app_env),
+    }
+    processes = []
+    try:
+        ollama_log = workdir / "fake_ollama.log"
+        processes.append(
+            subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.fake_ollama", f"--port={ollama_port}", *fake_args],
+                cwd=BACKEND_DIR,
+                stdout=ollama_log.open("w"),
+                stderr=subprocess.STDOUT,
+            )
+        )
+        _wait_for(f"http://127.0.0.1:{ollama_port}/api/tags", processes[-1], ollama_log)
+
+        app_log = workdir / "app.log"
+        processes.append(
+            subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", f"--port={app_port}", "--log-level=warning"],
+                cwd=BACKEND_DIR,
+                env=env,
+                stdout=app_log.open("w"),
+                stderr=subprocess.STDOUT,
+            )
+        )
+        _wait_for(f"http://127.0.0.1:{app_port}/health", processes[-1], app_log)
+        print(f"Servers up (logs in {workdir})", file=sys.stderr)
+        yield f"http://127.0.0.1:{app_port}"
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+# ── Results ───────────────────────────────────────────────────────────────────
+
+
+def _commit() -> str:
+    try:
+        def git(*command: str) -> str:
+            return subprocess.run(
+                ["git", *command], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+
+        return git("rev-parse", "--short", "HEAD") + ("-dirty" if git("status", "--porcelain", "--", ".") else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _delta(old: float | None, new: float | None) -> str:
+    if not old or new is None:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def compare(base: dict, new: dict, threshold: float) -> bool:
+    """Print the change per scenario; True if any scenario regressed beyond ``threshold``."""
+    print(f"{base['commit']} -> {new['commit']}")
+    changed = sorted(k for k in new["options"] if base["options"].get(k) != new["options"][k])
+    if changed or base["fake_ollama"] != new["fake_ollama"]:
+        print(f"warning: runs used different settings ({', '.join(changed) or 'fake Ollama'})")
+    print(f"{'scenario':<8} {'req/s':>22} {'p50 ms':>22} {'p95 ms':>22} {'p99 ms':>22}")
+    regressed = False
+    for name, after in new["scenarios"].items():
+        before = base["scenarios"].get(name)
+        if before is None or not before["latency_ms"] or not after["latency_ms"]:
+            continue
+        rps = before["req_per_sec"], after["req_per_sec"]
+        cells = [f"{rps[0]:.1f}->{rps[1]:.1f} {_delta(*rps)}"]
+        for q in ("p50", "p95", "p99"):
+            old, cur = before["latency_ms"][q], after["latency_ms"][q]
+            cells.append(f"{old:.0f}->{cur:.0f} {_delta(old, cur)}")
+        worse = (
+            after["latency_ms"]["p95"] > before["latency_ms"]["p95"] * (1 + threshold)
+            or after["req_per_sec"] < before["req_per_sec"] * (1 - threshold)
+        )
+        regressed |= worse
+        print(f"{name:<8} " + " ".join(f"{cell:>22}" for cell in cells) + ("  REGRESSED" if worse else ""))
+    return regressed
+
+
+async def run(args: argparse.Namespace, base_url: str) -> dict:
+    results = {
+        "commit": _commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "options": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "corpus_size": args.corpus_size,
+            "seed": args.seed,
+            "list_items": args.list_items,
+            "page_size": args.page_size,
+            "poll_interval": args.poll_interval,
+            "base_url": args.base_url,
+            "app_env": args.app_env,
+        },
+        "fake_ollama": None if args.base_url else asdict(fake_ollama.config_from_args(args, prefix="fake-")),
+        "scenarios": {},
+    }
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.request_timeout) as client:
+        bench = Bench(client, args)
+        for name in args.scenarios:
+            print(f"{name}...", file=sys.stderr)
+            try:
+                summary = await _SCENARIO_FUNCS[name](bench)
+            except (RequestFailed, httpx.HTTPError) as exc:
+                # A failed setup step (e.g. the server fell over) skips the scenario
+                print(f"  aborted: {exc!r}", file=sys.stderr)
+                continue
+            results["scenarios"][name] = summary
+            latency = summary["latency_ms"] or {}
+            print(
+                f"  {summary['req_per_sec']:>8.2f} req/s  p50 {latency.get('p50', 0):>8.1f} ms  "
+                f"p95 {latency.get('p95', 0):>8.1f} ms  p99 {latency.get('p99', 0):>8.1f} ms  "
+                f"errors {sum(summary['errors'].values())}",
+                file=sys.stderr,
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {', '.join(SCENARIOS)}"
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario")
+    parser.add_argument("--corpus-size", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--list-items", type=int, default=200, help="History size for the list scenario")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--base-url", help="Benchmark a running server instead of starting one")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE", help="Extra app setting")
+    parser.add_argument("--output", type=Path, help="Results file (default: benchmarks/results/)")
+    parser.add_argument("--baseline", type=Path, help="Earlier results file to compare against")
+    parser.add_argument(
+        "--compare", nargs=2, type=Path, metavar=("BASE", "NEW"), help="Only compare two results files"
+    )
+    parser.add_argument("--threshold", type=float, default=0.10, help="Regression tolerance (0.10 = 10%%)")
+    fake_group = parser.add_argument_group("fake Ollama")
+    fake_ollama.add_arguments(fake_group, prefix="fake-")
+    args = parser.parse_args()
+
+    if args.compare:
+        base, new = (json.loads(path.read_text()) for path in args.compare)
+        sys.exit(1 if compare(base, new, args.threshold) else 0)
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if args.fake_seed is None:
+        args.fake_seed = args.seed
+
+    if args.base_url:
+        results = asyncio.run(run(args, args.base_url))
+    else:
+        with _local_servers(args) as base_url:
+            results = asyncio.run(run(args, base_url))
+
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{results['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.baseline:
+        sys.exit(1 if compare(json.loads(args.baseline.read_text()), results, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import os
+import tempfile
+
+# Settings are read at import time, so point the app at throwaway resources first
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='tests-')}/app.db")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("OLLAMA_WARM_UP", "false")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def sessions(tmp_path, monkeypatch):
+    """A freshly migrated database that the analysis worker writes to."""
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    from app.analysis import queue, service
+    from app.database import build_engine
+    from app.migrations.runner import upgrade
+    from app.migrations.versions import MIGRATIONS
+
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'worker.db'}")
+    await upgrade(engine, MIGRATIONS)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(service, "async_session", factory)
+    monkeypatch.setattr(queue, "async_session", factory)
+    yield factory
+    await engine.dispose()
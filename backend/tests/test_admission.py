@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import select
+
+from app.analysis import admission, service
+from app.config import settings
+from app.models import Analysis, TokenBucket, User
+
+pytestmark = pytest.mark.anyio
+
+ESTIMATE = 40.0
+
+
+@pytest.fixture(autouse=True)
+def admission_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "admission_enabled", True)
+
+
+async def _submit(sessions) -> tuple[str, str]:
+    """Admit one analysis the way the router does; returns (user id, analysis id)."""
+    async with sessions() as db:
+        user = User(email="charged@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        assert await admission.admit(db, user.id, ESTIMATE) is None
+        analysis = service.create_analysis_record(
+            db, user.id, "Python developer", "Python role", estimated_gpu_seconds=ESTIMATE
+        )
+        await db.commit()
+        return user.id, analysis.id
+
+
+async def _balance(sessions, user_id: str) -> float:
+    async with sessions() as db:
+        bucket = await db.get(TokenBucket, f"user:{user_id}")
+        return bucket.tokens
+
+
+def _failing(usage: dict):
+    async def analyze_resume(*args, **kwargs):
+        error = RuntimeError("Ollama rejected the request")
+        error._usage = usage
+        raise error
+
+    return analyze_resume
+
+
+async def test_rejected_request_is_refunded_in_full(sessions, monkeypatch):
+    user_id, analysis_id = await _submit(sessions)
+    full = settings.admission_user_burst_gpu_seconds
+    assert await _balance(sessions, user_id) == pytest.approx(full - ESTIMATE)
+
+    monkeypatch.setattr(service, "analyze_resume", _failing({}))
+    await service.run_analysis(analysis_id)
+
+    async with sessions() as db:
+        assert (await db.execute(select(Analysis.status))).scalar_one() == "failed"
+    assert await _balance(sessions, user_id) == pytest.approx(full)
+
+
+async def test_failed_attempts_are_charged_for_the_gpu_time_they_used(sessions, monkeypatch):
+    user_id, analysis_id = await _submit(sessions)
+
+    usage = {"model_load_ms": 1000.0, "prompt_eval_ms": 2000.0, "generation_ms": 7000.0}
+    monkeypatch.setattr(service, "analyze_resume", _failing(usage))
+    await service.run_analysis(analysis_id)
+
+    balance = await _balance(sessions, user_id)
+    assert balance == pytest.approx(settings.admission_user_burst_gpu_seconds - 10.0, abs=0.5)
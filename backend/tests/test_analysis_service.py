@@ -0,0 +1,93 @@
+import uuid
+
+import pytest
+from sqlalchemy import event, select
+
+from app.analysis import cache, service
+from app.config import settings
+from app.models import Analysis, AnalysisCache, User
+from app.schemas import AIAnalysisResult
+
+pytestmark = pytest.mark.anyio
+
+RESUME = "Python developer, five years of FastAPI"
+JOB = "Backend engineer: Python, FastAPI, PostgreSQL"
+
+
+@pytest.fixture
+def commits(sessions):
+    """Count commits on the worker's database."""
+    count = [0]
+
+    def on_commit(conn):
+        count[0] += 1
+
+    engine = sessions.kw["bind"].sync_engine
+    event.listen(engine, "commit", on_commit)
+    yield count
+    event.remove(engine, "commit", on_commit)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(settings, "result_cache_enabled", True)
+    cache.clear_memory()
+    yield
+    cache.clear_memory()
+
+
+async def _submit(sessions) -> str:
+    async with sessions() as db:
+        user = User(email=f"{uuid.uuid4()}@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        analysis = service.create_analysis_record(db, user.id, RESUME, JOB, estimated_gpu_seconds=20.0)
+        await db.commit()
+        return analysis.id
+
+
+async def _analyze_resume(resume_text, job_description, on_event=None) -> AIAnalysisResult:
+    result = AIAnalysisResult(match_score=80, matched_skills=["Python"], missing_skills=[], suggestions=[])
+    result._usage = {"prompt_tokens": 300, "completion_tokens": 120, "generation_ms": 4000.0}
+    return result
+
+
+async def _load(sessions, analysis_id: str) -> Analysis:
+    async with sessions() as db:
+        return await db.get(Analysis, analysis_id)
+
+
+async def test_completed_analysis_takes_two_commits(sessions, commits, monkeypatch):
+    monkeypatch.setattr(service, "analyze_resume", _analyze_resume)
+    analysis_id = await _submit(sessions)
+
+    commits[0] = 0
+    await service.run_analysis(analysis_id)
+
+    # The result itself, then its write time, the settled charge and the cache entry together
+    assert commits[0] == 2
+    analysis = await _load(sessions, analysis_id)
+    assert analysis.status == "completed"
+    assert "db_write_ms" in analysis.timings
+    async with sessions() as db:
+        assert (await db.execute(select(AnalysisCache.key))).scalar_one() == cache.make_key(RESUME, JOB)
+
+
+async def test_cache_hit_records_the_model(sessions, commits, monkeypatch):
+    monkeypatch.setattr(service, "analyze_resume", _analyze_resume)
+    await service.run_analysis(await _submit(sessions))
+    cache.clear_memory()
+
+    async def not_called(*args, **kwargs):
+        raise AssertionError("the cached result should have been used")
+
+    monkeypatch.setattr(service, "analyze_resume", not_called)
+    analysis_id = await _submit(sessions)
+    commits[0] = 0
+    await service.run_analysis(analysis_id)
+
+    assert commits[0] == 2
+    analysis = await _load(sessions, analysis_id)
+    assert analysis.status == "completed"
+    assert analysis.model_name == settings.ollama_model
+    assert "db_write_ms" in analysis.timings
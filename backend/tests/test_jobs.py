@@ -0,0 +1,77 @@
+import httpx
+import pytest
+from sqlalchemy import event
+
+from app.auth.utils import create_access_token
+from app.config import settings
+from app.database import get_db
+from app.jobs import router as jobs_router
+from app.jobs.service import search_postings
+from app.main import app
+from app.models import User
+
+pytestmark = pytest.mark.anyio
+
+DESCRIPTION = "Backend engineer building Python and PostgreSQL services"
+
+
+@pytest.fixture
+async def client(sessions):
+    async with sessions() as db:
+        user = User(email="jobs@example.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+
+    async def override_get_db():
+        async with sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    headers = {"Authorization": f"Bearer {create_access_token(user.id)}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+        yield client
+    app.dependency_overrides.pop(get_db, None)
+
+
+async def test_update_racing_a_duplicate_returns_409(client, monkeypatch):
+    first = (await client.post("/jobs/", json={"title": "Backend", "description": DESCRIPTION})).json()
+    second = (await client.post("/jobs/", json={"title": "Frontend", "description": "React developer"})).json()
+
+    # The duplicate check misses a posting stored after it ran; the unique constraint catches it
+    find_duplicate = jobs_router._find_duplicate
+    calls = []
+
+    async def racing_find_duplicate(db, user_id, digest):
+        calls.append(digest)
+        return None if len(calls) == 1 else await find_duplicate(db, user_id, digest)
+
+    monkeypatch.setattr(jobs_router, "_find_duplicate", racing_find_duplicate)
+    response = await client.put(f"/jobs/{second['id']}", json={"title": "Backend", "description": DESCRIPTION})
+
+    assert response.status_code == 409
+    assert first["id"] in response.json()["detail"]
+
+
+async def test_search_bounds_the_terms_it_looks_up(client, sessions, monkeypatch):
+    await client.post("/jobs/", json={"title": "Backend", "description": DESCRIPTION})
+    monkeypatch.setattr(settings, "job_match_max_query_terms", 50)
+    # A long resume: Python plus thousands of distinct words
+    resume = "Python PostgreSQL " + " ".join(f"word{i}" for i in range(3000))
+
+    largest = [0]
+
+    def count_params(conn, cursor, statement, parameters, context, executemany):
+        largest[0] = max(largest[0], len(parameters))
+
+    engine = sessions.kw["bind"].sync_engine
+    event.listen(engine, "before_cursor_execute", count_params)
+    try:
+        async with sessions() as db:
+            user_id = (await client.get("/auth/me")).json()["id"]
+            ranked, _ = await search_postings(db, user_id, resume, top_k=5)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_params)
+
+    assert [posting.title for posting, _ in ranked] == ["Backend"]
+    assert largest[0] <= 50 + 1
@@ -0,0 +1,48 @@
+import pytest
+
+from app.analysis.json_stream import PartialJSONParser
+
+SKILLS = '"matched_skills": ["Python", "SQL"]'
+COMPLETE = '{"match_score": 85, "matched_skills": ["Python", "SQL"], "remote": true, "summary": "Strong fit"}'
+
+
+def _parse(text: str) -> PartialJSONParser:
+    parser = PartialJSONParser()
+    parser.feed(text)
+    return parser
+
+
+def test_complete_object_is_returned_as_is():
+    parser = _parse(f"```json\n{COMPLETE}\n```")
+    assert parser.result()["match_score"] == 85
+    assert not parser.repaired
+
+
+@pytest.mark.parametrize(
+    "cut_after, expected",
+    [
+        ('{"match_score": 8', {}),
+        ("{" + SKILLS + ', "match_score": 8', {"matched_skills": ["Python", "SQL"]}),
+        ("{" + SKILLS + ', "remote": tr', {"matched_skills": ["Python", "SQL"]}),
+        ("{" + SKILLS + ', "remote": true', {"matched_skills": ["Python", "SQL"], "remote": True}),
+        ('{"match_score": 85, "matched_skills": ["Python", "SQ', {"match_score": 85, "matched_skills": ["Python"]}),
+        ('{"match_score": 85, "summary": "Strong', {"match_score": 85}),
+        ('{"match_score": 85, "scores": [70, 8', {"match_score": 85, "scores": [70]}),
+    ],
+)
+def test_truncated_output_never_keeps_a_partial_value(cut_after, expected):
+    parser = _parse(cut_after)
+    if not expected:
+        with pytest.raises(ValueError):
+            parser.result()
+        return
+    assert parser.result() == expected
+    assert parser.repaired
+
+
+def test_members_are_emitted_as_they_complete():
+    parser = PartialJSONParser()
+    chunks = (COMPLETE[:20], COMPLETE[20:60], COMPLETE[60:])
+    emitted = [member for chunk in chunks for member in parser.feed(chunk)]
+    assert [key for key, _ in emitted] == ["match_score", "matched_skills", "remote", "summary"]
+    assert parser.complete
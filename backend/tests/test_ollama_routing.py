@@ -0,0 +1,214 @@
+import asyncio
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import httpx
+import pytest
+import uvicorn
+
+from app.analysis import ollama_client, queue
+from app.config import OllamaEndpointConfig, settings
+from benchmarks.fake_ollama import FakeConfig, create_app
+
+pytestmark = pytest.mark.anyio
+
+# Never contacted: these tests only drive the breaker and the routing around it
+UNREACHABLE = "http://127.0.0.1:9"
+PAYLOAD = {"model": "mistral", "messages": [{"role": "user", "content": "Python"}], "stream": False}
+
+
+@contextmanager
+def _fake_ollama(config: FakeConfig):
+    """Serve ``benchmarks.fake_ollama`` on a free local port in a background thread."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    app = create_app(config)
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", ws="none")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def _fast(**overrides) -> FakeConfig:
+    return FakeConfig(load_seconds=0, prompt_tokens_per_second=1e6, tokens_per_second=1e4, **overrides)
+
+
+@pytest.fixture
+async def routed(monkeypatch):
+    """Point the client at the given servers (url, weight) with the given routing."""
+
+    def configure(servers: list[tuple[str, float]], routing: str) -> list[ollama_client.Endpoint]:
+        monkeypatch.setattr(
+            settings,
+            "ollama_endpoints",
+            [OllamaEndpointConfig(url=url, weight=weight, max_concurrency=4) for url, weight in servers],
+        )
+        monkeypatch.setattr(settings, "ollama_routing", routing)
+        return ollama_client.endpoints()
+
+    monkeypatch.setattr(settings, "ollama_breaker_failure_threshold", 3)
+    monkeypatch.setattr(settings, "ollama_breaker_reset_seconds", 0.3)
+    await ollama_client.close_client()
+    yield configure
+    await ollama_client.close_client()
+
+
+async def _requests_served(url: str) -> int:
+    async with httpx.AsyncClient() as client:
+        return (await client.get(f"{url}/stats")).json()["requests"]
+
+
+async def _send(count: int, concurrently: bool = False) -> list[BaseException | None]:
+    async def one():
+        try:
+            await ollama_client.post("/api/chat", json=PAYLOAD)
+        except (httpx.HTTPError, ollama_client.OllamaUnavailable) as exc:
+            return exc
+        return None
+
+    if concurrently:
+        return await asyncio.gather(*(one() for _ in range(count)))
+    return [await one() for _ in range(count)]
+
+
+async def _open_until_due(endpoint: ollama_client.Endpoint) -> None:
+    for _ in range(settings.ollama_breaker_failure_threshold):
+        endpoint.breaker.record_failure()
+    assert endpoint.breaker.state == "open"
+    await asyncio.sleep(settings.ollama_breaker_reset_seconds + 0.05)
+
+
+async def test_round_robin_follows_weights(routed):
+    with _fake_ollama(_fast()) as heavy, _fake_ollama(_fast()) as light:
+        routed([(heavy, 3), (light, 1)], "round_robin")
+        assert await _send(40) == [None] * 40
+        assert (await _requests_served(heavy), await _requests_served(light)) == (30, 10)
+
+
+async def test_least_loaded_spreads_concurrent_requests(routed):
+    slow = FakeConfig(load_seconds=0, prompt_tokens_per_second=1e6, tokens_per_second=100, parallel=4)
+    with _fake_ollama(slow) as first, _fake_ollama(slow) as second:
+        endpoints = routed([(first, 1), (second, 1)], "least_loaded")
+        task = asyncio.create_task(_send(1))
+        while endpoints[0].in_flight == 0:
+            await asyncio.sleep(0.01)
+        # The busy endpoint is skipped while the other one is idle
+        assert ollama_client._pick() is endpoints[1]
+        await task
+
+        assert await _send(4, concurrently=True) == [None] * 4
+        assert (await _requests_served(first), await _requests_served(second)) == (3, 2)
+
+
+async def test_failing_endpoint_is_ejected_after_threshold(routed):
+    with _fake_ollama(_fast()) as healthy, _fake_ollama(_fast(failure_rate=1.0)) as broken:
+        endpoints = routed([(healthy, 1), (broken, 1)], "round_robin")
+        await _send(20)
+
+        assert endpoints[1].breaker.state == "open"
+        assert await _requests_served(broken) == settings.ollama_breaker_failure_threshold
+        assert await _requests_served(healthy) == 20 - settings.ollama_breaker_failure_threshold
+
+
+async def test_recovery_goes_through_a_single_half_open_probe(routed):
+    flaky = _fast(failure_rate=1.0)
+    with _fake_ollama(_fast()) as healthy, _fake_ollama(flaky) as recovering:
+        endpoints = routed([(healthy, 1), (recovering, 1)], "round_robin")
+        await _send(10)
+        breaker = endpoints[1].breaker
+        assert breaker.state == "open"
+
+        flaky.failure_rate = 0.0
+        await asyncio.sleep(settings.ollama_breaker_reset_seconds + 0.05)
+        # Routing decisions made before any request runs still pick the ejected endpoint only once
+        picks = [ollama_client._pick() for _ in range(8)]
+        assert picks.count(endpoints[1]) == 1
+        assert breaker.state == "half_open"
+
+        before = await _requests_served(recovering)
+        await ollama_client.post("/api/chat", endpoint=endpoints[1], json=PAYLOAD)
+        assert breaker.state == "closed"
+        assert await _send(4) == [None] * 4
+        assert await _requests_served(recovering) == before + 3
+
+
+async def test_failed_probe_reopens_the_circuit(routed):
+    with _fake_ollama(_fast()) as healthy, _fake_ollama(_fast(failure_rate=1.0)) as broken:
+        endpoints = routed([(healthy, 1), (broken, 1)], "round_robin")
+        await _send(10)
+        await asyncio.sleep(settings.ollama_breaker_reset_seconds + 0.05)
+        before = await _requests_served(broken)
+
+        # The burst sends one probe; it fails and everything else goes to the healthy endpoint
+        results = await _send(8, concurrently=True)
+        assert sum(result is not None for result in results) == 1
+        assert await _requests_served(broken) == before + 1
+        assert endpoints[1].breaker.state == "open"
+
+
+async def test_workers_back_off_while_the_only_endpoint_is_probed(routed, monkeypatch):
+    (endpoint,) = routed([(UNREACHABLE, 1)], "round_robin")
+    await _open_until_due(endpoint)
+    assert ollama_client._pick() is endpoint
+    assert endpoint.breaker.state == "half_open"
+    assert ollama_client.retry_in() > 0
+    assert not ollama_client.is_available()
+
+    claims = []
+
+    async def claim_next():
+        claims.append(None)
+        return None
+
+    monkeypatch.setattr(queue, "_claim_next", claim_next)
+    monkeypatch.setattr(queue, "_wakeup", asyncio.Event())
+    monkeypatch.setattr(settings, "analysis_queue_poll_seconds", 0.05)
+    worker = asyncio.create_task(queue._worker(1))
+    await asyncio.sleep(0.3)
+    worker.cancel()
+    await asyncio.gather(worker, return_exceptions=True)
+    # No job is claimed (and bounced back to pending) until the probe has an outcome
+    assert claims == []
+
+
+async def test_probe_cancelled_while_waiting_for_a_slot_is_released(routed):
+    (endpoint,) = routed([(UNREACHABLE, 1)], "round_robin")
+    await _open_until_due(endpoint)
+    for _ in range(endpoint.max_concurrency):
+        await endpoint.slots.acquire()
+
+    probe = asyncio.create_task(ollama_client.post("/api/chat", json=PAYLOAD))
+    await asyncio.sleep(0.05)
+    assert endpoint.breaker.state == "half_open"
+    probe.cancel()
+    await asyncio.gather(probe, return_exceptions=True)
+
+    # The next request may probe instead of the endpoint staying unroutable for good
+    assert endpoint.breaker.state == "open"
+    assert endpoint.routable()
+    for _ in range(endpoint.max_concurrency):
+        endpoint.slots.release()
+
+
+async def test_health_check_does_not_wait_for_a_busy_endpoint(routed):
+    with _fake_ollama(_fast()) as server:
+        (endpoint,) = routed([(server, 1)], "round_robin")
+        for _ in range(endpoint.max_concurrency):
+            await endpoint.slots.acquire()
+        try:
+            response = await asyncio.wait_for(ollama_client.get("/api/tags", timeout=5.0), timeout=2.0)
+        finally:
+            for _ in range(endpoint.max_concurrency):
+                endpoint.slots.release()
+        assert response.status_code == 200
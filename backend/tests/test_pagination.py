@@ -0,0 +1,65 @@
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.auth.utils import create_access_token
+from app.database import build_engine, get_db
+from app.main import app
+from app.migrations.runner import upgrade
+from app.migrations.versions import MIGRATIONS
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def baseline_db(tmp_path):
+    """A database created by the original schema, with rows written before microsecond
+    timestamps, then upgraded in place."""
+    engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'baseline.db'}")
+    await upgrade(engine, MIGRATIONS, target=1)
+    user_id = str(uuid.uuid4())
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("INSERT INTO users (id, email, hashed_password) VALUES (:id, 'old@example.com', 'x')"),
+            {"id": user_id},
+        )
+        for i in range(5):
+            # created_at comes from CURRENT_TIMESTAMP, so all five share one second
+            await conn.execute(
+                text(
+                    "INSERT INTO analyses (id, user_id, resume_text, job_description, status) "
+                    "VALUES (:id, :user_id, 'resume', :jd, 'completed')"
+                ),
+                {"id": str(uuid.uuid4()), "user_id": user_id, "jd": f"jd {i}"},
+            )
+    await upgrade(engine, MIGRATIONS)
+
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield user_id
+    app.dependency_overrides.pop(get_db, None)
+    await engine.dispose()
+
+
+async def test_cursor_pages_through_upgraded_baseline_rows(baseline_db):
+    headers = {"Authorization": f"Bearer {create_access_token(baseline_db)}"}
+    seen: list[str] = []
+    params = {"limit": 2}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        for _ in range(5):
+            page = (await client.get("/analysis/", params=params, headers=headers)).json()
+            seen += [item["job_description_preview"] for item in page["items"]]
+            if not page["has_more"]:
+                break
+            params = {"limit": 2, "cursor": page["next_cursor"]}
+
+    assert not page["has_more"]
+    assert sorted(seen) == [f"jd {i}" for i in range(5)]
@@ -0,0 +1,79 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.analysis import queue
+from app.config import settings
+from app.models import Analysis, User
+
+pytestmark = pytest.mark.anyio
+
+
+async def _add_job(sessions, status: str = "pending", heartbeat_age: float | None = None) -> str:
+    async with sessions() as db:
+        user = User(email=f"{uuid.uuid4()}@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        analysis = Analysis(user_id=user.id, resume_text="resume", job_description="job", status=status)
+        if heartbeat_age is not None:
+            seen = datetime.now(timezone.utc) - timedelta(seconds=heartbeat_age)
+            analysis.started_at = analysis.heartbeat_at = seen
+        db.add(analysis)
+        await db.commit()
+        return analysis.id
+
+
+async def _status(sessions, analysis_id: str) -> str:
+    async with sessions() as db:
+        return (await db.get(Analysis, analysis_id)).status
+
+
+@pytest.fixture
+def slow_jobs(monkeypatch):
+    """Replace the LLM call with one that runs until cancelled."""
+
+    async def run_analysis(analysis_id):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(queue, "run_analysis", run_analysis)
+
+
+async def test_startup_leaves_jobs_of_live_workers_alone(sessions, monkeypatch):
+    monkeypatch.setattr(settings, "analysis_workers", 0)
+    live = await _add_job(sessions, "processing", heartbeat_age=5)
+    abandoned = await _add_job(sessions, "processing", heartbeat_age=settings.analysis_job_timeout_seconds + 60)
+
+    await queue.start_workers()
+    await queue.stop_workers()
+
+    assert await _status(sessions, live) == "processing"
+    assert await _status(sessions, abandoned) == "pending"
+
+
+async def test_heartbeat_keeps_a_slow_job_from_being_recovered(sessions, slow_jobs, monkeypatch):
+    monkeypatch.setattr(settings, "analysis_heartbeat_seconds", 0.05)
+    analysis_id = await _add_job(sessions)
+    assert await queue._claim_next() == analysis_id
+
+    running = asyncio.create_task(queue._run(0, analysis_id))
+    await asyncio.sleep(0.5)
+    recovered = await queue.recover_stuck_jobs(datetime.now(timezone.utc) - timedelta(seconds=0.2))
+    running.cancel()
+    await asyncio.gather(running, return_exceptions=True)
+
+    assert recovered == 0
+    assert await _status(sessions, analysis_id) == "processing"
+
+
+async def test_shutdown_requeues_the_jobs_it_was_running(sessions, slow_jobs, monkeypatch):
+    monkeypatch.setattr(settings, "analysis_workers", 1)
+    analysis_id = await _add_job(sessions)
+
+    await queue.start_workers()
+    while await _status(sessions, analysis_id) != "processing":
+        await asyncio.sleep(0.01)
+    await queue.stop_workers()
+
+    assert await _status(sessions, analysis_id) == "pending"
@@ -0,0 +1,112 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+from limits import RateLimitItemPerMinute, RateLimitItemPerSecond
+from limits.errors import ConfigurationError
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, MovingWindowRateLimiter
+
+from app.middleware.rate_limit_storage import SQLiteStorage
+
+LIMIT = 25
+
+
+@pytest.fixture
+def uri(tmp_path) -> str:
+    return f"sqlite:///{tmp_path / 'ratelimit.db'}"
+
+
+def _contend(uri: str, strategy: str, start, results) -> None:
+    """One worker process: race the others for the same key, report how many hits were admitted."""
+    storage = storage_from_string(uri)
+    limiter = (MovingWindowRateLimiter if strategy == "moving" else FixedWindowRateLimiter)(storage)
+    item = RateLimitItemPerMinute(LIMIT)
+    start.wait()
+    results.put(sum(limiter.hit(item, "contested") for _ in range(LIMIT)))
+
+
+@pytest.mark.parametrize("strategy", ["moving", "fixed"])
+def test_processes_sharing_a_file_admit_exactly_the_limit(uri, strategy):
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(4)
+    results = context.Queue()
+    processes = [context.Process(target=_contend, args=(uri, strategy, start, results)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    admitted = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join()
+
+    assert sum(admitted) == LIMIT
+
+
+def test_threads_with_their_own_connections_admit_exactly_the_limit(uri):
+    limiter = MovingWindowRateLimiter(SQLiteStorage(uri))
+    item = RateLimitItemPerMinute(LIMIT)
+    admitted = []
+
+    def contend():
+        admitted.extend(limiter.hit(item, "contested") for _ in range(LIMIT))
+
+    threads = [threading.Thread(target=contend) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(admitted) == LIMIT
+
+
+def test_moving_window_entries_expire(uri):
+    storage = SQLiteStorage(uri)
+    limiter = MovingWindowRateLimiter(storage)
+    item = RateLimitItemPerSecond(2)
+
+    assert limiter.hit(item, "user:1") and limiter.hit(item, "user:1")
+    assert not limiter.hit(item, "user:1")
+    assert storage.get_moving_window(item.key_for("user:1"), 2, 1)[1] == 2
+    time.sleep(1.1)
+    assert limiter.hit(item, "user:1")
+    assert storage.get_moving_window(item.key_for("user:1"), 2, 1)[1] == 1
+
+
+def test_fixed_window_counter_expires(uri):
+    storage = SQLiteStorage(uri)
+    limiter = FixedWindowRateLimiter(storage)
+    item = RateLimitItemPerSecond(1)
+
+    assert limiter.hit(item, "user:1")
+    assert not limiter.hit(item, "user:1")
+    assert storage.get(item.key_for("user:1")) == 2
+    assert storage.get_expiry(item.key_for("user:1")) > time.time()
+    time.sleep(1.1)
+    assert storage.get(item.key_for("user:1")) == 0
+    assert limiter.hit(item, "user:1")
+
+
+def test_clear_and_reset(uri):
+    storage = SQLiteStorage(uri)
+    moving = MovingWindowRateLimiter(storage)
+    fixed = FixedWindowRateLimiter(storage)
+    item = RateLimitItemPerMinute(1)
+
+    for user in ("user:1", "user:2"):
+        assert moving.hit(item, "moving", user)
+        assert fixed.hit(item, "fixed", user)
+
+    moving.clear(item, "moving", "user:1")
+    fixed.clear(item, "fixed", "user:1")
+    assert moving.hit(item, "moving", "user:1")
+    assert fixed.hit(item, "fixed", "user:1")
+    assert not moving.hit(item, "moving", "user:2")
+
+    assert storage.reset() == 4
+    assert moving.hit(item, "moving", "user:2")
+    assert fixed.hit(item, "fixed", "user:2")
+
+
+def test_storage_uri_needs_a_file_path():
+    with pytest.raises(ConfigurationError):
+        storage_from_string("sqlite:///:memory:")
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.analysis import cache
+from app.config import settings
+from app.models import AnalysisCache
+from app.schemas import AIAnalysisResult
+
+pytestmark = pytest.mark.anyio
+
+RESULT = AIAnalysisResult(match_score=70, matched_skills=["SQL"], missing_skills=[], suggestions=[])
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(settings, "result_cache_enabled", True)
+    monkeypatch.setattr(cache, "_next_prune", 0.0)
+    cache.clear_memory()
+    yield
+    cache.clear_memory()
+
+
+async def _age(sessions, key: str, seconds: float) -> None:
+    async with sessions() as db:
+        await db.execute(
+            update(AnalysisCache)
+            .where(AnalysisCache.key == key)
+            .values(created_at=datetime.now(timezone.utc) - timedelta(seconds=seconds))
+        )
+        await db.commit()
+
+
+async def test_database_entries_expire(sessions):
+    fresh, stale = cache.make_key("resume", "fresh job"), cache.make_key("resume", "stale job")
+    async with sessions() as db:
+        await cache.store_result(db, fresh, RESULT)
+        await cache.store_result(db, stale, RESULT)
+        await db.commit()
+    await _age(sessions, stale, settings.result_cache_db_ttl_seconds + 60)
+    cache.clear_memory()
+
+    async with sessions() as db:
+        assert await cache.get_cached_result(db, fresh) == RESULT
+        assert await cache.get_cached_result(db, stale) is None
+
+        assert await cache.prune_expired(db) == 1
+        assert (await db.execute(select(AnalysisCache.key))).scalars().all() == [fresh]
+        # Throttled: the next sweep within the hour does nothing
+        await _age(sessions, fresh, settings.result_cache_db_ttl_seconds + 60)
+        assert await cache.prune_expired(db) == 0
+
+
+async def test_storing_again_renews_an_entry(sessions):
+    key = cache.make_key("resume", "job")
+    async with sessions() as db:
+        await cache.store_result(db, key, RESULT)
+        await db.commit()
+    await _age(sessions, key, settings.result_cache_db_ttl_seconds + 60)
+
+    async with sessions() as db:
+        await cache.store_result(db, key, RESULT)
+        await db.commit()
+        assert (await db.execute(select(func.count()).select_from(AnalysisCache))).scalar() == 1
+        cache.clear_memory()
+        assert await cache.get_cached_result(db, key) == RESULT
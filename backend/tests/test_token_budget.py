@@ -0,0 +1,43 @@
+from app.analysis.token_budget import fit_inputs, trim_document
+
+NURSE_JD = """Registered Nurse - ICU
+
+Requirements:
+Current RN license and BLS certification. Two years of critical care experience.
+Must pass a background check. Comfortable with 12-hour shifts and PTO scheduling by seniority."""
+
+RESUME = """Software Engineer
+Acme, 2019 - present
+- Built payment APIs in Python
+
+Software Engineer
+Globex, 2016 - 2019
+- Maintained Django services
+
+Software Engineer
+Initech, 2014 - 2016
+- Wrote SQL reports"""
+
+
+def test_inputs_within_budget_are_untouched():
+    assert fit_inputs(RESUME, NURSE_JD, budget=4000) == (RESUME, NURSE_JD, None)
+
+
+def test_requirements_mentioning_boilerplate_topics_are_kept():
+    trimmed, report = trim_document(NURSE_JD, budget=4000, drop_boilerplate=True)
+    assert "BLS certification" in trimmed
+    assert report["dropped"] == []
+
+
+def test_boilerplate_sections_are_dropped():
+    jd = NURSE_JD + """
+
+Benefits
+- Medical, dental and vision from day one
+- Tuition reimbursement
+
+We are an equal opportunity employer. We consider all applicants without regard to race, sex or gender."""
+    trimmed, report = trim_document(jd, budget=4000, drop_boilerplate=True)
+    assert "BLS certification" in trimmed
+    assert "Tuition" not in trimmed and "equal opportunity" not in trimmed
+    assert sorted(d["reason"] for d in report["dropped"]) == ["benefits", "eeo"]
@@ -39,14 +39,17 @@ export default function HistoryPage() {
   const [analyses, setAnalyses] = useState([]);
   const [total, setTotal] = useState(0);
   const [hasMore, setHasMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState("");
   const [deletingId, setDeletingId] = useState(null);
 
-  const fetchAnalyses = async (skip = 0, append = false) => {
+  const fetchAnalyses = async (cursor = null, append = false) => {
     try {
-      const res = await client.get(`/analysis/?skip=${skip}&limit=20`);
+      const params = { limit: 20 };
+      if (cursor) params.cursor = cursor;
+      const res = await client.get("/analysis/", { params });
       if (append) {
         setAnalyses((prev) => [...prev, ...res.data.items]);
       } else {
@@ -54,6 +57,7 @@ export default function HistoryPage() {
       }
       setTotal(res.data.total);
       setHasMore(res.data.has_more);
+      setNextCursor(res.data.next_cursor);
     } catch {
       setError("Failed to load history");
     }
@@ -65,7 +69,7 @@ export default function HistoryPage() {
 
   const handleLoadMore = async () => {
     setLoadingMore(true);
-    await fetchAnalyses(analyses.length, true);
+    await fetchAnalyses(nextCursor, true);
     setLoadingMore(false);
   };
 